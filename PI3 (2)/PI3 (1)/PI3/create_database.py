@@ -182,7 +182,8 @@ def create_database():
                     INDEX idx_status (status),
                     INDEX idx_payment_status (payment_status),
                     INDEX idx_order_number (order_number),
-                    INDEX idx_created_at (created_at)
+                    INDEX idx_created_at (created_at),
+                    INDEX idx_updated_at (updated_at)
                 )
             """)
             
@@ -403,6 +404,77 @@ def create_database():
                 )
             """)
             
+            # Sales rollup tables, refreshed incrementally by
+            # BossShoppDatabase.refresh_sales_rollups
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sales_hourly (
+                    bucket_start DATETIME PRIMARY KEY,
+                    order_count INT NOT NULL DEFAULT 0,
+                    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+                    min_order_value DECIMAL(10, 2) NULL,
+                    max_order_value DECIMAL(10, 2) NULL,
+                    new_users INT NOT NULL DEFAULT 0
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sales_daily (
+                    sale_date DATE PRIMARY KEY,
+                    order_count INT NOT NULL DEFAULT 0,
+                    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+                    min_order_value DECIMAL(10, 2) NULL,
+                    max_order_value DECIMAL(10, 2) NULL,
+                    new_users INT NOT NULL DEFAULT 0
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS product_sales_daily (
+                    sale_date DATE NOT NULL,
+                    product_id INT NOT NULL,
+                    units INT NOT NULL DEFAULT 0,
+                    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+                    
+                    PRIMARY KEY (sale_date, product_id),
+                    INDEX idx_product (product_id)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS product_sales_totals (
+                    product_id INT PRIMARY KEY,
+                    units INT NOT NULL DEFAULT 0,
+                    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+                    
+                    INDEX idx_units (units)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS rollup_state (
+                    source VARCHAR(50) PRIMARY KEY,
+                    high_water TIMESTAMP NULL,
+                    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_totals (
+                    id TINYINT PRIMARY KEY,
+                    total_users INT NOT NULL DEFAULT 0,
+                    active_users INT NOT NULL DEFAULT 0,
+                    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # The rollup refresh scans orders by updated_at; older databases
+            # were created without this index
+            try:
+                cursor.execute("CREATE INDEX idx_updated_at ON orders (updated_at)")
+            except Error as e:
+                if e.errno != 1061:  # ER_DUP_KEYNAME: index already exists
+                    raise
+            
             print("All tables created successfully!")
             
             # Insert initial data
@@ -522,20 +594,10 @@ def create_database():
                 END
             """)
             
-            # Trigger to update stock after order
-            cursor.execute("""
-                CREATE TRIGGER IF NOT EXISTS update_stock_after_order
-                AFTER INSERT ON order_items
-                FOR EACH ROW
-                BEGIN
-                    UPDATE products 
-                    SET stock_quantity = stock_quantity - NEW.quantity
-                    WHERE id = NEW.product_id;
-                    
-                    INSERT INTO stock_movements (product_id, movement_type, quantity, reference_type, reference_id)
-                    VALUES (NEW.product_id, 'out', NEW.quantity, 'sale', NEW.order_id);
-                END
-            """)
+            # Stock is decremented (and stock_movements written) by
+            # BossShoppDatabase.create_order inside the order transaction,
+            # so drop the old per-row trigger that would do it twice
+            cursor.execute("DROP TRIGGER IF EXISTS update_stock_after_order")
             
             print("Triggers created successfully!")
             
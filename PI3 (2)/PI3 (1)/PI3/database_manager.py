@@ -15,6 +15,10 @@ from decimal import Decimal
 import logging
 from typing import Dict, List, Optional, Tuple, Any
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 
 # Configurar logging
@@ -31,28 +35,266 @@ class DatabaseConfig:
     database: str = 'boss_shopp_complete'
     charset: str = 'utf8mb4'
     autocommit: bool = False
+    # Pool de conexões (pool_size = 0 mantém o modo de conexão única)
+    pool_size: int = 0
+    pool_pre_ping: bool = True
+    pool_max_lifetime: int = 1800  # segundos
+    pool_timeout: float = 30.0  # segundos esperando uma conexão livre
+
+def open_connection(config: DatabaseConfig):
+    """Abrir uma conexão MySQL a partir da configuração"""
+    return mysql.connector.connect(
+        host=config.host,
+        port=config.port,
+        user=config.user,
+        password=config.password,
+        database=config.database,
+        charset=config.charset,
+        autocommit=config.autocommit
+    )
+
+# Status de pedido contados como venda nas estatísticas
+SALES_STATUSES = ('shipped', 'delivered')
+
+# Janela reprocessada antes da marca d'água dos rollups (segundos): cobre
+# transações que gravaram updated_at antes da última atualização mas só
+# confirmaram depois dela
+ROLLUP_LAG_SECONDS = 300
+ROLLUP_EPOCH = datetime(1970, 1, 2)
+
+# Intervalo (segundos) entre as atualizações agendadas dos rollups
+ROLLUP_REFRESH_SECONDS = 60
+
+# Intervalo (segundos) entre as verificações de mudança do catálogo em memória
+CATALOG_REFRESH_SECONDS = 30
+
+def _placeholders(values) -> str:
+    """Marcadores de um `IN (...)` cujos valores vão como parâmetros da consulta"""
+    return ', '.join(['%s'] * len(values))
+
+def _at_midnight(value) -> bool:
+    return not isinstance(value, datetime) or value.time() == datetime.min.time()
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.combine(value, datetime.min.time())
+
+def _bucket_floor(value: Optional[datetime], bucket: timedelta) -> Optional[datetime]:
+    """Início do dia ou da hora (conforme `bucket`) que contém `value`"""
+    if value is None:
+        return None
+    if bucket == timedelta(days=1):
+        return datetime.combine(value.date(), datetime.min.time())
+    return value.replace(minute=0, second=0, microsecond=0)
+
+def _bucket_ceil(value: Optional[datetime], bucket: timedelta) -> Optional[datetime]:
+    """Início do primeiro dia ou hora que começa em `value` ou depois dele"""
+    floor = _bucket_floor(value, bucket)
+    return floor if floor == value else floor + bucket
+
+class InsufficientStockError(Exception):
+    """Estoque insuficiente para concluir o pedido"""
+
+class ConnectionPool:
+    """
+    Pool de conexões thread-safe compartilhado entre instâncias de
+    BossShoppDatabase. As conexões são criadas sob demanda até pool_size,
+    validadas com ping antes do uso (pool_pre_ping) e descartadas depois
+    de pool_max_lifetime segundos, evitando tempestades de reconexão.
+    """
+    
+    def __init__(self, config: DatabaseConfig):
+        if config.pool_size < 1:
+            raise ValueError("pool_size deve ser maior que zero para usar o pool")
+        self.config = config
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(config.pool_size)
+        self._closed = False
+    
+    def _expired(self, created_at: float) -> bool:
+        lifetime = self.config.pool_max_lifetime
+        return bool(lifetime) and time.monotonic() - created_at > lifetime
+    
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+    
+    def acquire(self) -> Tuple[Any, float]:
+        """Retirar uma conexão do pool (cria uma nova se não houver livre)"""
+        if self._closed:
+            raise Error("Pool de conexões fechado")
+        if not self._slots.acquire(timeout=self.config.pool_timeout):
+            raise Error("Tempo esgotado aguardando conexão livre no pool")
+        
+        try:
+            while True:
+                try:
+                    connection, created_at = self._idle.get_nowait()
+                except queue.Empty:
+                    return open_connection(self.config), time.monotonic()
+                
+                if self._expired(created_at):
+                    self._close_quietly(connection)
+                    continue
+                if self.config.pool_pre_ping and not connection.is_connected():
+                    self._close_quietly(connection)
+                    continue
+                return connection, created_at
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def release(self, connection, created_at: float, discard: bool = False):
+        """
+        Devolver uma conexão ao pool. A transação em aberto é desfeita antes:
+        com autocommit desligado até uma leitura abre uma transação, e sob
+        REPEATABLE READ o próximo usuário da conexão veria o snapshot dela.
+        """
+        try:
+            if not (discard or self._closed or self._expired(created_at)):
+                try:
+                    connection.rollback()
+                except Error:
+                    discard = True
+            if discard or self._closed or self._expired(created_at):
+                self._close_quietly(connection)
+            else:
+                self._idle.put((connection, created_at))
+        finally:
+            self._slots.release()
+    
+    @contextmanager
+    def connection(self):
+        """Context manager que retira e devolve uma conexão"""
+        connection, created_at = self.acquire()
+        discard = False
+        try:
+            yield connection
+        except Error:
+            # Conexão pode ter ficado em estado inválido
+            discard = not connection.is_connected()
+            raise
+        finally:
+            self.release(connection, created_at, discard)
+    
+    def close_all(self):
+        """Fechar todas as conexões livres e impedir novos empréstimos"""
+        self._closed = True
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._close_quietly(connection)
+
+class ProductRecord:
+    """Produto do catálogo em memória: valores da linha na ordem de CatalogSnapshot.columns"""
+    __slots__ = ('id', 'category_id', 'category_slug', 'is_featured', 'values')
+    
+    def __init__(self, row: Dict, columns: Tuple[str, ...]):
+        self.id = row['id']
+        self.category_id = row['category_id']
+        self.category_slug = row['category_slug']
+        self.is_featured = bool(row['is_featured'])
+        self.values = tuple(row[column] for column in columns)
+
+class CatalogSnapshot:
+    """
+    Cópia imutável do catálogo ativo, indexada por id, slug de categoria e
+    destaque, com a contagem de produtos por categoria já calculada. Nunca
+    é alterada depois de montada: uma atualização monta outra cópia e troca
+    a referência, então leituras concorrentes não precisam de lock.
+    """
+    __slots__ = ('version', 'settled', 'columns', 'products', 'by_id', 'by_category',
+                 'featured', 'categories')
+    
+    def __init__(self, version: tuple, settled: bool, product_rows: List[Dict], category_rows: List[Dict]):
+        """
+        product_rows: produtos ativos (com category_name, category_slug e
+        category_active) em ORDER BY created_at DESC, id DESC;
+        category_rows: categorias ativas na ordem de exibição.
+        """
+        self.version = version
+        self.settled = settled
+        self.columns = tuple(
+            column for column in (product_rows[0] if product_rows else ())
+            if column != 'category_active'
+        )
+        
+        records = [(ProductRecord(row, self.columns), bool(row['category_active'])) for row in product_rows]
+        self.by_id = {record.id: record for record, _ in records}
+        self.products = tuple(record for record, category_active in records if category_active)
+        self.featured = tuple(record for record in self.products if record.is_featured)
+        
+        by_category = {}
+        for record in self.products:
+            by_category.setdefault(record.category_slug, []).append(record)
+        self.by_category = {slug: tuple(items) for slug, items in by_category.items()}
+        
+        counts = {}
+        for record, _ in records:
+            counts[record.category_id] = counts.get(record.category_id, 0) + 1
+        self.categories = tuple(
+            dict(row, product_count=counts.get(row['id'], 0)) for row in category_rows
+        )
+    
+    def as_dict(self, record: ProductRecord) -> Dict:
+        return dict(zip(self.columns, record.values))
+    
+    def get_products(self, category_slug: str = None, limit: int = None,
+                     featured_only: bool = False) -> List[Dict]:
+        if category_slug:
+            records = self.by_category.get(category_slug, ())
+            if featured_only:
+                records = [record for record in records if record.is_featured]
+        else:
+            records = self.featured if featured_only else self.products
+        if limit:
+            records = records[:limit]
+        return [self.as_dict(record) for record in records]
+    
+    def get_product_by_id(self, product_id: int) -> Optional[Dict]:
+        record = self.by_id.get(product_id)
+        return self.as_dict(record) if record is not None else None
+    
+    def get_categories(self) -> List[Dict]:
+        return [dict(row) for row in self.categories]
 
 class BossShoppDatabase:
     """Classe principal para gerenciamento do banco de dados do BOSS SHOPP"""
     
-    def __init__(self, config: DatabaseConfig = None):
-        """Inicializar conexão com o banco de dados"""
+    def __init__(self, config: DatabaseConfig = None, pool: ConnectionPool = None):
+        """
+        Inicializar conexão com o banco de dados.
+        
+        Com config.pool_size > 0 (ou um pool compartilhado em `pool`) cada
+        operação retira sua própria conexão e cursor do pool, permitindo
+        usar a mesma instância a partir de várias threads.
+        """
         self.config = config or DatabaseConfig()
+        self.pool = pool
+        self._owns_pool = False
+        self._local = threading.local()
         self.connection = None
         self.cursor = None
+        self._catalog = None
+        self._catalog_stop = None
+        self._rollup_stop = None
         
     def connect(self) -> bool:
         """Estabelecer conexão com o banco de dados"""
+        if self.pool is not None or self.config.pool_size > 0:
+            return self._connect_pool()
+        
         try:
-            self.connection = mysql.connector.connect(
-                host=self.config.host,
-                port=self.config.port,
-                user=self.config.user,
-                password=self.config.password,
-                database=self.config.database,
-                charset=self.config.charset,
-                autocommit=self.config.autocommit
-            )
+            self.connection = open_connection(self.config)
             
             if self.connection.is_connected():
                 self.cursor = self.connection.cursor(dictionary=True)
@@ -63,19 +305,73 @@ class BossShoppDatabase:
             logger.error(f"Erro ao conectar ao banco de dados: {e}")
             return False
     
+    def _connect_pool(self) -> bool:
+        """Criar (se necessário) e validar o pool de conexões"""
+        try:
+            if self.pool is None:
+                self.pool = ConnectionPool(self.config)
+                self._owns_pool = True
+            with self.pool.connection():
+                pass
+            logger.info(f"Pool de conexões pronto para {self.config.database}")
+            return True
+        except Error as e:
+            logger.error(f"Erro ao conectar ao banco de dados: {e}")
+            return False
+    
     def disconnect(self):
         """Fechar conexão com o banco de dados"""
+        self.disable_catalog_snapshot()
+        self.disable_rollup_refresh()
+        if self.pool is not None:
+            if self._owns_pool:
+                self.pool.close_all()
+                logger.info("Pool de conexões fechado")
+            return
         if self.cursor:
             self.cursor.close()
         if self.connection and self.connection.is_connected():
             self.connection.close()
             logger.info("Conexão com o banco de dados fechada")
     
+    @contextmanager
+    def pooled_cursor(self, commit: bool = False):
+        """
+        Cursor (dictionary=True) para uma única operação. No modo pool usa
+        uma conexão própria retirada do pool; no modo de conexão única usa
+        a conexão da instância. Com commit=True confirma ao final e desfaz
+        a transação em caso de erro.
+        """
+        if self.pool is None:
+            try:
+                yield self.cursor
+                if commit:
+                    self.connection.commit()
+            except Exception:
+                if commit:
+                    self.connection.rollback()
+                raise
+            return
+        
+        with self.pool.connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                yield cursor
+                if commit:
+                    connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                self._local.last_insert_id = cursor.lastrowid
+                cursor.close()
+    
     def execute_query(self, query: str, params: tuple = None) -> List[Dict]:
         """Executar query SELECT e retornar resultados"""
         try:
-            self.cursor.execute(query, params or ())
-            return self.cursor.fetchall()
+            with self.pooled_cursor() as cursor:
+                cursor.execute(query, params or ())
+                return cursor.fetchall()
         except Error as e:
             logger.error(f"Erro ao executar query: {e}")
             return []
@@ -83,17 +379,18 @@ class BossShoppDatabase:
     def execute_update(self, query: str, params: tuple = None) -> bool:
         """Executar query INSERT/UPDATE/DELETE"""
         try:
-            self.cursor.execute(query, params or ())
-            self.connection.commit()
+            with self.pooled_cursor(commit=True) as cursor:
+                cursor.execute(query, params or ())
             return True
         except Error as e:
             logger.error(f"Erro ao executar update: {e}")
-            self.connection.rollback()
             return False
     
     def get_last_insert_id(self) -> int:
-        """Obter o último ID inserido"""
-        return self.cursor.lastrowid
+        """Obter o último ID inserido (no modo pool, pela thread atual)"""
+        if self.pool is None:
+            return self.cursor.lastrowid
+        return getattr(self._local, 'last_insert_id', None)
 
     # =====================================================
     # MÉTODOS PARA USUÁRIOS
@@ -167,6 +464,10 @@ class BossShoppDatabase:
     def get_products(self, category_slug: str = None, limit: int = None, 
                     featured_only: bool = False) -> List[Dict]:
         """Obter lista de produtos"""
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog.get_products(category_slug, limit, featured_only)
+        
         query = """
         SELECT p.*, c.name as category_name, c.slug as category_slug
         FROM products p
@@ -192,6 +493,10 @@ class BossShoppDatabase:
     
     def get_product_by_id(self, product_id: int) -> Optional[Dict]:
         """Obter produto por ID"""
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog.get_product_by_id(product_id)
+        
         query = """
         SELECT p.*, c.name as category_name, c.slug as category_slug
         FROM products p
@@ -217,6 +522,10 @@ class BossShoppDatabase:
     
     def get_categories(self) -> List[Dict]:
         """Obter todas as categorias ativas"""
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog.get_categories()
+        
         query = """
         SELECT c.*, COUNT(p.id) as product_count
         FROM categories c
@@ -227,6 +536,95 @@ class BossShoppDatabase:
         """
         return self.execute_query(query)
 
+    # =====================================================
+    # CATÁLOGO EM MEMÓRIA
+    # =====================================================
+    
+    def enable_catalog_snapshot(self, refresh_seconds: float = CATALOG_REFRESH_SECONDS) -> bool:
+        """
+        Passar a responder get_products, get_product_by_id e get_categories
+        a partir de uma cópia do catálogo em memória, sem consultar o banco.
+        
+        No modo pool uma thread em segundo plano verifica a versão do
+        catálogo a cada refresh_seconds e monta uma nova cópia quando ela
+        muda; as leituras continuam usando a cópia anterior até a troca. No
+        modo de conexão única a conexão não pode ser compartilhada com outra
+        thread, então cabe ao chamador executar refresh_catalog().
+        """
+        if not self.refresh_catalog():
+            return False
+        if self.pool is not None and refresh_seconds and self._catalog_stop is None:
+            self._catalog_stop = threading.Event()
+            threading.Thread(
+                target=self._catalog_loop, args=(refresh_seconds, self._catalog_stop),
+                name='catalog-snapshot', daemon=True
+            ).start()
+        return True
+    
+    def disable_catalog_snapshot(self):
+        """Voltar a consultar o banco em cada leitura do catálogo"""
+        if self._catalog_stop is not None:
+            self._catalog_stop.set()
+            self._catalog_stop = None
+        self._catalog = None
+    
+    def _catalog_loop(self, refresh_seconds: float, stop: threading.Event):
+        while not stop.wait(refresh_seconds):
+            self.refresh_catalog()
+    
+    def refresh_catalog(self, force: bool = False) -> bool:
+        """
+        Montar uma nova cópia do catálogo se a versão mudou. A versão é a
+        contagem e o maior updated_at de products e categories; como
+        updated_at tem resolução de segundos, uma cópia montada no mesmo
+        segundo da última alteração é refeita na verificação seguinte.
+        
+        A leitura termina com commit para encerrar a transação: sob
+        REPEATABLE READ uma transação aberta faria as próximas verificações
+        enxergarem sempre a mesma versão.
+        """
+        try:
+            with self.pooled_cursor(commit=True) as cursor:
+                cursor.execute("""
+                SELECT (SELECT COUNT(*) FROM products) AS product_count,
+                       (SELECT MAX(updated_at) FROM products) AS product_updated,
+                       (SELECT COUNT(*) FROM categories) AS category_count,
+                       (SELECT MAX(updated_at) FROM categories) AS category_updated,
+                       NOW() AS checked_at
+                """)
+                row = cursor.fetchone()
+                version = (row['product_count'], row['product_updated'],
+                           row['category_count'], row['category_updated'])
+                current = self._catalog
+                if not force and current is not None and current.settled and current.version == version:
+                    return True
+                settled = all(updated is None or updated < row['checked_at']
+                              for updated in (row['product_updated'], row['category_updated']))
+                
+                cursor.execute("""
+                SELECT p.*, c.name as category_name, c.slug as category_slug,
+                       c.is_active as category_active
+                FROM products p
+                JOIN categories c ON p.category_id = c.id
+                WHERE p.is_active = TRUE
+                ORDER BY p.created_at DESC, p.id DESC
+                """)
+                products = cursor.fetchall()
+                cursor.execute("""
+                SELECT c.*
+                FROM categories c
+                WHERE c.is_active = TRUE
+                ORDER BY c.sort_order, c.name
+                """)
+                categories = cursor.fetchall()
+            
+            self._catalog = CatalogSnapshot(version, settled, products, categories)
+            logger.info(f"Catálogo em memória atualizado: {len(products)} produtos")
+            return True
+        except Error as e:
+            logger.error(f"Erro ao atualizar catálogo em memória: {e}")
+            return False
+
     # =====================================================
     # MÉTODOS PARA CARRINHO
     # =====================================================
@@ -323,43 +721,76 @@ class BossShoppDatabase:
     
     def create_order(self, user_id: int, items: List[Dict], 
                     shipping_address_id: int, payment_method: str, **kwargs) -> Optional[int]:
-        """Criar novo pedido"""
+        """
+        Criar novo pedido em uma única transação: insere o pedido, todos os
+        itens (executemany), baixa o estoque com UPDATE condicional, registra
+        stock_movements e limpa o carrinho. Se algum produto não tiver
+        estoque suficiente nada é gravado e o retorno é None.
+        """
+        # Quantidade total por produto (o mesmo produto pode vir repetido)
+        quantities = {}
+        for item in items:
+            quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+        
+        total_amount = sum(Decimal(str(item['price'])) * item['quantity'] for item in items)
+        
+        order_query = """
+        INSERT INTO orders (user_id, total_amount, shipping_address_id, 
+                          payment_method, status, payment_status)
+        VALUES (%s, %s, %s, %s, 'pending', 'pending')
+        """
+        item_query = """
+        INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price)
+        VALUES (%s, %s, %s, %s, %s)
+        """
+        stock_query = """
+        UPDATE products
+        SET stock_quantity = stock_quantity - %s
+        WHERE id = %s AND stock_quantity >= %s
+        """
+        movement_query = """
+        INSERT INTO stock_movements (product_id, movement_type, quantity, reference_type, reference_id)
+        VALUES (%s, 'out', %s, 'sale', %s)
+        """
+        
         try:
-            # Calcular total
-            total_amount = sum(Decimal(str(item['price'])) * item['quantity'] for item in items)
-            
-            # Inserir pedido
-            order_query = """
-            INSERT INTO orders (user_id, total_amount, shipping_address_id, 
-                              payment_method, status, payment_status)
-            VALUES (%s, %s, %s, %s, 'pending', 'pending')
-            """
-            
-            if self.execute_update(order_query, (user_id, total_amount, shipping_address_id, payment_method)):
-                order_id = self.get_last_insert_id()
+            with self.pooled_cursor(commit=True) as cursor:
+                cursor.execute("START TRANSACTION")
                 
-                # Inserir itens do pedido
+                # Baixa condicional primeiro: trava as linhas dos produtos e
+                # falha sem gravar nada se faltar estoque
+                cursor.executemany(stock_query, [
+                    (quantity, product_id, quantity)
+                    for product_id, quantity in quantities.items()
+                ])
+                if cursor.rowcount != len(quantities):
+                    raise InsufficientStockError("Estoque insuficiente para um ou mais produtos")
+                
+                cursor.execute(order_query, (user_id, total_amount, shipping_address_id, payment_method))
+                order_id = cursor.lastrowid
+                
+                item_rows = []
                 for item in items:
-                    item_query = """
-                    INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price)
-                    VALUES (%s, %s, %s, %s, %s)
-                    """
                     unit_price = Decimal(str(item['price']))
-                    total_price = unit_price * item['quantity']
-                    
-                    self.execute_update(item_query, (
-                        order_id, item['product_id'], item['quantity'], 
-                        unit_price, total_price
+                    item_rows.append((
+                        order_id, item['product_id'], item['quantity'],
+                        unit_price, unit_price * item['quantity']
                     ))
+                cursor.executemany(item_query, item_rows)
                 
-                # Limpar carrinho
-                self.clear_cart(user_id)
-                
-                return order_id
+                cursor.executemany(movement_query, [
+                    (product_id, quantity, order_id)
+                    for product_id, quantity in quantities.items()
+                ])
                 
-        except Exception as e:
+                cursor.execute("DELETE FROM cart_items WHERE user_id = %s", (user_id,))
+            
+            return order_id
+        
+        except InsufficientStockError as e:
+            logger.warning(f"Pedido recusado: {e}")
+        except Error as e:
             logger.error(f"Erro ao criar pedido: {e}")
-            self.connection.rollback()
         
         return None
     
@@ -480,55 +911,266 @@ class BossShoppDatabase:
     # MÉTODOS PARA RELATÓRIOS E ESTATÍSTICAS
     # =====================================================
     
-    def get_sales_statistics(self, start_date: datetime = None, end_date: datetime = None) -> Dict:
-        """Obter estatísticas de vendas"""
-        where_clause = "WHERE o.status IN ('delivered', 'shipped')"
-        params = []
+    def refresh_sales_rollups(self, lag_seconds: int = ROLLUP_LAG_SECONDS) -> Optional[Dict]:
+        """
+        Atualizar incrementalmente as tabelas de rollup (sales_hourly,
+        sales_daily, product_sales_daily, product_sales_totals e
+        user_totals).
         
-        if start_date:
-            where_clause += " AND o.created_at >= %s"
-            params.append(start_date)
+        Só as horas com pedidos alterados desde a marca d'água em
+        orders.updated_at (e com usuários novos desde a marca em
+        users.created_at) são recalculadas, cada uma por inteiro a partir
+        do índice de created_at; por isso reprocessar uma hora é inofensivo
+        e a janela de `lag_seconds` antes da marca cobre transações que
+        confirmaram depois da última atualização. Os totais de usuários
+        (user_totals) são recontados a cada execução. Tudo é gravado em uma
+        transação. Retorna quantas horas e dias foram recalculados.
         
-        if end_date:
-            where_clause += " AND o.created_at <= %s"
-            params.append(end_date)
+        As leituras de estatísticas não chamam este método: ele roda de
+        forma agendada (enable_rollup_refresh) ou quando o chamador pedir.
+        """
+        try:
+            with self.pooled_cursor(commit=True) as cursor:
+                cursor.execute("START TRANSACTION")
+                
+                order_hours, orders_mark = self._changed_hours(cursor, 'orders', 'updated_at', lag_seconds)
+                user_hours, users_mark = self._changed_hours(cursor, 'users', 'created_at', lag_seconds)
+                
+                for hour in sorted(order_hours):
+                    cursor.execute(f"""
+                        INSERT INTO sales_hourly (bucket_start, order_count, revenue,
+                                                  min_order_value, max_order_value)
+                        SELECT %s, COUNT(*), COALESCE(SUM(total_amount), 0),
+                               MIN(total_amount), MAX(total_amount)
+                        FROM orders
+                        WHERE created_at >= %s AND created_at < %s AND status IN ({_placeholders(SALES_STATUSES)})
+                        ON DUPLICATE KEY UPDATE
+                        order_count = VALUES(order_count), revenue = VALUES(revenue),
+                        min_order_value = VALUES(min_order_value), max_order_value = VALUES(max_order_value)
+                    """, (hour, hour, hour + timedelta(hours=1), *SALES_STATUSES))
+                
+                for hour in sorted(user_hours):
+                    cursor.execute("""
+                        INSERT INTO sales_hourly (bucket_start, new_users)
+                        SELECT %s, COUNT(*)
+                        FROM users
+                        WHERE created_at >= %s AND created_at < %s
+                        ON DUPLICATE KEY UPDATE new_users = VALUES(new_users)
+                    """, (hour, hour, hour + timedelta(hours=1)))
+                
+                days = {hour.date() for hour in order_hours | user_hours}
+                for day in sorted(days):
+                    start = datetime.combine(day, datetime.min.time())
+                    cursor.execute("""
+                        INSERT INTO sales_daily (sale_date, order_count, revenue,
+                                                 min_order_value, max_order_value, new_users)
+                        SELECT %s, COALESCE(SUM(order_count), 0), COALESCE(SUM(revenue), 0),
+                               MIN(min_order_value), MAX(max_order_value), COALESCE(SUM(new_users), 0)
+                        FROM sales_hourly
+                        WHERE bucket_start >= %s AND bucket_start < %s
+                        ON DUPLICATE KEY UPDATE
+                        order_count = VALUES(order_count), revenue = VALUES(revenue),
+                        min_order_value = VALUES(min_order_value), max_order_value = VALUES(max_order_value),
+                        new_users = VALUES(new_users)
+                    """, (day, start, start + timedelta(days=1)))
+                
+                for day in sorted({hour.date() for hour in order_hours}):
+                    self._refresh_product_day(cursor, day)
+                
+                cursor.execute("""
+                    INSERT INTO user_totals (id, total_users, active_users)
+                    SELECT 1, COUNT(*), COALESCE(SUM(is_active = TRUE), 0)
+                    FROM users
+                    ON DUPLICATE KEY UPDATE
+                    total_users = VALUES(total_users), active_users = VALUES(active_users)
+                """)
+                
+                for source, mark in (('orders', orders_mark), ('users', users_mark)):
+                    if mark is not None:
+                        cursor.execute("""
+                            INSERT INTO rollup_state (source, high_water) VALUES (%s, %s)
+                            ON DUPLICATE KEY UPDATE high_water = VALUES(high_water)
+                        """, (source, mark))
+            
+            return {'hours': len(order_hours | user_hours), 'days': len(days)}
+        
+        except Error as e:
+            logger.error(f"Erro ao atualizar rollups de vendas: {e}")
+            return None
+    
+    def enable_rollup_refresh(self, refresh_seconds: float = ROLLUP_REFRESH_SECONDS) -> bool:
+        """
+        Atualizar os rollups agora e, no modo pool, a cada refresh_seconds
+        em uma thread em segundo plano. No modo de conexão única cabe ao
+        chamador executar refresh_sales_rollups() periodicamente.
+        """
+        if self.refresh_sales_rollups() is None:
+            return False
+        if self.pool is not None and refresh_seconds and self._rollup_stop is None:
+            self._rollup_stop = threading.Event()
+            threading.Thread(
+                target=self._rollup_loop, args=(refresh_seconds, self._rollup_stop),
+                name='sales-rollups', daemon=True
+            ).start()
+        return True
+    
+    def disable_rollup_refresh(self):
+        """Parar a atualização agendada dos rollups"""
+        if self._rollup_stop is not None:
+            self._rollup_stop.set()
+            self._rollup_stop = None
+    
+    def _rollup_loop(self, refresh_seconds: float, stop: threading.Event):
+        while not stop.wait(refresh_seconds):
+            self.refresh_sales_rollups()
+    
+    @staticmethod
+    def _changed_hours(cursor, table: str, column: str, lag_seconds: int) -> Tuple[set, Optional[datetime]]:
+        """Horas (de created_at) com linhas de `table` alteradas desde a marca d'água e a nova marca"""
+        # FOR UPDATE serializa atualizações concorrentes dos rollups
+        cursor.execute("INSERT IGNORE INTO rollup_state (source) VALUES (%s)", (table,))
+        cursor.execute("SELECT high_water FROM rollup_state WHERE source = %s FOR UPDATE", (table,))
+        high_water = cursor.fetchone()['high_water']
+        since = high_water - timedelta(seconds=lag_seconds) if high_water else ROLLUP_EPOCH
+        
+        cursor.execute(f"""
+            SELECT DISTINCT TIMESTAMP(DATE(created_at), MAKETIME(HOUR(created_at), 0, 0)) AS bucket
+            FROM {table}
+            WHERE {column} >= %s
+        """, (since,))
+        hours = {row['bucket'] for row in cursor.fetchall()}
+        
+        cursor.execute(f"SELECT MAX({column}) AS mark FROM {table} WHERE {column} >= %s", (since,))
+        return hours, cursor.fetchone()['mark']
+    
+    @staticmethod
+    def _refresh_product_day(cursor, day):
+        """Recalcular as unidades vendidas por produto em um dia e ajustar os totais"""
+        start = datetime.combine(day, datetime.min.time())
+        
+        # Retirar dos totais o que o dia contribuía antes
+        cursor.execute("""
+            UPDATE product_sales_totals t
+            JOIN product_sales_daily d ON d.product_id = t.product_id
+            SET t.units = t.units - d.units, t.revenue = t.revenue - d.revenue
+            WHERE d.sale_date = %s
+        """, (day,))
+        cursor.execute("DELETE FROM product_sales_daily WHERE sale_date = %s", (day,))
+        
+        cursor.execute(f"""
+            INSERT INTO product_sales_daily (sale_date, product_id, units, revenue)
+            SELECT %s, oi.product_id, SUM(oi.quantity), SUM(oi.total_price)
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.id
+            WHERE o.created_at >= %s AND o.created_at < %s AND o.status IN ({_placeholders(SALES_STATUSES)})
+            GROUP BY oi.product_id
+        """, (day, start, start + timedelta(days=1), *SALES_STATUSES))
+        
+        cursor.execute("""
+            INSERT INTO product_sales_totals (product_id, units, revenue)
+            SELECT product_id, units, revenue
+            FROM product_sales_daily
+            WHERE sale_date = %s
+            ON DUPLICATE KEY UPDATE units = units + VALUES(units), revenue = revenue + VALUES(revenue)
+        """, (day,))
+    
+    def get_sales_statistics(self, start_date: datetime = None, end_date: datetime = None,
+                             refresh: bool = False) -> Dict:
+        """
+        Obter estatísticas de vendas dos pedidos com created_at entre
+        start_date e end_date (inclusive). Os dias inteiros do período (ou,
+        quando um limite não cai à meia-noite, as horas inteiras) vêm de
+        sales_daily/sales_hourly; as pontas que não fecham um dia ou uma
+        hora, e o instante de end_date, são somadas direto de orders pelo
+        índice de created_at. refresh=True atualiza os rollups antes da
+        leitura.
+        """
+        if refresh:
+            self.refresh_sales_rollups()
+        
+        start, end = (_as_datetime(value) for value in (start_date, end_date))
+        if all(value is None or _at_midnight(value) for value in (start, end)):
+            table, column, bucket = 'sales_daily', 'sale_date', timedelta(days=1)
+        else:
+            table, column, bucket = 'sales_hourly', 'bucket_start', timedelta(hours=1)
+        
+        # Baldes inteiros [first, last) dentro do período
+        first, last = _bucket_ceil(start, bucket), _bucket_floor(end, bucket)
+        if first is not None and last is not None and first >= last:
+            # O período não cobre nenhum balde inteiro: só os pedidos
+            use_rollup, edges = False, [(start, '<=', end)]
+        else:
+            use_rollup, edges = True, []
+            if start is not None and start < first:
+                edges.append((start, '<', first))
+            if end is not None:
+                edges.append((last, '<=', end))
+        
+        parts = []
+        params = []
+        if use_rollup:
+            conditions = []
+            if first is not None:
+                conditions.append(f"{column} >= %s")
+                params.append(first)
+            if last is not None:
+                conditions.append(f"{column} < %s")
+                params.append(last)
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            parts.append(f"""
+            SELECT order_count, revenue, min_order_value, max_order_value
+            FROM {table}
+            {where_clause}
+            """)
+        if edges:
+            ranges = ' OR '.join(f"(created_at >= %s AND created_at {operator} %s)" for _, operator, _ in edges)
+            parts.append(f"""
+            SELECT COUNT(*) AS order_count, SUM(total_amount) AS revenue,
+                   MIN(total_amount) AS min_order_value, MAX(total_amount) AS max_order_value
+            FROM orders
+            WHERE status IN ({_placeholders(SALES_STATUSES)}) AND ({ranges})
+            """)
+            params.extend(SALES_STATUSES)
+            for lower, _, upper in edges:
+                params.extend((lower, upper))
         
         query = f"""
         SELECT 
-            COUNT(*) as total_orders,
-            SUM(total_amount) as total_revenue,
-            AVG(total_amount) as average_order_value,
-            MIN(total_amount) as min_order_value,
-            MAX(total_amount) as max_order_value
-        FROM orders o
-        {where_clause}
+            COALESCE(SUM(order_count), 0) as total_orders,
+            SUM(revenue) as total_revenue,
+            SUM(revenue) / NULLIF(SUM(order_count), 0) as average_order_value,
+            MIN(min_order_value) as min_order_value,
+            MAX(max_order_value) as max_order_value
+        FROM ({' UNION ALL '.join(parts)}) AS parts
         """
         
         result = self.execute_query(query, tuple(params) if params else None)
         return result[0] if result else {}
     
-    def get_top_products(self, limit: int = 10) -> List[Dict]:
-        """Obter produtos mais vendidos"""
+    def get_top_products(self, limit: int = 10, refresh: bool = False) -> List[Dict]:
+        """Obter produtos mais vendidos (totais acumulados em product_sales_totals)"""
+        if refresh:
+            self.refresh_sales_rollups()
         query = """
-        SELECT p.*, SUM(oi.quantity) as total_sold
-        FROM products p
-        JOIN order_items oi ON p.id = oi.product_id
-        JOIN orders o ON oi.order_id = o.id
-        WHERE o.status IN ('delivered', 'shipped')
-        GROUP BY p.id
-        ORDER BY total_sold DESC
+        SELECT p.*, t.units as total_sold
+        FROM product_sales_totals t
+        JOIN products p ON p.id = t.product_id
+        WHERE t.units > 0
+        ORDER BY t.units DESC
         LIMIT %s
         """
         return self.execute_query(query, (limit,))
     
-    def get_user_statistics(self) -> Dict:
-        """Obter estatísticas de usuários"""
+    def get_user_statistics(self, refresh: bool = False) -> Dict:
+        """Obter estatísticas de usuários (totais de user_totals, novos usuários de sales_hourly)"""
+        if refresh:
+            self.refresh_sales_rollups()
         query = """
         SELECT 
-            COUNT(*) as total_users,
-            COUNT(CASE WHEN created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY) THEN 1 END) as new_users_30_days,
-            COUNT(CASE WHEN is_active = TRUE THEN 1 END) as active_users
-        FROM users
+            COALESCE((SELECT total_users FROM user_totals WHERE id = 1), 0) as total_users,
+            (SELECT COALESCE(SUM(new_users), 0) FROM sales_hourly
+             WHERE bucket_start >= DATE_SUB(NOW(), INTERVAL 30 DAY)) as new_users_30_days,
+            COALESCE((SELECT active_users FROM user_totals WHERE id = 1), 0) as active_users
         """
         result = self.execute_query(query)
         return result[0] if result else {}
@@ -629,7 +1271,8 @@ def main():
                 cart_items = db.get_cart_items(user_id)
                 print(f"Carrinho tem {len(cart_items)} itens")
         
-        # Exemplo: Estatísticas
+        # Exemplo: Estatísticas (lidas dos rollups, atualizados antes)
+        db.refresh_sales_rollups()
         stats = db.get_sales_statistics()
         print(f"Estatísticas de vendas: {stats}")
         
@@ -144,7 +144,8 @@ CREATE TABLE orders (
     INDEX idx_status (status),
     INDEX idx_payment_status (payment_status),
     INDEX idx_order_number (order_number),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- Tabela de itens do pedido
@@ -342,6 +343,59 @@ CREATE TABLE system_settings (
     INDEX idx_active (is_active)
 );
 
+-- Tabelas de resumo (rollup) das vendas, mantidas incrementalmente por
+-- BossShoppDatabase.refresh_sales_rollups a partir de orders.updated_at
+CREATE TABLE sales_hourly (
+    bucket_start DATETIME PRIMARY KEY,
+    order_count INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    min_order_value DECIMAL(10, 2) NULL,
+    max_order_value DECIMAL(10, 2) NULL,
+    new_users INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE sales_daily (
+    sale_date DATE PRIMARY KEY,
+    order_count INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    min_order_value DECIMAL(10, 2) NULL,
+    max_order_value DECIMAL(10, 2) NULL,
+    new_users INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE product_sales_daily (
+    sale_date DATE NOT NULL,
+    product_id INT NOT NULL,
+    units INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    
+    PRIMARY KEY (sale_date, product_id),
+    INDEX idx_product (product_id)
+);
+
+CREATE TABLE product_sales_totals (
+    product_id INT PRIMARY KEY,
+    units INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0.00,
+    
+    INDEX idx_units (units)
+);
+
+-- Marca d'água (high-water mark) de cada fonte já incorporada aos rollups
+CREATE TABLE rollup_state (
+    source VARCHAR(50) PRIMARY KEY,
+    high_water TIMESTAMP NULL,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Totais de usuários, recalculados por refresh_sales_rollups
+CREATE TABLE user_totals (
+    id TINYINT PRIMARY KEY,
+    total_users INT NOT NULL DEFAULT 0,
+    active_users INT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
 -- =====================================================
 -- INSERÇÃO DE DADOS INICIAIS
 -- =====================================================
@@ -447,18 +501,11 @@ BEGIN
     END IF;
 END//
 
--- Trigger para atualizar estoque após inserir item do pedido
-CREATE TRIGGER update_stock_after_order
-AFTER INSERT ON order_items
-FOR EACH ROW
-BEGIN
-    UPDATE products 
-    SET stock_quantity = stock_quantity - NEW.quantity
-    WHERE id = NEW.product_id;
-    
-    INSERT INTO stock_movements (product_id, movement_type, quantity, reference_type, reference_id)
-    VALUES (NEW.product_id, 'out', NEW.quantity, 'sale', NEW.order_id);
-END//
+-- A baixa de estoque e o registro em stock_movements são feitos por
+-- BossShoppDatabase.create_order, na mesma transação do pedido e com
+-- UPDATE condicional (evita venda acima do estoque). O antigo trigger
+-- update_stock_after_order duplicaria a baixa e é removido aqui.
+DROP TRIGGER IF EXISTS update_stock_after_order//
 
 DELIMITER ;
 
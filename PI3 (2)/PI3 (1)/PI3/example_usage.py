@@ -436,6 +436,8 @@ def main():
         
         print_subsection("Estatísticas de vendas")
         
+        # As leituras usam os rollups como estão; atualizá-los antes do relatório
+        db.refresh_sales_rollups()
         sales_stats = db.get_sales_statistics()
         if sales_stats and sales_stats.get('total_orders', 0) > 0:
             print("📊 Estatísticas de vendas:")
@@ -1,9 +1,94 @@
 #!/usr/bin/env python3
 """
-Script para gerar páginas HTML para todas as categorias
+Script para gerar o catálogo estático: páginas de categoria paginadas, uma
+página por produto, cópias pré-comprimidas e sitemap.xml
+
+Uso:
+    python generate_category_pages.py                  # reescreve todas as páginas
+    python generate_category_pages.py --incremental    # grava só as páginas que mudaram
+    python generate_category_pages.py --watch          # regenera as páginas afetadas a cada alteração
+
+Os produtos ativos vêm de uma única consulta com janela (ROW_NUMBER por
+categoria, do mais bem avaliado para o menos) e são processados categoria a
+categoria, sem carregar o catálogo inteiro na memória. Cada página gerada
+ganha cópias .gz e .br (se o pacote brotli estiver instalado) para o
+servidor ou CDN entregar direto do disco.
+
+asset-manifest.json registra, para cada arquivo, o hash SHA-256 do conteúdo
+e o hash das entradas que o determinam (templates e dados). No modo
+incremental páginas com as mesmas entradas nem são renderizadas e páginas
+com o mesmo conteúdo não são regravadas, preservando o cache do CDN; o
+deploy envia apenas os arquivos de "changed" (com suas cópias comprimidas)
+e apaga os de "removed".
 """
 
+import argparse
+import gzip
+import hashlib
+import json
+import os
 import sqlite3
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from xml.sax.saxutils import escape
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+try:
+    import brotli
+except ImportError:  # sem o pacote as cópias .br não são geradas
+    brotli = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(SCRIPT_DIR, "bossshopp_complete.db")
+DEFAULT_OUTPUT = os.path.join(SCRIPT_DIR, "PI2", "frontend")
+DEFAULT_BASE_URL = "https://www.bossshopp.com"
+MANIFEST_FILE = "asset-manifest.json"
+SITEMAP_FILE = "sitemap.xml"
+TEMPLATE_DIR = os.path.join(SCRIPT_DIR, "templates")
+CATEGORY_TEMPLATE = "category_page.html"
+PRODUCT_TEMPLATE = "product_page.html"
+
+# Produtos por página de categoria
+PRODUCTS_PER_PAGE = 12
+
+# Limite de URLs por arquivo do protocolo de sitemaps
+SITEMAP_MAX_URLS = 50000
+
+# Abaixo disso renderizar no próprio processo é mais rápido que usar o pool
+PARALLEL_MIN_PAGES = 32
+
+# Páginas renderizadas por lote; limita a memória em catálogos grandes
+RENDER_BATCH_SIZE = 2048
+
+GZIP_LEVEL = 9
+# Nas páginas do catálogo a qualidade 11 comprime ~10% a mais, mas é ~70x
+# mais lenta que a 6 (17 ms contra 0,2 ms por página)
+BROTLI_QUALITY = 6
+
+_environment = None
+
+Category = namedtuple('Category', 'id name slug description')
+Product = namedtuple(
+    'Product',
+    'id name description price old_price stock_quantity sku rating review_count image_url updated_at'
+)
+
+CATALOG_QUERY = """
+    SELECT c.id, c.name, c.slug, c.description,
+           p.id, p.name, p.description, p.price, p.old_price, p.stock_quantity, p.sku,
+           p.rating, p.review_count, p.image_url, p.updated_at
+    FROM categories c
+    LEFT JOIN (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY category_id ORDER BY rating DESC, id) AS position
+        FROM products
+        WHERE is_active = 1
+    ) p ON p.category_id = c.id
+    WHERE c.is_active = 1
+    ORDER BY c.sort_order, c.id, p.position
+"""
 
 # Definir ícones para cada categoria
 CATEGORY_ICONS = {
@@ -45,522 +130,407 @@ PRODUCT_ICONS = {
     'papelaria': ['fa-book', 'fa-pen', 'fa-backpack']
 }
 
-def generate_category_page(category_name, category_slug, category_description, products, icon):
-    """Gera uma página HTML para uma categoria"""
-    
-    # Gerar cards de produtos
-    products_html = ""
+def get_environment():
+    """
+    Ambiente Jinja do processo: cada template é compilado uma vez e só é
+    recompilado se o arquivo mudar
+    """
+    global _environment
+    if _environment is None:
+        _environment = Environment(
+            loader=FileSystemLoader(TEMPLATE_DIR),
+            autoescape=select_autoescape(['html']),
+        )
+    return _environment
+
+def template_digest():
+    """Hash dos templates; entra no hash de entrada de cada página"""
+    digest = hashlib.sha256()
+    for name in (CATEGORY_TEMPLATE, PRODUCT_TEMPLATE):
+        with open(os.path.join(TEMPLATE_DIR, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def category_filename(slug, page=1):
+    return f"categoria-{slug}.html" if page == 1 else f"categoria-{slug}-pagina-{page}.html"
+
+def product_filename(product_id):
+    return f"produto-{product_id}.html"
+
+def format_brl(value):
+    """1234.5 -> '1.234,50'"""
+    return f"{value:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
+
+def product_context(idx, product, product_icons):
+    return {
+        'number': idx + 1,
+        'icon': product_icons[idx % len(product_icons)],
+        'url': product_filename(product.id),
+        'name': product.name,
+        'description': product.description,
+        'price': f"{product.price:.2f}",
+        'old_price': f"{product.old_price:.2f}" if product.old_price else None,
+        'stars': '★' * int(product.rating) + '☆' * (5 - int(product.rating)),
+        'review_count': product.review_count,
+    }
+
+def generate_category_page(category_name, category_slug, category_description, products, icon,
+                           page=1, page_count=1):
+    """Gera uma página HTML (uma página da listagem) para uma categoria"""
+    product_icons = PRODUCT_ICONS.get(category_slug, ['fa-box'])
+    offset = (page - 1) * PRODUCTS_PER_PAGE
+    return get_environment().get_template(CATEGORY_TEMPLATE).render(
+        category_name=category_name,
+        category_description=category_description,
+        icon=icon,
+        products=[product_context(offset + idx, product, product_icons) for idx, product in enumerate(products)],
+        page=page,
+        page_count=page_count,
+        previous_url=category_filename(category_slug, page - 1) if page > 1 else None,
+        next_url=category_filename(category_slug, page + 1) if page < page_count else None,
+    )
+
+def generate_product_page(category_name, category_slug, product, base_url=DEFAULT_BASE_URL):
+    """Gera a página de detalhes de um produto"""
+    price = product.price
+    old_price = product.old_price if product.old_price and product.old_price > price else None
+    full_stars = int(product.rating)
+    half_star = product.rating - full_stars >= 0.5
+    stars = (['fas fa-star'] * full_stars + ['fas fa-star-half-alt'] * half_star
+             + ['far fa-star'] * (5 - full_stars - half_star))
     product_icons = PRODUCT_ICONS.get(category_slug, ['fa-box'])
     
-    for idx, product in enumerate(products):
-        icon_class = product_icons[idx % len(product_icons)]
-        old_price_html = f'<span class="product-old-price">R$ {product[3]:.2f}</span>' if product[3] else ''
-        
-        stars = '★' * int(product[6]) + '☆' * (5 - int(product[6]))
-        
-        products_html += f'''
-                <!-- Produto {idx + 1} -->
-                <div class="product-card">
-                    <div class="product-image">
-                        <i class="fas {icon_class}"></i>
-                    </div>
-                    <div class="product-info">
-                        <h3 class="product-name">{product[0]}</h3>
-                        <p class="product-description">{product[1]}</p>
-                        <div class="product-rating">
-                            <span class="stars">{stars}</span>
-                            <span class="rating-count">({product[7]})</span>
-                        </div>
-                        <div class="product-price">
-                            R$ {product[2]:.2f}
-                            {old_price_html}
-                        </div>
-                        <button class="add-to-cart-btn">
-                            <i class="fas fa-shopping-cart"></i> Adicionar ao Carrinho
-                        </button>
-                    </div>
-                </div>
-'''
+    return get_environment().get_template(PRODUCT_TEMPLATE).render(
+        product=product,
+        category_name=category_name,
+        category_url=category_filename(category_slug),
+        canonical_url=f"{base_url}/{product_filename(product.id)}",
+        icon=product_icons[product.id % len(product_icons)],
+        stars=stars,
+        rating=f"{product.rating:.1f}",
+        price=format_brl(price),
+        old_price=format_brl(old_price) if old_price else None,
+        savings=format_brl(old_price - price) if old_price else None,
+        discount=round((old_price - price) / old_price * 100) if old_price else None,
+        installment=format_brl(price / 12),
+        max_quantity=max(1, min(product.stock_quantity or 0, 10)),
+    )
+
+RENDERERS = {
+    'category': generate_category_page,
+    'product': generate_product_page,
+}
+
+def compressed_variants(data):
+    """Conteúdo e cópias pré-comprimidas, por sufixo do arquivo"""
+    variants = {'': data, '.gz': gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=BROTLI_QUALITY)
+    return variants
+
+def render_task(task):
+    """
+    Renderiza uma página (executado nos processos do pool). Se o conteúdo
+    tem o mesmo hash da versão já publicada, nada é comprimido nem devolvido.
+    """
+    kind, filename, inputs, published_sha, args = task
+    data = RENDERERS[kind](*args).encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    variants = None if digest == published_sha else compressed_variants(data)
+    return filename, inputs, digest, len(data), variants
+
+def render_pages(tasks, executor=None, jobs=1):
+    """Renderiza as páginas, em paralelo quando há um pool e páginas suficientes"""
+    if executor is None or len(tasks) < PARALLEL_MIN_PAGES:
+        return map(render_task, tasks)
+    return executor.map(render_task, tasks, chunksize=max(1, len(tasks) // (jobs * 4)))
+
+def fetch_catalog(conn):
+    """
+    Itera (Category, [Product, ...]) com os produtos ativos de cada
+    categoria ativa, do mais bem avaliado para o menos, lendo uma única
+    consulta categoria a categoria.
+    """
+    rows = conn.execute(CATALOG_QUERY)
+    for category, group in groupby(rows, key=lambda row: row[:4]):
+        products = [Product(*row[4:]) for row in group if row[4] is not None]
+        yield Category(*category), products
+
+def input_digest(template_version, kind, args):
+    """Hash de tudo que determina uma página: templates e dados"""
+    return hashlib.sha256(repr((template_version, kind, args)).encode('utf-8')).hexdigest()
+
+def iter_pages(conn, base_url, empty):
+    """
+    Itera (tipo, arquivo, argumentos do renderer, lastmod) de todas as
+    páginas do catálogo. Categorias sem produtos vão para a lista `empty`.
+    """
+    for category, products in fetch_catalog(conn):
+        if not products:
+            empty.append(category.name)
+            continue
+        
+        icon = CATEGORY_ICONS.get(category.slug, 'fa-box')
+        lastmod = max(product.updated_at or '' for product in products)
+        page_count = (len(products) + PRODUCTS_PER_PAGE - 1) // PRODUCTS_PER_PAGE
+        for page in range(1, page_count + 1):
+            page_products = products[(page - 1) * PRODUCTS_PER_PAGE:page * PRODUCTS_PER_PAGE]
+            args = (category.name, category.slug, category.description, page_products, icon, page, page_count)
+            yield 'category', category_filename(category.slug, page), args, lastmod
+        
+        for product in products:
+            args = (category.name, category.slug, product, base_url)
+            yield 'product', product_filename(product.id), args, product.updated_at
+
+def load_manifest(output_dir):
+    """Hashes da última geração: {arquivo: {"sha256", "input", "bytes"}}"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f).get('pages', {})
+    except (OSError, ValueError):
+        return {}
+
+def write_file(path, content):
+    """Grava via arquivo temporário para nunca publicar uma página pela metade"""
+    tmp_path = path + '.tmp'
+    mode = 'wb' if isinstance(content, bytes) else 'w'
+    with open(tmp_path, mode, **({} if mode == 'wb' else {'encoding': 'utf-8'})) as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def write_variants(output_dir, filename, variants):
+    for suffix in ('', '.gz', '.br'):
+        path = os.path.join(output_dir, filename + suffix)
+        if suffix in variants:
+            write_file(path, variants[suffix])
+        elif os.path.exists(path):
+            # Cópia de uma geração anterior que não seria mais atualizada
+            os.remove(path)
+
+def remove_variants(output_dir, filename):
+    for suffix in ('', '.gz', '.br'):
+        path = os.path.join(output_dir, filename + suffix)
+        if os.path.exists(path):
+            os.remove(path)
+
+class SitemapWriter:
+    """
+    Grava o sitemap em streaming, uma URL por vez, sem montar a lista na
+    memória. Até SITEMAP_MAX_URLS URLs o resultado é um único sitemap.xml;
+    acima disso sitemap.xml vira um índice de sitemap-1.xml, sitemap-2.xml...
+    close() devolve {arquivo: conteúdo em bytes ou None se não mudou}.
+    """
+    HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+    NAMESPACE = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
     
-    html_content = f'''<!DOCTYPE html>
-<html lang="pt-BR">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{category_name} - BOSS SHOPP</title>
-    <link rel="stylesheet" href="optimized-styles.css">
-    <link rel="stylesheet" href="panel-buttons.css">
-    <link rel="stylesheet" href="pages.css">
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-    <link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;500;600;700;800;900&display=swap" rel="stylesheet">
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Montserrat', sans-serif;
-            background: #f8f9fa;
-        }}
-        
-        .category-header {{
-            background: linear-gradient(135deg, #ff6b35 0%, #ff8c42 50%, #ffa45c 100%);
-            padding: 80px 0;
-            color: white;
-            text-align: center;
-            position: relative;
-            overflow: hidden;
-        }}
-        
-        .category-header::before {{
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: radial-gradient(circle at 20% 50%, rgba(255,255,255,0.2) 0%, transparent 50%),
-                        radial-gradient(circle at 80% 50%, rgba(255,255,255,0.15) 0%, transparent 50%);
-            animation: pulse 8s ease-in-out infinite;
-        }}
-        
-        @keyframes pulse {{
-            0%, 100% {{ opacity: 0.5; }}
-            50% {{ opacity: 1; }}
-        }}
-        
-        .category-header h1 {{
-            font-size: 3rem;
-            margin-bottom: 15px;
-            font-weight: 900;
-            text-shadow: 0 4px 10px rgba(0,0,0,0.2);
-            position: relative;
-            z-index: 1;
-            animation: slideDown 0.8s ease-out;
-        }}
-        
-        @keyframes slideDown {{
-            from {{
-                opacity: 0;
-                transform: translateY(-30px);
-            }}
-            to {{
-                opacity: 1;
-                transform: translateY(0);
-            }}
-        }}
-        
-        .category-header h1 i {{
-            margin-right: 15px;
-            animation: bounce 2s ease-in-out infinite;
-        }}
-        
-        @keyframes bounce {{
-            0%, 100% {{ transform: translateY(0); }}
-            50% {{ transform: translateY(-10px); }}
-        }}
-        
-        .category-header p {{
-            font-size: 1.3rem;
-            opacity: 0.95;
-            position: relative;
-            z-index: 1;
-            animation: slideUp 0.8s ease-out;
-        }}
-        
-        @keyframes slideUp {{
-            from {{
-                opacity: 0;
-                transform: translateY(30px);
-            }}
-            to {{
-                opacity: 1;
-                transform: translateY(0);
-            }}
-        }}
-        
-        .products-section {{
-            padding: 80px 0;
-            background: white;
-        }}
-        
-        .products-section h2 {{
-            text-align: center;
-            font-size: 2.5rem;
-            color: #333;
-            margin-bottom: 50px;
-            font-weight: 800;
-            position: relative;
-        }}
-        
-        .products-section h2::after {{
-            content: '';
-            position: absolute;
-            bottom: -15px;
-            left: 50%;
-            transform: translateX(-50%);
-            width: 100px;
-            height: 4px;
-            background: linear-gradient(90deg, #ff6b35, #ff8c42, #ffa45c);
-            border-radius: 2px;
-        }}
-        
-        .products-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(280px, 1fr));
-            gap: 35px;
-            margin-top: 50px;
-        }}
-        
-        .product-card {{
-            background: white;
-            border-radius: 20px;
-            overflow: hidden;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.08);
-            transition: all 0.4s cubic-bezier(0.175, 0.885, 0.32, 1.275);
-            border: 2px solid rgba(255,107,53,0.1);
-            animation: cardAppear 0.6s ease-out backwards;
-        }}
-        
-        @keyframes cardAppear {{
-            from {{
-                opacity: 0;
-                transform: translateY(30px) scale(0.9);
-            }}
-            to {{
-                opacity: 1;
-                transform: translateY(0) scale(1);
-            }}
-        }}
-        
-        .product-card:nth-child(1) {{ animation-delay: 0.1s; }}
-        .product-card:nth-child(2) {{ animation-delay: 0.2s; }}
-        .product-card:nth-child(3) {{ animation-delay: 0.3s; }}
-        .product-card:nth-child(4) {{ animation-delay: 0.4s; }}
-        
-        .product-card:hover {{
-            transform: translateY(-15px) scale(1.03);
-            box-shadow: 0 20px 50px rgba(255,107,53,0.2);
-            border-color: #ff6b35;
-        }}
-        
-        .product-image {{
-            width: 100%;
-            height: 250px;
-            background: linear-gradient(135deg, #fff5f0 0%, #ffe8dc 100%);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-size: 4rem;
-            color: #ff6b35;
-            position: relative;
-            overflow: hidden;
-        }}
-        
-        .product-image::before {{
-            content: '';
-            position: absolute;
-            width: 150%;
-            height: 150%;
-            background: radial-gradient(circle, rgba(255,107,53,0.1) 0%, transparent 70%);
-            animation: pulse 3s ease-in-out infinite;
-        }}
-        
-        .product-image i {{
-            position: relative;
-            z-index: 1;
-        }}
-        
-        @keyframes pulse {{
-            0%, 100% {{ transform: scale(1); opacity: 0.5; }}
-            50% {{ transform: scale(1.1); opacity: 0.8; }}
-        }}
-        
-        .product-info {{
-            padding: 25px;
-        }}
-        
-        .product-category {{
-            display: inline-block;
-            background: #fff5f0;
-            color: #ff6b35;
-            padding: 5px 15px;
-            border-radius: 20px;
-            font-size: 0.8rem;
-            font-weight: 700;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-            margin-bottom: 12px;
-        }}
-        
-        .product-name {{
-            font-size: 1.3rem;
-            font-weight: 700;
-            margin-bottom: 12px;
-            color: #333;
-            line-height: 1.4;
-        }}
-        
-        .product-description {{
-            font-size: 0.95rem;
-            color: #666;
-            margin-bottom: 15px;
-            line-height: 1.6;
-        }}
-        
-        .product-price {{
-            font-size: 1.5rem;
-            font-weight: 700;
-            color: #ff6b35;
-            margin-bottom: 15px;
-        }}
-        
-        .product-old-price {{
-            font-size: 1rem;
-            color: #999;
-            text-decoration: line-through;
-            margin-left: 10px;
-        }}
-        
-        .product-rating {{
-            display: flex;
-            align-items: center;
-            gap: 5px;
-            margin-bottom: 15px;
-        }}
-        
-        .stars {{
-            color: #ffc107;
-        }}
-        
-        .rating-count {{
-            color: #666;
-            font-size: 0.9rem;
-        }}
-        
-        .add-to-cart-btn {{
-            width: 100%;
-            padding: 14px;
-            background: linear-gradient(135deg, #ff6b35 0%, #ff8c42 100%);
-            color: white;
-            border: none;
-            border-radius: 30px;
-            font-weight: 700;
-            font-size: 1rem;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            box-shadow: 0 5px 15px rgba(255,107,53,0.3);
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-        
-        .add-to-cart-btn:hover {{
-            transform: translateY(-3px);
-            box-shadow: 0 8px 25px rgba(255,107,53,0.5);
-            background: linear-gradient(135deg, #ff8c42 0%, #ff6b35 100%);
-        }}
-        
-        .add-to-cart-btn i {{
-            margin-right: 8px;
-        }}
-        
-        .breadcrumb {{
-            padding: 25px 0;
-            font-size: 1rem;
-            background: white;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-        }}
-        
-        .breadcrumb a {{
-            color: #ff6b35;
-            text-decoration: none;
-            font-weight: 600;
-            transition: all 0.3s ease;
-        }}
-        
-        .breadcrumb a:hover {{
-            color: #ff8c42;
-            text-decoration: none;
-        }}
-        
-        .breadcrumb strong {{
-            color: #333;
-            font-weight: 700;
-        }}
-        
-        .container {{
-            max-width: 1400px;
-            margin: 0 auto;
-            padding: 0 20px;
-        }}
-    </style>
-</head>
-<body>
-    <!-- Header -->
-    <header class="header">
-        <div class="container">
-            <div class="header-top">
-                <div class="header-links">
-                    <a href="sobre.html" class="header-link">Sobre</a>
-                    <a href="atendimento.html" class="header-link">Atendimento</a>
-                    <a href="#" class="header-link">Vendedor</a>
-                    <a href="#" class="header-link">Download</a>
-                    <a href="#" class="header-link">Conecte-se</a>
-                </div>
-                <div class="header-social">
-                    <a href="#" class="social-link"><i class="fab fa-facebook"></i></a>
-                    <a href="#" class="social-link"><i class="fab fa-instagram"></i></a>
-                    <a href="#" class="social-link"><i class="fab fa-twitter"></i></a>
-                </div>
-            </div>
-        </div>
-    </header>
-
-    <!-- Navigation -->
-    <nav class="navbar">
-        <div class="container">
-            <div class="nav-content">
-                <div class="logo">
-                    <a href="index.html">
-                        <img src="boss-shop-logo.png" alt="BOSS SHOPP" class="logo-image">
-                    </a>
-                </div>
-                
-                <div class="search-bar">
-                    <input type="text" placeholder="Buscar produtos...">
-                    <button><i class="fas fa-search"></i></button>
-                </div>
-                
-                <div class="nav-icons">
-                    <a href="#" class="nav-icon"><i class="fas fa-user"></i></a>
-                    <a href="#" class="nav-icon"><i class="fas fa-heart"></i></a>
-                    <a href="#" class="nav-icon cart-icon">
-                        <i class="fas fa-shopping-cart"></i>
-                        <span class="cart-count">0</span>
-                    </a>
-                </div>
-            </div>
-        </div>
-    </nav>
-
-    <!-- Breadcrumb -->
-    <div class="container">
-        <div class="breadcrumb">
-            <a href="index.html">Home</a> / <a href="categorias.html">Categorias</a> / <strong>{category_name}</strong>
-        </div>
-    </div>
-
-    <!-- Category Header -->
-    <section class="category-header">
-        <div class="container">
-            <h1><i class="fas {icon}"></i> {category_name}</h1>
-            <p>{category_description}</p>
-        </div>
-    </section>
-
-    <!-- Products Section -->
-    <section class="products-section">
-        <div class="container">
-            <h2>Produtos em Destaque</h2>
-            <div class="products-grid">
-{products_html}
-            </div>
-        </div>
-    </section>
-
-    <!-- Footer -->
-    <footer class="footer">
-        <div class="container">
-            <div class="footer-content">
-                <div class="footer-section">
-                    <h3>BOSS SHOPP</h3>
-                    <p>Sua loja online de confiança</p>
-                </div>
-                <div class="footer-section">
-                    <h4>Links Rápidos</h4>
-                    <ul>
-                        <li><a href="index.html">Home</a></li>
-                        <li><a href="categorias.html">Categorias</a></li>
-                        <li><a href="sobre.html">Sobre</a></li>
-                        <li><a href="atendimento.html">Atendimento</a></li>
-                    </ul>
-                </div>
-                <div class="footer-section">
-                    <h4>Contato</h4>
-                    <p>Email: contato@bossshopp.com</p>
-                    <p>Tel: (11) 1234-5678</p>
-                </div>
-            </div>
-            <div class="footer-bottom">
-                <p>&copy; 2024 BOSS SHOPP. Todos os direitos reservados.</p>
-            </div>
-        </div>
-    </footer>
-
-    <script src="script.js"></script>
-</body>
-</html>'''
+    def __init__(self, output_dir, base_url, max_urls=SITEMAP_MAX_URLS):
+        self.output_dir = output_dir
+        self.base_url = base_url.rstrip('/')
+        self.max_urls = max_urls
+        self.parts = []
+        self.count = 0
+        self.file = None
+    
+    def _open_part(self):
+        self._close_part()
+        path = os.path.join(self.output_dir, f"sitemap-{len(self.parts) + 1}.xml.tmp")
+        self.parts.append(path)
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write(f'{self.HEADER}<urlset {self.NAMESPACE}>\n')
+        self.count = 0
+    
+    def _close_part(self):
+        if self.file is not None:
+            self.file.write('</urlset>\n')
+            self.file.close()
+            self.file = None
+    
+    def add(self, filename, lastmod=None):
+        if self.file is None or self.count >= self.max_urls:
+            self._open_part()
+        entry = f'<url><loc>{escape(self.base_url + "/" + filename)}</loc>'
+        if lastmod:
+            entry += f'<lastmod>{lastmod[:10]}</lastmod>'
+        self.file.write(entry + '</url>\n')
+        self.count += 1
     
-    return html_content
+    def close(self):
+        if self.file is None:
+            self._open_part()
+        self._close_part()
+        
+        if len(self.parts) == 1:
+            final = {SITEMAP_FILE: self.parts[0]}
+        else:
+            final = {os.path.basename(part)[:-len('.tmp')]: part for part in self.parts}
+            index = [f'{self.HEADER}<sitemapindex {self.NAMESPACE}>\n']
+            for name in final:
+                index.append(f'<sitemap><loc>{escape(self.base_url + "/" + name)}</loc></sitemap>\n')
+            index.append('</sitemapindex>\n')
+            index_path = os.path.join(self.output_dir, SITEMAP_FILE + '.tmp')
+            write_file(index_path, ''.join(index))
+            final[SITEMAP_FILE] = index_path
+        
+        files = {}
+        for name, tmp_path in final.items():
+            with open(tmp_path, 'rb') as f:
+                files[name] = f.read()
+            os.remove(tmp_path)
+        return files
 
-def main():
-    """Função principal"""
-    db_file = "bossshopp_complete.db"
+def build_pages(conn, output_dir, incremental=False, executor=None, jobs=1, base_url=DEFAULT_BASE_URL):
+    """
+    Gera o catálogo estático em output_dir e atualiza o manifesto.
+    
+    No modo incremental páginas cujo hash de entrada não mudou nem são
+    renderizadas, e páginas renderizadas com o mesmo conteúdo não são
+    regravadas. Com um executor (ProcessPoolExecutor de `jobs` processos)
+    renderização e compressão rodam em paralelo, em lotes de
+    RENDER_BATCH_SIZE páginas.
+    Retorna {"written": [...], "unchanged": [...], "removed": [...], "empty": [...]}.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    previous = load_manifest(output_dir)
+    template_version = template_digest()
+    pages = {}
+    result = {'written': [], 'unchanged': [], 'removed': [], 'empty': []}
+    
+    def publish(filename, inputs, digest, size, variants):
+        pages[filename] = {'sha256': digest, 'input': inputs, 'bytes': size}
+        if variants is None:
+            result['unchanged'].append(filename)
+        else:
+            write_variants(output_dir, filename, variants)
+            result['written'].append(filename)
     
+    def flush(tasks):
+        for rendered in render_pages(tasks, executor, jobs):
+            publish(*rendered)
+        tasks.clear()
+    
+    sitemap = SitemapWriter(output_dir, base_url)
+    tasks = []
     try:
-        conn = sqlite3.connect(db_file)
-        cursor = conn.cursor()
-        
-        # Buscar todas as categorias
-        cursor.execute("SELECT id, name, slug, description FROM categories ORDER BY sort_order")
-        categories = cursor.fetchall()
-        
-        print(f"Gerando páginas para {len(categories)} categorias...")
-        
-        for category in categories:
-            category_id, category_name, category_slug, category_description = category
-            
-            # Buscar produtos da categoria
-            cursor.execute("""
-                SELECT name, description, price, old_price, stock_quantity, sku, rating, review_count
-                FROM products
-                WHERE category_id = ?
-                ORDER BY rating DESC
-                LIMIT 12
-            """, (category_id,))
+        for kind, filename, args, lastmod in iter_pages(conn, base_url, result['empty']):
+            sitemap.add(filename, lastmod)
             
-            products = cursor.fetchall()
+            inputs = input_digest(template_version, kind, args)
+            entry = previous.get(filename, {})
+            published = incremental and entry and os.path.exists(os.path.join(output_dir, filename))
+            if published and entry.get('input') == inputs:
+                pages[filename] = entry
+                result['unchanged'].append(filename)
+                continue
             
-            if products:
-                # Gerar página HTML
-                icon = CATEGORY_ICONS.get(category_slug, 'fa-box')
-                html_content = generate_category_page(
-                    category_name, 
-                    category_slug, 
-                    category_description, 
-                    products,
-                    icon
-                )
-                
-                # Salvar arquivo
-                filename = f"PI3 (2)/PI3 (1)/PI3/PI2/frontend/categoria-{category_slug}.html"
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-                
-                print(f"✓ Criada: {filename} ({len(products)} produtos)")
-            else:
-                print(f"✗ Sem produtos para: {category_name}")
+            tasks.append((kind, filename, inputs, entry.get('sha256') if published else None, args))
+            if len(tasks) >= RENDER_BATCH_SIZE:
+                flush(tasks)
+        flush(tasks)
+    finally:
+        sitemaps = sitemap.close()
+    
+    for filename, data in sitemaps.items():
+        digest = hashlib.sha256(data).hexdigest()
+        unchanged = (previous.get(filename, {}).get('sha256') == digest
+                     and os.path.exists(os.path.join(output_dir, filename)))
+        publish(filename, digest, digest, len(data), None if unchanged else compressed_variants(data))
+    
+    # Páginas de produtos e categorias que sumiram, e partes do sitemap que sobraram
+    for filename in sorted(set(previous) - set(pages)):
+        remove_variants(output_dir, filename)
+        result['removed'].append(filename)
+    
+    manifest = {'pages': pages, 'changed': result['written'], 'removed': result['removed']}
+    write_file(os.path.join(output_dir, MANIFEST_FILE), json.dumps(manifest, sort_keys=True, separators=(',', ':')))
+    return result
+
+def print_result(result, output_dir, verbose=True):
+    if verbose:
+        for filename in result['written']:
+            print(f"✓ Criada: {os.path.join(output_dir, filename)}")
+        for filename in result['removed']:
+            print(f"✗ Removida: {filename}")
+    for category_name in result['empty']:
+        print(f"✗ Sem produtos para: {category_name}")
+
+def watch(conn, output_dir, executor=None, jobs=1, interval=1.0, base_url=DEFAULT_BASE_URL):
+    """
+    Regenera as páginas afetadas sempre que o catálogo ou um template muda.
+    
+    PRAGMA data_version muda quando outra conexão confirma uma alteração no
+    banco, então cada verificação custa uma leitura de pragma; só então a
+    consulta do catálogo roda e apenas as páginas cujas entradas mudaram
+    (o produto alterado e as páginas da listagem em que ele aparece) são
+    renderizadas de novo.
+    """
+    template_paths = [os.path.join(TEMPLATE_DIR, name) for name in (CATEGORY_TEMPLATE, PRODUCT_TEMPLATE)]
+    
+    def current_state():
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        return version, [os.stat(path).st_mtime_ns for path in template_paths]
+    
+    state = current_state()
+    print(f"Observando alterações (a cada {interval:g}s, Ctrl+C para sair)...")
+    
+    while True:
+        time.sleep(interval)
+        new_state = current_state()
+        if new_state == state:
+            continue
+        state = new_state
+        
+        started = time.perf_counter()
+        result = build_pages(conn, output_dir, incremental=True, executor=executor, jobs=jobs, base_url=base_url)
+        if result['written'] or result['removed']:
+            print_result(result, output_dir)
+            print(f"{len(result['written'])} páginas atualizadas em {time.perf_counter() - started:.2f}s")
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Gera o catálogo estático (categorias, produtos e sitemap)")
+    parser.add_argument('--db', default=DEFAULT_DB, help="Banco SQLite do catálogo")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Diretório das páginas geradas")
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL, help="Endereço público do site, usado no sitemap")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Regravar apenas as páginas cujo conteúdo mudou")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Processos usados para renderizar (padrão: número de CPUs)")
+    parser.add_argument('--watch', action='store_true',
+                        help="Continuar executando e regenerar as páginas afetadas a cada alteração")
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help="Intervalo entre verificações no modo --watch (segundos)")
+    parser.add_argument('--quiet', action='store_true', help="Não listar cada arquivo gravado")
+    args = parser.parse_args()
+    
+    if brotli is None:
+        print("Aviso: pacote brotli não instalado; somente cópias .gz serão geradas")
+    
+    conn = None
+    executor = ProcessPoolExecutor(max_workers=args.jobs) if args.jobs > 1 else None
+    try:
+        conn = sqlite3.connect(args.db)
+        started = time.perf_counter()
+        result = build_pages(conn, args.output, incremental=args.incremental or args.watch,
+                             executor=executor, jobs=args.jobs, base_url=args.base_url)
+        print_result(result, args.output, verbose=not args.quiet)
         
         print("\n" + "="*50)
-        print("PÁGINAS GERADAS COM SUCESSO!")
+        print(f"{len(result['written'])} arquivos gravados, {len(result['unchanged'])} sem alterações, "
+              f"{len(result['removed'])} removidos ({time.perf_counter() - started:.2f}s)")
         print("="*50)
         
+        if args.watch:
+            watch(conn, args.output, executor, args.jobs, args.interval, args.base_url)
+        
+    except KeyboardInterrupt:
+        pass
+    
     except Exception as e:
         print(f"Erro: {e}")
     
     finally:
+        if executor is not None:
+            executor.shutdown()
         if conn:
             conn.close()
 
@@ -8,6 +8,7 @@ Testes completos para validar o sistema de banco de dados
 import unittest
 import sys
 import os
+import time
 from datetime import datetime, timedelta
 from decimal import Decimal
 
@@ -78,6 +79,14 @@ class TestBossShoppDatabase(unittest.TestCase):
                 except:
                     pass  # Tabela pode não existir ainda
             
+            # Tabelas de rollup (sem coluna id)
+            for table in ['sales_hourly', 'sales_daily', 'product_sales_daily',
+                          'product_sales_totals', 'rollup_state', 'user_totals']:
+                try:
+                    self.db.cursor.execute(f"DELETE FROM {table}")
+                except:
+                    pass
+            
             # Reabilitar verificação de chaves estrangeiras
             self.db.cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
             self.db.connection.commit()
@@ -243,6 +252,85 @@ class TestProductOperations(TestBossShoppDatabase):
         self.assertIn('iPhone Apple', found_names)
         self.assertNotIn('Notebook Dell', found_names)
 
+    def test_catalog_snapshot(self):
+        """Testar leituras do catálogo em memória"""
+        for name, featured in [('Console', True), ('Controle', False)]:
+            self.db.cursor.execute("""
+                INSERT INTO products (name, description, price, category_id, stock_quantity, is_featured)
+                VALUES (%s, 'Produto de teste', 100.00, %s, 5, %s)
+            """, (name, self.category_id, featured))
+        self.db.connection.commit()
+        
+        self.assertTrue(self.db.enable_catalog_snapshot())
+        self.addCleanup(self.db.disable_catalog_snapshot)
+        self.assertEqual(self.db.get_products(category_slug='teste'), self.db.get_products())
+        self.assertEqual([p['name'] for p in self.db.get_products(featured_only=True)], ['Console'])
+        self.assertEqual(self.db.get_categories()[0]['product_count'], 2)
+        
+        # A cópia só muda quando é atualizada
+        self.db.cursor.execute("UPDATE products SET is_active = FALSE WHERE name = 'Console'")
+        self.db.connection.commit()
+        self.assertEqual(len(self.db.get_products()), 2)
+        self.assertTrue(self.db.refresh_catalog(force=True))
+        self.assertEqual([p['name'] for p in self.db.get_products()], ['Controle'])
+        self.assertEqual(self.db.get_categories()[0]['product_count'], 1)
+
+    def test_catalog_snapshot_background_refresh(self):
+        """A verificação periódica do modo pool enxerga alterações de outras conexões"""
+        pooled = BossShoppDatabase(DatabaseConfig(
+            host=self.config.host, port=self.config.port, user=self.config.user,
+            password=self.config.password, database=self.config.database, pool_size=1
+        ))
+        self.assertTrue(pooled.connect())
+        self.addCleanup(pooled.disconnect)
+        self.assertTrue(pooled.enable_catalog_snapshot(refresh_seconds=0.1))
+        self.assertEqual(pooled.get_products(), [])
+        
+        self.db.cursor.execute("""
+            INSERT INTO products (name, description, price, category_id, stock_quantity)
+            VALUES ('Console', 'Produto de teste', 100.00, %s, 5)
+        """, (self.category_id,))
+        self.db.connection.commit()
+        
+        deadline = time.monotonic() + 5
+        while not pooled.get_products() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual([p['name'] for p in pooled.get_products()], ['Console'])
+
+class TestConnectionPool(TestBossShoppDatabase):
+    """Testes do modo pool"""
+    
+    def test_reused_connection_sees_new_commits(self):
+        """Uma leitura não pode deixar a conexão presa a um snapshot antigo"""
+        pooled = BossShoppDatabase(DatabaseConfig(
+            host=self.config.host, port=self.config.port, user=self.config.user,
+            password=self.config.password, database=self.config.database, pool_size=1
+        ))
+        self.assertTrue(pooled.connect())
+        self.addCleanup(pooled.disconnect)
+        
+        with pooled.pooled_cursor() as cursor:
+            cursor.execute("SELECT CONNECTION_ID() AS id, COUNT(*) AS total FROM categories")
+            first = cursor.fetchone()
+        
+        with pooled.pooled_cursor(commit=True) as cursor:
+            cursor.execute("""
+                INSERT INTO categories (name, slug, description, is_active)
+                VALUES ('Pool', 'pool', 'Categoria de teste', TRUE)
+            """)
+        # Alteração confirmada por outra conexão
+        self.db.cursor.execute("""
+            INSERT INTO categories (name, slug, description, is_active)
+            VALUES ('Externa', 'externa', 'Categoria de teste', TRUE)
+        """)
+        self.db.connection.commit()
+        
+        with pooled.pooled_cursor() as cursor:
+            cursor.execute("SELECT CONNECTION_ID() AS id, COUNT(*) AS total FROM categories")
+            second = cursor.fetchone()
+        self.assertEqual(second['id'], first['id'])
+        self.assertEqual(second['total'], first['total'] + 2)
+
 class TestCartOperations(TestBossShoppDatabase):
     """Testes para operações de carrinho"""
     
@@ -414,6 +502,35 @@ class TestOrderOperations(TestBossShoppDatabase):
         order_items = self.db.get_order_items(order_id)
         self.assertEqual(len(order_items), 2)
     
+    def test_create_order_updates_stock(self):
+        """Testar baixa de estoque e movimentação na criação do pedido"""
+        items = [{'product_id': self.products[0], 'quantity': 3, 'price': 25.00}]
+        order_id = self.db.create_order(self.user_id, items, self.address_id, 'pix')
+        self.assertIsNotNone(order_id)
+        
+        product = self.db.get_product_by_id(self.products[0])
+        self.assertEqual(product['stock_quantity'], 7)
+        
+        movements = self.db.execute_query(
+            "SELECT * FROM stock_movements WHERE reference_id = %s", (order_id,)
+        )
+        self.assertEqual(len(movements), 1)
+        self.assertEqual(movements[0]['quantity'], 3)
+    
+    def test_create_order_insufficient_stock(self):
+        """Testar que pedido sem estoque não grava nada"""
+        items = [
+            {'product_id': self.products[0], 'quantity': 1, 'price': 25.00},
+            {'product_id': self.products[1], 'quantity': 11, 'price': 50.00}
+        ]
+        order_id = self.db.create_order(self.user_id, items, self.address_id, 'pix')
+        self.assertIsNone(order_id)
+        
+        # Nenhuma baixa parcial nem pedido parcial
+        product = self.db.get_product_by_id(self.products[0])
+        self.assertEqual(product['stock_quantity'], 10)
+        self.assertEqual(len(self.db.get_user_orders(self.user_id)), 0)
+    
     def test_get_user_orders(self):
         """Testar obtenção de pedidos do usuário"""
         # Criar alguns pedidos
@@ -446,6 +563,88 @@ class TestOrderOperations(TestBossShoppDatabase):
         order = self.db.get_order_by_id(order_id, self.user_id)
         self.assertEqual(order['status'], 'processing')
 
+    def test_sales_statistics_from_rollups(self):
+        """Testar estatísticas de vendas respondidas pelos rollups"""
+        first = self.db.create_order(self.user_id, [
+            {'product_id': self.products[0], 'quantity': 2, 'price': 25.00}
+        ], self.address_id, 'pix')
+        second = self.db.create_order(self.user_id, [
+            {'product_id': self.products[1], 'quantity': 1, 'price': 50.00},
+            {'product_id': self.products[0], 'quantity': 1, 'price': 25.00}
+        ], self.address_id, 'pix')
+        
+        # Pedidos pendentes não contam como venda
+        self.assertEqual(self.db.get_sales_statistics(refresh=True)['total_orders'], 0)
+        
+        self.db.update_order_status(first, 'shipped')
+        self.db.update_order_status(second, 'delivered')
+        # As leituras não atualizam os rollups por conta própria
+        self.assertEqual(self.db.get_sales_statistics()['total_orders'], 0)
+        self.assertIsNotNone(self.db.refresh_sales_rollups())
+        stats = self.db.get_sales_statistics()
+        self.assertEqual(stats['total_orders'], 2)
+        self.assertEqual(float(stats['total_revenue']), 125.00)
+        self.assertEqual(float(stats['average_order_value']), 62.50)
+        self.assertEqual(float(stats['max_order_value']), 75.00)
+        
+        top = self.db.get_top_products(limit=2)
+        self.assertEqual(top[0]['id'], self.products[0])
+        self.assertEqual(top[0]['total_sold'], 3)
+    
+    def test_sales_statistics_with_partial_hours(self):
+        """Testar períodos que não começam nem terminam em hora cheia"""
+        order_ids = []
+        for created_at, price in (('2025-03-10 09:50:00', 10.00), ('2025-03-10 10:20:00', 20.00),
+                                  ('2025-03-10 11:00:00', 40.00), ('2025-03-10 12:10:00', 80.00)):
+            order_id = self.db.create_order(self.user_id, [
+                {'product_id': self.products[0], 'quantity': 1, 'price': price}
+            ], self.address_id, 'pix')
+            self.db.update_order_status(order_id, 'delivered')
+            self.db.cursor.execute("UPDATE orders SET created_at = %s, total_amount = %s WHERE id = %s",
+                                   (created_at, price, order_id))
+            order_ids.append(order_id)
+        self.db.connection.commit()
+        self.db.refresh_sales_rollups()
+        
+        # Mesmo resultado de created_at >= início AND created_at <= fim
+        stats = self.db.get_sales_statistics(datetime(2025, 3, 10, 10, 15), datetime(2025, 3, 10, 12, 0))
+        self.assertEqual((stats['total_orders'], float(stats['total_revenue'])), (2, 60.00))
+        stats = self.db.get_sales_statistics(datetime(2025, 3, 10, 9, 55), datetime(2025, 3, 10, 10, 30))
+        self.assertEqual((stats['total_orders'], float(stats['max_order_value'])), (1, 20.00))
+        stats = self.db.get_sales_statistics(datetime(2025, 3, 10), datetime(2025, 3, 10, 11, 0))
+        self.assertEqual(stats['total_orders'], 3)
+        stats = self.db.get_sales_statistics(datetime(2025, 3, 10), datetime(2025, 3, 11))
+        self.assertEqual(float(stats['total_revenue']), 150.00)
+    
+    def test_rollups_follow_status_changes(self):
+        """Testar que a atualização incremental desconta pedidos cancelados"""
+        order_id = self.db.create_order(self.user_id, [
+            {'product_id': self.products[2], 'quantity': 4, 'price': 75.00}
+        ], self.address_id, 'pix')
+        self.db.update_order_status(order_id, 'shipped')
+        self.assertEqual(self.db.get_sales_statistics(refresh=True)['total_orders'], 1)
+        
+        self.db.update_order_status(order_id, 'refunded')
+        self.assertEqual(self.db.get_sales_statistics(refresh=True)['total_orders'], 0)
+        self.assertEqual(self.db.get_top_products(), [])
+        
+        # Sem alterações novas só a janela de atraso é reprocessada
+        refreshed = self.db.refresh_sales_rollups(lag_seconds=0)
+        self.assertLessEqual(refreshed['hours'], 2)
+        self.assertEqual(self.db.get_user_statistics()['new_users_30_days'], 1)
+    
+    def test_user_totals_from_rollups(self):
+        """Testar totais de usuários lidos de user_totals"""
+        self.db.refresh_sales_rollups()
+        stats = self.db.get_user_statistics()
+        self.assertEqual((stats['total_users'], stats['active_users']), (1, 1))
+        
+        self.db.cursor.execute("UPDATE users SET is_active = FALSE WHERE id = %s", (self.user_id,))
+        self.db.connection.commit()
+        self.assertEqual(self.db.get_user_statistics()['active_users'], 1)
+        stats = self.db.get_user_statistics(refresh=True)
+        self.assertEqual((stats['total_users'], stats['active_users']), (1, 0))
+
 class TestFavoriteOperations(TestBossShoppDatabase):
     """Testes para operações de favoritos"""
     
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Testes do gerador do catálogo estático
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import generate_category_pages
+from generate_category_pages import (
+    MANIFEST_FILE, SITEMAP_FILE, Product, SitemapWriter, build_pages, fetch_catalog, generate_category_page
+)
+
+SCHEMA = """
+CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT, slug TEXT, description TEXT, sort_order INTEGER,
+                         is_active INTEGER DEFAULT 1);
+CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, description TEXT, price REAL, old_price REAL,
+                       category_id INTEGER, stock_quantity INTEGER, sku TEXT, rating REAL, review_count INTEGER,
+                       image_url TEXT, is_active INTEGER DEFAULT 1,
+                       updated_at TEXT DEFAULT '2025-11-10 12:00:00');
+"""
+
+class CategoryPagesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.output = os.path.join(self.directory, 'frontend')
+        
+        self.conn = sqlite3.connect(':memory:')
+        self.addCleanup(self.conn.close)
+        self.conn.executescript(SCHEMA)
+        self.conn.executemany("INSERT INTO categories VALUES (?, ?, ?, ?, ?, 1)", [
+            (1, 'Games', 'games', 'Jogos e consoles', 2),
+            (2, 'Casa', 'casa', 'Tudo para sua casa', 1),
+            (3, 'Livros', 'livros', 'Leitura', 3),
+        ])
+        self.conn.executemany(
+            "INSERT INTO products (name, description, price, old_price, category_id, stock_quantity, sku, rating, review_count) "
+            "VALUES (?, 'Descrição', ?, NULL, ?, 5, ?, ?, 10)",
+            [(f'Jogo {i}', 100.0 + i, 1, f'G{i}', i % 5) for i in range(15)]
+            + [('Caneca', 45.0, 2, 'C1', 4.0)]
+        )
+        self.conn.commit()
+    
+    def read(self, filename):
+        with open(os.path.join(self.output, filename), encoding='utf-8') as f:
+            return f.read()
+    
+    def read_manifest(self):
+        with open(os.path.join(self.output, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+
+GAMES_PAGES = ['categoria-games.html', 'categoria-games-pagina-2.html']
+
+class TestFetchCatalog(CategoryPagesTestCase):
+    def test_products_per_category(self):
+        catalog = list(fetch_catalog(self.conn))
+        self.assertEqual([category.slug for category, _ in catalog], ['casa', 'games', 'livros'])
+        
+        games = dict((category.slug, products) for category, products in catalog)['games']
+        self.assertEqual(len(games), 15)
+        ratings = [product.rating for product in games]
+        self.assertEqual(ratings, sorted(ratings, reverse=True))
+        # Empates são desfeitos pelo id, então a ordem é estável entre execuções
+        self.assertEqual([product.name for product in games[:3]], ['Jogo 4', 'Jogo 9', 'Jogo 14'])
+    
+    def test_category_without_products(self):
+        self.assertEqual(list(fetch_catalog(self.conn))[2][1], [])
+    
+    def test_inactive_rows_are_skipped(self):
+        self.conn.execute("UPDATE products SET is_active = 0 WHERE sku = 'G4'")
+        self.conn.execute("UPDATE categories SET is_active = 0 WHERE slug = 'casa'")
+        catalog = dict((category.slug, products) for category, products in fetch_catalog(self.conn))
+        self.assertNotIn('casa', catalog)
+        self.assertNotIn('G4', [product.sku for product in catalog['games']])
+
+class TestBuildPages(CategoryPagesTestCase):
+    def test_full_build(self):
+        result = build_pages(self.conn, self.output)
+        self.assertEqual(result['written'], [
+            'categoria-casa.html', 'produto-16.html', *GAMES_PAGES,
+            *(f'produto-{i}.html' for i in (5, 10, 15, 4, 9, 14, 3, 8, 13, 2, 7, 12, 1, 6, 11)),
+            SITEMAP_FILE,
+        ])
+        self.assertEqual(result['empty'], ['Livros'])
+        
+        self.assertIn('Caneca', self.read('categoria-casa.html'))
+        self.assertEqual(len(self.read_manifest()['pages']['categoria-games.html']['sha256']), 64)
+    
+    def test_category_listing_is_paginated(self):
+        build_pages(self.conn, self.output)
+        first, second = (self.read(filename) for filename in GAMES_PAGES)
+        self.assertEqual(first.count('class="product-card"'), 12)
+        self.assertEqual(second.count('class="product-card"'), 3)
+        self.assertIn('href="categoria-games-pagina-2.html"', first)
+        self.assertIn('href="categoria-games.html"', second)
+        self.assertIn('Página 2 de 2', second)
+        self.assertNotIn('class="pagination"', self.read('categoria-casa.html'))
+    
+    def test_product_page(self):
+        self.conn.execute("UPDATE products SET price = 1234.5, old_price = 1500 WHERE sku = 'C1'")
+        build_pages(self.conn, self.output)
+        self.assertIn('href="produto-16.html"', self.read('categoria-casa.html'))
+        html = self.read('produto-16.html')
+        self.assertIn('<h1 class="product-title" id="product-title">Caneca</h1>', html)
+        self.assertIn('R$ 1.234,50', html)
+        self.assertIn('-18% OFF', html)
+        self.assertIn('<a href="categoria-casa.html">Casa</a>', html)
+        self.assertIn('<link rel="canonical" href="https://www.bossshopp.com/produto-16.html">', html)
+    
+    def test_compressed_copies(self):
+        build_pages(self.conn, self.output)
+        path = os.path.join(self.output, 'produto-16.html')
+        with open(path, 'rb') as f, gzip.open(path + '.gz') as compressed:
+            self.assertEqual(compressed.read(), f.read())
+        if generate_category_pages.brotli is not None:
+            with open(path, 'rb') as f, open(path + '.br', 'rb') as compressed:
+                self.assertEqual(generate_category_pages.brotli.decompress(compressed.read()), f.read())
+    
+    def test_sitemap(self):
+        self.conn.execute("UPDATE products SET updated_at = '2025-12-01 08:00:00' WHERE sku = 'G3'")
+        build_pages(self.conn, self.output, base_url='https://loja.example/')
+        sitemap = self.read(SITEMAP_FILE)
+        self.assertEqual(sitemap.count('<url>'), 19)
+        self.assertIn('<url><loc>https://loja.example/categoria-games.html</loc><lastmod>2025-12-01</lastmod></url>', sitemap)
+        self.assertIn('<url><loc>https://loja.example/produto-16.html</loc><lastmod>2025-11-10</lastmod></url>', sitemap)
+    
+    def test_incremental_build_rewrites_only_changed_pages(self):
+        build_pages(self.conn, self.output)
+        games_path = os.path.join(self.output, 'categoria-games.html')
+        mtime = os.stat(games_path).st_mtime_ns
+        
+        self.conn.execute("UPDATE products SET price = 39.9 WHERE sku = 'C1'")
+        result = build_pages(self.conn, self.output, incremental=True)
+        self.assertEqual(result['written'], ['categoria-casa.html', 'produto-16.html'])
+        self.assertIn('categoria-games.html', result['unchanged'])
+        self.assertIn(SITEMAP_FILE, result['unchanged'])
+        self.assertEqual(os.stat(games_path).st_mtime_ns, mtime)
+        self.assertEqual(self.read_manifest()['changed'], ['categoria-casa.html', 'produto-16.html'])
+    
+    def test_missing_page_is_written_again(self):
+        build_pages(self.conn, self.output)
+        os.remove(os.path.join(self.output, 'categoria-games.html'))
+        result = build_pages(self.conn, self.output, incremental=True)
+        self.assertEqual(result['written'], ['categoria-games.html'])
+    
+    def test_pages_of_removed_products_are_removed(self):
+        build_pages(self.conn, self.output)
+        self.conn.execute("DELETE FROM products WHERE category_id = 2")
+        self.conn.execute("DELETE FROM products WHERE sku IN ('G0', 'G1', 'G2')")
+        result = build_pages(self.conn, self.output, incremental=True)
+        self.assertEqual(result['removed'], [
+            'categoria-casa.html', 'categoria-games-pagina-2.html',
+            'produto-1.html', 'produto-16.html', 'produto-2.html', 'produto-3.html',
+        ])
+        for suffix in ('', '.gz', '.br'):
+            self.assertFalse(os.path.exists(os.path.join(self.output, 'categoria-casa.html' + suffix)))
+        self.assertNotIn('categoria-casa.html', self.read_manifest()['pages'])
+        self.assertNotIn('class="pagination"', self.read('categoria-games.html'))
+    
+    def test_unchanged_pages_are_not_rendered(self):
+        build_pages(self.conn, self.output)
+        self.conn.execute("UPDATE products SET price = 39.9 WHERE sku = 'C1'")
+        with mock.patch('generate_category_pages.render_task', wraps=generate_category_pages.render_task) as render:
+            build_pages(self.conn, self.output, incremental=True)
+        self.assertEqual([call.args[0][1] for call in render.call_args_list],
+                         ['categoria-casa.html', 'produto-16.html'])
+    
+    def test_template_change_renders_every_page(self):
+        build_pages(self.conn, self.output)
+        with mock.patch('generate_category_pages.template_digest', return_value='novo'):
+            with mock.patch('generate_category_pages.render_task', wraps=generate_category_pages.render_task) as render:
+                result = build_pages(self.conn, self.output, incremental=True)
+        self.assertEqual(render.call_count, 19)
+        # Renderizadas de novo, mas com o mesmo HTML continuam intocadas
+        self.assertEqual(result['written'], [])
+    
+    def test_parallel_build_matches_serial_build(self):
+        build_pages(self.conn, self.output)
+        serial = self.read_manifest()['pages']
+        
+        with ProcessPoolExecutor(max_workers=2) as executor, \
+                mock.patch('generate_category_pages.PARALLEL_MIN_PAGES', 1), \
+                mock.patch('generate_category_pages.RENDER_BATCH_SIZE', 5):
+            result = build_pages(self.conn, os.path.join(self.directory, 'parallel'), executor=executor, jobs=2)
+        self.assertEqual(len(result['written']), 20)
+        with open(os.path.join(self.directory, 'parallel', MANIFEST_FILE), encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['pages'], serial)
+
+class TestSitemapWriter(unittest.TestCase):
+    def test_large_sitemap_is_split_with_an_index(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        sitemap = SitemapWriter(directory, 'https://loja.example', max_urls=2)
+        for i in range(5):
+            sitemap.add(f'produto-{i}.html', '2025-11-10 12:00:00')
+        files = sitemap.close()
+        
+        self.assertEqual(sorted(files), ['sitemap-1.xml', 'sitemap-2.xml', 'sitemap-3.xml', SITEMAP_FILE])
+        self.assertEqual(files['sitemap-3.xml'].count(b'<url>'), 1)
+        self.assertIn(b'<sitemap><loc>https://loja.example/sitemap-2.xml</loc></sitemap>', files[SITEMAP_FILE])
+        self.assertEqual(os.listdir(directory), [])
+
+class TestTemplate(unittest.TestCase):
+    def test_text_is_escaped(self):
+        product = Product(1, 'Cabo <USB> & HDMI', 'Descrição', 19.9, 29.9, 5, 'C1', 3.0, 7, None, None)
+        html = generate_category_page('Eletrônicos', 'eletronicos', 'Tudo', [product], 'fa-laptop')
+        self.assertIn('Cabo &lt;USB&gt; &amp; HDMI', html)
+        self.assertIn('R$ 19.90', html)
+        self.assertIn('<span class="product-old-price">R$ 29.90</span>', html)
+        self.assertIn('★★★☆☆', html)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,8 +6,13 @@ Setup script for BOSS SHOPP SQLite database with admin and vendor roles
 import sqlite3
 import bcrypt
 import os
+import sys
 import logging
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'backend'))
+
+from sqlite_tuning import connect
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,7 +28,7 @@ class BossShoppDBSetup:
     def connect(self):
         """Connect to SQLite database"""
         try:
-            self.connection = sqlite3.connect(self.db_path)
+            self.connection = connect(self.db_path)
             self.connection.row_factory = sqlite3.Row
             self.cursor = self.connection.cursor()
             logger.info(f"Connected to database: {self.db_path}")
@@ -0,0 +1,322 @@
+"""
+Columnar analytics export of the shop database.
+
+Streams orders, order_items, products and categories out of the Django
+SQLite database into Parquet files, `chunk_size` rows at a time (one row
+group per chunk), so memory stays bounded whatever the size of the tables.
+The whole export reads one consistent snapshot of the database.
+
+Runs after the first are incremental: only the orders (with their items) and
+products whose updated_at reached the high-water mark kept in
+<out>/_export_state.json are written, as a new part file of the dataset.
+A short window before the mark is exported again so rows committed late are
+not missed; load_dataset() keeps the newest version of each row. Categories
+are small and are rewritten whole on every run.
+
+    pip install -r requirements-analytics.txt
+    python analytics_export.py export --db db.sqlite3 --out analytics
+    python analytics_export.py report --out analytics
+
+Heavy analytics should use the export and the helpers below (load_dataset,
+sold_items, top_products, revenue_by_day, revenue_by_category), never the
+OLTP database.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = '_export_state.json'
+DEFAULT_CHUNK_SIZE = 50000
+
+# Rows whose mark is up to this many seconds older than the high-water mark
+# are exported again on the next run
+MARK_OVERLAP_SECONDS = 300
+
+# Order statuses that count as sales
+SALE_STATUSES = ('shipped', 'delivered')
+
+TIMESTAMP = pa.timestamp('us')
+
+Dataset = namedtuple('Dataset', 'name query schema mark')
+
+DATASETS = (
+    Dataset(
+        'categories',
+        "SELECT id, name, slug, created_at FROM api_category",
+        pa.schema([
+            ('id', pa.int64()), ('name', pa.string()), ('slug', pa.string()), ('created_at', TIMESTAMP),
+        ]),
+        None,
+    ),
+    Dataset(
+        'products',
+        "SELECT id, name, category_id, price, created_at, updated_at FROM api_product WHERE updated_at >= ?",
+        pa.schema([
+            ('id', pa.int64()), ('name', pa.string()), ('category_id', pa.int64()), ('price', pa.float64()),
+            ('created_at', TIMESTAMP), ('updated_at', TIMESTAMP),
+        ]),
+        'updated_at',
+    ),
+    Dataset(
+        # shipping_address stays out of the export on purpose (personal data)
+        'orders',
+        "SELECT id, user_id, status, total_amount, payment_method, created_at, updated_at "
+        "FROM api_order WHERE updated_at >= ?",
+        pa.schema([
+            ('id', pa.int64()), ('user_id', pa.int64()), ('status', pa.string()),
+            ('total_amount', pa.float64()), ('payment_method', pa.string()),
+            ('created_at', TIMESTAMP), ('updated_at', TIMESTAMP),
+        ]),
+        'updated_at',
+    ),
+    Dataset(
+        # Items have no updated_at; they follow the mark of their order
+        'order_items',
+        "SELECT oi.id, oi.order_id, oi.product_id, oi.quantity, oi.price, o.updated_at AS order_updated_at "
+        "FROM api_order o JOIN api_orderitem oi ON oi.order_id = o.id WHERE o.updated_at >= ?",
+        pa.schema([
+            ('id', pa.int64()), ('order_id', pa.int64()), ('product_id', pa.int64()),
+            ('quantity', pa.int64()), ('price', pa.float64()), ('order_updated_at', TIMESTAMP),
+        ]),
+        'order_updated_at',
+    ),
+)
+
+DATASETS_BY_NAME = {dataset.name: dataset for dataset in DATASETS}
+
+
+def _record_batch(rows, schema):
+    """Rows of a cursor as one Arrow record batch (column by column)"""
+    columns = list(zip(*rows))
+    arrays = []
+    for values, field in zip(columns, schema):
+        if pa.types.is_timestamp(field.type):
+            # SQLite keeps datetimes as ISO text; Arrow parses them in bulk
+            arrays.append(pa.array(values, pa.string()).cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _since(mark):
+    """Lower bound of the next incremental read for a stored high-water mark"""
+    if mark is None:
+        return ''
+    started = datetime.fromisoformat(mark) - timedelta(seconds=MARK_OVERLAP_SECONDS)
+    return started.isoformat(sep=' ')
+
+
+def load_state(out_dir):
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_state(out_dir, state):
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def export_dataset(conn, dataset, out_dir, state, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream one dataset into a new part file. Returns the number of rows
+    written and updates `state` (part counter and high-water mark).
+    """
+    directory = os.path.join(out_dir, dataset.name)
+    os.makedirs(directory, exist_ok=True)
+    entry = state.setdefault(dataset.name, {'parts': 0, 'high_water': None})
+
+    if dataset.mark is None:
+        cursor = conn.execute(dataset.query)
+        part = 1
+    else:
+        cursor = conn.execute(dataset.query, (_since(entry['high_water']),))
+        part = entry['parts'] + 1
+
+    path = os.path.join(directory, f'part-{part:06d}.parquet')
+    mark_index = dataset.schema.get_field_index(dataset.mark) if dataset.mark else None
+    high_water = entry['high_water']
+    writer = None
+    rows = 0
+    try:
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            if writer is None:
+                writer = pq.ParquetWriter(path + '.tmp', dataset.schema, compression='zstd')
+            writer.write_batch(_record_batch(chunk, dataset.schema))
+            rows += len(chunk)
+            if mark_index is not None:
+                # ISO text compares in time order
+                chunk_mark = max(row[mark_index] for row in chunk)
+                if high_water is None or chunk_mark > high_water:
+                    high_water = chunk_mark
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if dataset.mark is None:
+        # Full snapshot: drop the previous one
+        for old in glob.glob(os.path.join(directory, 'part-*.parquet')):
+            os.remove(old)
+    if rows:
+        os.replace(path + '.tmp', path)
+        entry['parts'] = part
+        entry['high_water'] = high_water
+    return rows
+
+
+def export_all(db_path, out_dir, chunk_size=DEFAULT_CHUNK_SIZE, datasets=DATASETS):
+    """Export every dataset from one read snapshot; returns {name: rows written}"""
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(out_dir)
+
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, isolation_level=None)
+    try:
+        conn.execute('BEGIN')
+        written = {}
+        for dataset in datasets:
+            started = time.perf_counter()
+            written[dataset.name] = export_dataset(conn, dataset, out_dir, state, chunk_size)
+            logger.info(
+                f"{dataset.name}: {written[dataset.name]} linhas exportadas "
+                f"em {time.perf_counter() - started:.2f}s"
+            )
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+
+    state['exported_at'] = datetime.now().isoformat(timespec='seconds')
+    _save_state(out_dir, state)
+    return written
+
+
+# =====================================================
+# Vectorized helpers over the export
+# =====================================================
+
+def _latest(table, mark):
+    """Newest version of each id (incremental parts may repeat rows)"""
+    if mark is None or table.num_rows == 0:
+        return table
+    table = table.take(pc.sort_indices(table, sort_keys=[('id', 'ascending'), (mark, 'descending')]))
+    ids = table['id']
+    first = pc.not_equal(ids.slice(1), ids.slice(0, len(ids) - 1))
+    keep = pa.concat_arrays([pa.array([True])] + first.fill_null(True).chunks)
+    return table.filter(keep)
+
+
+def load_dataset(out_dir, name, columns=None):
+    """An exported dataset as one Arrow table, keeping the newest version of each row"""
+    dataset = DATASETS_BY_NAME[name]
+    paths = sorted(glob.glob(os.path.join(out_dir, name, 'part-*.parquet')))
+    if not paths:
+        return dataset.schema.empty_table().select(columns or dataset.schema.names)
+
+    wanted = list(columns or dataset.schema.names)
+    extra = [column for column in ('id', dataset.mark) if column and column not in wanted]
+    table = pa.concat_tables(pq.read_table(path, columns=wanted + extra) for path in paths)
+    return _latest(table, dataset.mark).select(wanted)
+
+
+def sold_items(out_dir):
+    """
+    Line items of shipped/delivered orders with order_created_at and
+    revenue (quantity * price)
+    """
+    orders = load_dataset(out_dir, 'orders', ['id', 'status', 'created_at'])
+    orders = orders.filter(pc.is_in(orders['status'], value_set=pa.array(SALE_STATUSES)))
+    orders = orders.select(['id', 'created_at']).rename_columns(['order_id', 'order_created_at'])
+
+    items = load_dataset(out_dir, 'order_items', ['order_id', 'product_id', 'quantity', 'price'])
+    items = items.join(orders, 'order_id', join_type='inner')
+    revenue = pc.multiply(items['quantity'].cast(pa.float64()), items['price'])
+    return items.append_column('revenue', revenue)
+
+
+def top_products(items, n=10):
+    """product_id, units and revenue of the n best sellers by units"""
+    totals = items.group_by('product_id').aggregate([('quantity', 'sum'), ('revenue', 'sum')])
+    totals = totals.rename_columns(['product_id', 'units', 'revenue'])
+    return totals.sort_by([('units', 'descending'), ('product_id', 'ascending')]).slice(0, n)
+
+
+def revenue_by_day(items):
+    """day, orders and revenue, in day order"""
+    day = pc.floor_temporal(items['order_created_at'], unit='day').cast(pa.date32())
+    daily = (
+        pa.table({'day': day, 'order_id': items['order_id'], 'revenue': items['revenue']})
+        .group_by('day')
+        .aggregate([('order_id', 'count_distinct'), ('revenue', 'sum')])
+        .rename_columns(['day', 'orders', 'revenue'])
+    )
+    return daily.sort_by('day')
+
+
+def revenue_by_category(items, products, categories):
+    """category, units and revenue, best first"""
+    products = products.select(['id', 'category_id']).rename_columns(['product_id', 'category_id'])
+    categories = categories.select(['id', 'name']).rename_columns(['category_id', 'category'])
+    joined = items.join(products, 'product_id').join(categories, 'category_id')
+    totals = joined.group_by('category').aggregate([('quantity', 'sum'), ('revenue', 'sum')])
+    totals = totals.rename_columns(['category', 'units', 'revenue'])
+    return totals.sort_by([('revenue', 'descending')])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Exportação colunar (Parquet) para análises')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    export = subcommands.add_parser('export', help='Exporta (incrementalmente) o banco para Parquet')
+    export.add_argument('--db', default='db.sqlite3', help='Banco SQLite do Django')
+    export.add_argument('--out', default='analytics', help='Diretório da exportação')
+    export.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Linhas por bloco')
+
+    report = subcommands.add_parser('report', help='Resumo de vendas calculado sobre a exportação')
+    report.add_argument('--out', default='analytics', help='Diretório da exportação')
+    report.add_argument('--top', type=int, default=10)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        started = time.perf_counter()
+        written = export_all(args.db, args.out, args.chunk_size)
+        for name, rows in written.items():
+            print(f'{name:<12} {rows:>10} linhas')
+        print(f'Exportação concluída em {time.perf_counter() - started:.2f}s')
+    else:
+        items = sold_items(args.out)
+        products = load_dataset(args.out, 'products', ['id', 'name', 'category_id'])
+        categories = load_dataset(args.out, 'categories', ['id', 'name'])
+        names = dict(zip(products['id'].to_pylist(), products['name'].to_pylist()))
+
+        print('Produtos mais vendidos:')
+        for row in top_products(items, args.top).to_pylist():
+            print(f"  {names.get(row['product_id'], row['product_id'])}: "
+                  f"{row['units']} un., R$ {row['revenue']:.2f}")
+        print('Receita por categoria:')
+        for row in revenue_by_category(items, products, categories).to_pylist():
+            print(f"  {row['category']}: {row['units']} un., R$ {row['revenue']:.2f}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Category, Product, Order, OrderItem
+from .models import User, Category, Product, Order, OrderItem, SystemSetting
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -32,4 +32,10 @@ class OrderAdmin(admin.ModelAdmin):
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
-    list_display = ('order', 'product', 'quantity', 'price')
\ No newline at end of file
+    list_display = ('order', 'product', 'quantity', 'price')
+
+@admin.register(SystemSetting)
+class SystemSettingAdmin(admin.ModelAdmin):
+    list_display = ('setting_key', 'setting_value', 'is_active', 'updated_at')
+    list_filter = ('is_active',)
+    search_fields = ('setting_key', 'description')
\ No newline at end of file
@@ -0,0 +1,87 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+VERSION_KEY = 'api:version:{}'
+
+
+def get_version(name):
+    """Current change counter of a cached model ('category', 'product')"""
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so an evicted counter never reuses old keys
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Invalidate every cached response built from the given model"""
+    key = VERSION_KEY.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(key, version, timeout=None)
+        return version
+
+
+class VersionedResponseCacheMixin:
+    """
+    Caches the serialized payload of a GET view in Django's cache, keyed by
+    the version counters of `cache_models`, and answers If-None-Match /
+    If-Modified-Since with a 304 straight from the cached entry.
+    """
+    cache_models = ()
+
+    def get_cache_timeout(self):
+        return getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', 60 * 15)
+
+    def get_versions(self):
+        return [get_version(name) for name in self.cache_models]
+
+    def get_response_cache_key(self, request, versions):
+        tag = '.'.join(str(version) for version in versions)
+        return f'api:response:{self.__class__.__name__}:{tag}:{request.get_full_path()}'
+
+    def get_etag(self, data, cache_key, versions):
+        return '"%s"' % hashlib.md5(cache_key.encode('utf-8')).hexdigest()
+
+    def get_last_modified(self, data):
+        return None
+
+    def get(self, request, *args, **kwargs):
+        versions = self.get_versions()
+        cache_key = self.get_response_cache_key(request, versions)
+        entry = cache.get(cache_key)
+
+        if entry is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = {
+                'data': response.data,
+                'etag': self.get_etag(response.data, cache_key, versions),
+                'last_modified': self.get_last_modified(response.data),
+            }
+            cache.set(cache_key, entry, self.get_cache_timeout())
+
+        response = Response(entry['data'])
+        response['ETag'] = entry['etag']
+        if entry['last_modified'] is not None:
+            response['Last-Modified'] = http_date(entry['last_modified'])
+        # Let browsers and the CDN store the payload but always revalidate
+        patch_cache_control(response, public=True, no_cache=True)
+
+        return get_conditional_response(
+            request,
+            etag=entry['etag'],
+            last_modified=entry['last_modified'],
+            response=response,
+        )
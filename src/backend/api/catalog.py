@@ -0,0 +1,252 @@
+"""
+In-process snapshot of the catalog for the read endpoints.
+
+Every product and category is loaded once, already serialized, into an
+immutable CatalogSnapshot indexed by id and category slug, with per-category
+product counts. Requests read the snapshot without touching the database.
+
+The snapshot is tagged with the change version of the product and category
+tables it was read from: row count plus latest updated_at, the same check
+BossShoppDatabase.refresh_catalog runs. Versions come from the database
+rather than the cache counters of cache.py, because those live in the
+default per-process LocMemCache and never see writes made by another
+process (import_products, populate_data.py, a shell, a second worker).
+
+The database is checked at most every CATALOG_SNAPSHOT_CHECK_SECONDS; a
+write in this process bumps the cache counters and forces a check on the
+next request. When the versions move, a new snapshot is built in a
+background thread and swapped in with a single assignment; requests keep
+reading the previous one meanwhile (copy-on-write). Only the first request
+of a process waits for a build. With CATALOG_SNAPSHOT_BACKGROUND_REFRESH off
+the rebuild runs in the request thread instead.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max
+
+from .cache import get_version
+from .models import Category, Product
+from .serializers import CategorySerializer, ProductSerializer
+
+CATALOG_MODELS = ('product', 'category')
+
+DEFAULT_CHECK_SECONDS = 5
+
+
+class ProductRecord:
+    """A product in the snapshot: its keyset position and API payload"""
+    __slots__ = ('pk', 'category_id', 'created_at', 'data')
+
+    def __init__(self, pk, category_id, created_at, data):
+        self.pk = pk
+        self.category_id = category_id
+        self.created_at = created_at
+        self.data = data
+
+    def payload(self, request=None):
+        """ProductSerializer output, with the image URL made absolute for the request"""
+        if request is None or not self.data['image']:
+            return self.data
+        return {**self.data, 'image': request.build_absolute_uri(self.data['image'])}
+
+
+def _keyset(record):
+    return (record.created_at, record.pk)
+
+
+class CatalogSnapshot:
+    """Immutable view of the catalog; never mutated once built"""
+    __slots__ = (
+        'versions', 'products', 'by_id', 'by_category', 'by_created',
+        'categories', 'categories_by_id', 'category_counts',
+    )
+
+    def __init__(self, versions, products, categories):
+        self.versions = versions
+        self.products = tuple(products)
+        self.by_id = {record.pk: record for record in self.products}
+        self.category_counts = Counter(record.category_id for record in self.products)
+        self.categories = tuple(
+            {**data, 'product_count': self.category_counts.get(data['id'], 0)}
+            for data in categories
+        )
+        self.categories_by_id = {data['id']: data for data in self.categories}
+
+        slugs = {data['id']: data['slug'] for data in categories}
+        by_category = {slug: [] for slug in slugs.values()}
+        for record in self.products:
+            by_category[slugs[record.category_id]].append(record)
+        self.by_category = {slug: tuple(records) for slug, records in by_category.items()}
+
+        # Oldest first on (created_at, id), the keyset pagination order
+        self.by_created = {
+            slug: tuple(sorted(records, key=_keyset))
+            for slug, records in self.by_category.items()
+        }
+        self.by_created[None] = tuple(sorted(self.products, key=_keyset))
+
+    def product(self, pk):
+        return self.by_id.get(pk)
+
+    def category(self, pk):
+        return self.categories_by_id.get(pk)
+
+    def product_list(self, category=None):
+        """Products in id order, optionally of one category slug"""
+        if category is None:
+            return self.products
+        return self.by_category.get(category, ())
+
+    def keyset_list(self, category=None):
+        """Products ordered by (created_at, id), optionally of one category slug"""
+        return self.by_created.get(category, ())
+
+
+def keyset_slice(records, position, reverse, size):
+    """
+    Up to `size` records past a keyset position of a (created_at, id)
+    ordered sequence, in the order KeysetPagination reads them from SQL:
+    newest first going forwards, oldest first going backwards.
+    """
+    if reverse:
+        start = 0 if position is None else bisect_right(records, position, key=_keyset)
+        return list(records[start:start + size])
+    end = len(records) if position is None else bisect_left(records, position, key=_keyset)
+    return list(reversed(records[max(end - size, 0):end]))
+
+
+def table_version(count, updated_at):
+    """Change version of a catalog table from its row count and latest updated_at"""
+    return f'{count}-{int(updated_at.timestamp() * 1000000) if updated_at else 0}'
+
+
+def database_versions():
+    """Current change versions of the catalog tables, in CATALOG_MODELS order"""
+    return tuple(
+        table_version(**model.objects.aggregate(count=Count('id'), updated_at=Max('updated_at')))
+        for model in (Product, Category)
+    )
+
+
+def build_snapshot():
+    """
+    Snapshot of the catalog, read in two queries of one transaction so every
+    product's category is among the categories read. Its versions are taken
+    from the rows read, so they always describe its content.
+    """
+    with transaction.atomic():
+        categories = list(Category.objects.order_by('id'))
+        products = list(Product.objects.select_related('category').order_by('id'))
+    versions = tuple(
+        table_version(len(rows), max((row.updated_at for row in rows), default=None))
+        for rows in (products, categories)
+    )
+    payloads = ProductSerializer(products, many=True).data
+    return CatalogSnapshot(versions, [
+        ProductRecord(product.pk, product.category_id, product.created_at, data)
+        for product, data in zip(products, payloads)
+    ], CategorySerializer(categories, many=True).data)
+
+
+_snapshot = None
+_lock = threading.Lock()
+_rebuilding = False
+# (snapshot, cache counters, monotonic time) of the last database check
+_checked = None
+
+
+def cache_counters():
+    """Per-process change counters bumped by this process's writes (cache.py)"""
+    return tuple(get_version(name) for name in CATALOG_MODELS)
+
+
+def _install(snapshot, counters):
+    global _snapshot, _checked
+    with _lock:
+        _snapshot = snapshot
+        _checked = (snapshot, counters, time.monotonic())
+    return snapshot
+
+
+def is_current(snapshot):
+    """
+    Whether `snapshot` still matches the database. Reuses the last check
+    while it is younger than CATALOG_SNAPSHOT_CHECK_SECONDS and no write of
+    this process moved the cache counters since.
+    """
+    global _checked
+    counters = cache_counters()
+    checked = _checked
+    max_age = getattr(settings, 'CATALOG_SNAPSHOT_CHECK_SECONDS', DEFAULT_CHECK_SECONDS)
+    if (checked is not None and checked[0] is snapshot and checked[1] == counters
+            and time.monotonic() - checked[2] < max_age):
+        return True
+    if database_versions() != snapshot.versions:
+        return False
+    with _lock:
+        _checked = (snapshot, counters, time.monotonic())
+    return True
+
+
+def _rebuild():
+    global _rebuilding
+    try:
+        counters = cache_counters()
+        _install(build_snapshot(), counters)
+    finally:
+        with _lock:
+            _rebuilding = False
+        connection.close()
+
+
+def get_snapshot():
+    """Current catalog snapshot, scheduling a rebuild when it is out of date"""
+    global _rebuilding
+    snapshot = _snapshot
+    # While a rebuild runs the previous snapshot is served without checking again
+    if snapshot is not None and (_rebuilding or is_current(snapshot)):
+        return snapshot
+
+    if snapshot is None or not getattr(settings, 'CATALOG_SNAPSHOT_BACKGROUND_REFRESH', True):
+        # Counters read before the build: a write during it forces a new check
+        counters = cache_counters()
+        return _install(build_snapshot(), counters)
+
+    with _lock:
+        start = not _rebuilding
+        _rebuilding = True
+    if start:
+        threading.Thread(target=_rebuild, name='catalog-snapshot', daemon=True).start()
+    return snapshot
+
+
+def reset_snapshot():
+    """Drop the snapshot; the next request builds a fresh one"""
+    global _snapshot, _checked, _rebuilding
+    with _lock:
+        _snapshot = None
+        _checked = None
+        _rebuilding = False
+
+
+class CatalogSnapshotMixin:
+    """
+    Serves a view from one snapshot per request. With
+    VersionedResponseCacheMixin the cached responses are keyed by the
+    versions of that snapshot rather than the current ones, so a stale
+    snapshot served during a background rebuild is never cached as fresh.
+    """
+
+    def get_snapshot(self):
+        if not hasattr(self, '_catalog_snapshot'):
+            self._catalog_snapshot = get_snapshot()
+        return self._catalog_snapshot
+
+    def get_versions(self):
+        versions = dict(zip(CATALOG_MODELS, self.get_snapshot().versions))
+        return [versions[name] for name in self.cache_models]
@@ -0,0 +1,189 @@
+"""
+Bulk import of the product catalog from CSV or JSON Lines.
+
+    python manage.py import_products catalogo.csv
+    python manage.py import_products catalogo.jsonl --batch-size 5000
+
+Each row has sku, name, price, category (a category slug) and optionally
+description; CSV files need a header with those column names. The file is
+streamed `batch_size` rows at a time, so memory stays bounded whatever its
+size. Every batch is validated, then upserted on sku with a single
+bulk_create(update_conflicts=True) inside its own transaction: products
+already in the catalog are updated, new ones are inserted. Invalid rows are
+reported with their line number and skipped.
+
+Every upserted row gets a new updated_at, so a running server picks the
+import up from the database: its catalog snapshot and the responses cached
+from it are keyed by the tables' row count and latest updated_at
+(api/catalog.py), checked every CATALOG_SNAPSHOT_CHECK_SECONDS. bulk_create
+sends no post_save signals, so the 'product' cache version is also bumped
+once at the end; that reaches other processes only through a shared cache
+backend. The FTS triggers (api/search.py) still index every inserted or
+renamed product.
+"""
+import csv
+import json
+import time
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import bump_version
+from api.models import Category, Product
+
+DEFAULT_BATCH_SIZE = 2000
+
+# Invalid rows listed in the output; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+UPDATE_FIELDS = ('name', 'description', 'price', 'category', 'updated_at')
+
+PRICE_STEP = Decimal('0.01')
+MAX_PRICE = Decimal('99999999.99')
+
+ImportResult = namedtuple('ImportResult', 'rows imported invalid errors seconds')
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path, file_format=None):
+    """Yields (line number, row dict) from a CSV or JSON Lines file"""
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    row = e
+                yield line_number, row
+
+
+def build_product(row, categories):
+    """Validated, unsaved Product for one input row"""
+    if isinstance(row, ValueError):
+        raise RowError(f'JSON inválido ({row})')
+    if not isinstance(row, dict):
+        raise RowError('a linha não é um objeto')
+
+    sku = str(row.get('sku') or '').strip()
+    if not sku or len(sku) > 64:
+        raise RowError('sku vazio ou com mais de 64 caracteres')
+    name = str(row.get('name') or '').strip()
+    if not name or len(name) > 200:
+        raise RowError('name vazio ou com mais de 200 caracteres')
+
+    try:
+        price = Decimal(str(row.get('price'))).quantize(PRICE_STEP)
+    except InvalidOperation:
+        raise RowError(f"price inválido: {row.get('price')!r}")
+    if not price.is_finite():
+        raise RowError(f"price inválido: {row.get('price')!r}")
+    if not 0 <= price <= MAX_PRICE:
+        raise RowError(f'price fora do intervalo: {price}')
+
+    slug = str(row.get('category') or '').strip()
+    if slug not in categories:
+        raise RowError(f'categoria desconhecida: {slug!r}')
+
+    return Product(
+        sku=sku, name=name, description=str(row.get('description') or ''),
+        price=price, category_id=categories[slug],
+    )
+
+
+def validate_batch(rows, categories):
+    """
+    Products and (line number, message) errors of a batch. A sku repeated in
+    the batch keeps its last row, as a later batch would.
+    """
+    products = {}
+    errors = []
+    for line_number, row in rows:
+        try:
+            product = build_product(row, categories)
+        except RowError as e:
+            errors.append((line_number, str(e)))
+        else:
+            products[product.sku] = product
+    return list(products.values()), errors
+
+
+def import_products(path, file_format=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Upserts the products of `path` in batches of `batch_size` rows, one
+    transaction per batch. `progress(rows, seconds)` is called after each
+    batch. Returns an ImportResult; `errors` keeps the first
+    MAX_REPORTED_ERRORS invalid rows.
+    """
+    categories = dict(Category.objects.values_list('slug', 'id'))
+    rows = read_rows(path, file_format)
+    result = {'rows': 0, 'imported': 0, 'invalid': 0}
+    errors = []
+    started = time.perf_counter()
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            products, batch_errors = validate_batch(batch, categories)
+            if products:
+                with transaction.atomic():
+                    Product.objects.bulk_create(
+                        products, update_conflicts=True, unique_fields=['sku'], update_fields=UPDATE_FIELDS,
+                    )
+            result['rows'] += len(batch)
+            result['imported'] += len(products)
+            result['invalid'] += len(batch_errors)
+            errors.extend(batch_errors[:MAX_REPORTED_ERRORS - len(errors)])
+            if progress is not None:
+                progress(result['rows'], time.perf_counter() - started)
+    finally:
+        if result['imported']:
+            bump_version('product')
+    return ImportResult(errors=errors, seconds=time.perf_counter() - started, **result)
+
+
+class Command(BaseCommand):
+    help = 'Importa produtos de um arquivo CSV ou JSON Lines (upsert por sku)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo .csv ou .jsonl')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='Formato do arquivo (padrão: pela extensão)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Linhas por lote/transação')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser positivo')
+
+        def progress(rows, seconds):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{rows} linhas ({rows / seconds:,.0f} linhas/s)')
+
+        try:
+            result = import_products(options['path'], options['format'], options['batch_size'], progress)
+        except OSError as e:
+            raise CommandError(f'Não foi possível ler {options["path"]}: {e}')
+
+        for line_number, message in result.errors:
+            self.stderr.write(f'Linha {line_number}: {message}')
+        if result.invalid > len(result.errors):
+            self.stderr.write(f'... e mais {result.invalid - len(result.errors)} linhas inválidas')
+
+        rate = result.rows / result.seconds if result.seconds else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.imported} produtos importados, {result.invalid} linhas inválidas, '
+            f'{result.rows} linhas em {result.seconds:.2f}s ({rate:,.0f} linhas/s)'
+        ))
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def seed_settings(apps, schema_editor):
+    SystemSetting = apps.get_model('api', 'SystemSetting')
+    SystemSetting.objects.get_or_create(
+        setting_key='free_shipping_minimum',
+        defaults={'setting_value': '200.00', 'description': 'Valor mínimo para frete grátis'},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_product_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemSetting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('setting_key', models.CharField(max_length=100, unique=True)),
+                ('setting_value', models.TextField(blank=True)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_settings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+from api.search import install_fts
+
+
+def reinstall_fts(apps, schema_editor):
+    # Adding the column rebuilt api_product on SQLite and dropped the FTS triggers
+    install_fts(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(reinstall_fts, migrations.RunPython.noop),
+    ]
@@ -30,6 +30,7 @@ class Category(models.Model):
     slug = models.SlugField(unique=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = "Categories"
@@ -38,6 +39,8 @@ class Category(models.Model):
         return self.name
 
 class Product(models.Model):
+    # Catalog identifier used by bulk imports to update existing products
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=200)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -46,6 +49,15 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset pagination on (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='product_cat_created_id_idx'),
+            # Incremental analytics export (analytics_export.py)
+            models.Index(fields=['updated_at'], name='product_updated_at_idx'),
+        ]
+    
     def __str__(self):
         return self.name
 
@@ -66,6 +78,14 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset pagination of a user's order history on (created_at, id)
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_id_idx'),
+            # Incremental analytics export (analytics_export.py)
+            models.Index(fields=['updated_at'], name='order_updated_at_idx'),
+        ]
+    
     def __str__(self):
         return f"Order {self.id} - {self.user.username}"
 
@@ -76,4 +96,16 @@ class OrderItem(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     
     def __str__(self):
-        return f"{self.quantity} x {self.product.name}"
\ No newline at end of file
+        return f"{self.quantity} x {self.product.name}"
+
+class SystemSetting(models.Model):
+    """Store-wide key/value settings (same keys as the system_settings table of the SQL schemas)"""
+    setting_key = models.CharField(max_length=100, unique=True)
+    setting_value = models.TextField(blank=True)
+    description = models.CharField(max_length=255, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.setting_key} = {self.setting_value}"
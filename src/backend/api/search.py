@@ -0,0 +1,130 @@
+"""
+Full-text product search backed by an SQLite FTS5 index.
+
+api_product_fts is an external-content FTS5 table over api_product(name,
+description), kept in sync by triggers so bulk inserts and raw SQL updates
+are indexed too. The unicode61 tokenizer folds case and accents, so
+"eletronico" matches "Eletrônicos"; every query term is a prefix query and
+results are ranked with bm25, weighting the name above the description.
+
+Note: when a later migration alters api_product, SQLite's schema editor
+rebuilds the table and drops its triggers. Such migrations must call
+install_fts() again.
+"""
+import re
+
+from django.db import connection
+
+FTS_TABLE = 'api_product_fts'
+
+INSTALL_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='api_product', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2",
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON api_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON api_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON api_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    # Default ranking: a name hit weighs ten times a description hit
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+UNINSTALL_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def install_fts(schema_connection):
+    if schema_connection.vendor != 'sqlite':
+        return
+    with schema_connection.cursor() as cursor:
+        for statement in INSTALL_SQL:
+            cursor.execute(statement)
+
+
+def uninstall_fts(schema_connection):
+    if schema_connection.vendor != 'sqlite':
+        return
+    with schema_connection.cursor() as cursor:
+        for statement in UNINSTALL_SQL:
+            cursor.execute(statement)
+
+
+def build_match_query(text):
+    """
+    Turn free user input into a safe FTS5 query: every word becomes a
+    quoted prefix term and all terms must match.
+    """
+    terms = TERM_RE.findall(text or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+class ProductSearchResults:
+    """
+    Lazy, sliceable result set for a search, usable by the paginators.
+    Slicing runs one ranked FTS query for the page of ids and one query to
+    load those products; count() is only issued if the paginator asks.
+    """
+
+    def __init__(self, queryset, text):
+        self.queryset = queryset
+        self.match = build_match_query(text)
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.match:
+            return []
+        start = index.start or 0
+        limit = -1 if index.stop is None else max(index.stop - start, 0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY rank LIMIT %s OFFSET %s",
+                [self.match, limit, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return []
+        products = self.queryset.in_bulk(ids)
+        return [products[pk] for pk in ids if pk in products]
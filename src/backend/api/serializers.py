@@ -1,8 +1,12 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.db import connection, transaction
 from .models import Category, Product, Order, OrderItem
+from .shipping import normalize_cep
 
 User = get_user_model()
 
@@ -112,18 +116,127 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('user', 'created_at', 'updated_at')
 
+class OrderItemCreateSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+def check_order_items(orders_data):
+    """
+    Check the line items of every order against Product.price, loading all
+    referenced products with a single in_bulk query. Returns one error dict
+    per order (empty when the order is valid).
+    """
+    product_ids = {item['product'] for order_data in orders_data for item in order_data['items']}
+    products = Product.objects.in_bulk(product_ids)
+    
+    errors = []
+    for order_data in orders_data:
+        item_errors = []
+        for item in order_data['items']:
+            product = products.get(item['product'])
+            if product is None:
+                item_errors.append({'product': ['Produto não encontrado.']})
+            elif item['price'] != product.price:
+                item_errors.append({'price': [f'Preço divergente do cadastro ({product.price}).']})
+            else:
+                item_errors.append({})
+        errors.append({'items': item_errors} if any(item_errors) else {})
+    return errors
+
+def create_orders(orders_data):
+    """
+    Insert the orders and all their items in one transaction, using
+    bulk_create so the number of queries does not grow with the item count.
+    """
+    with transaction.atomic():
+        orders = [
+            Order(**{key: value for key, value in order_data.items() if key != 'items'})
+            for order_data in orders_data
+        ]
+        if len(orders) > 1 and connection.features.can_return_rows_from_bulk_insert:
+            orders = Order.objects.bulk_create(orders)
+        else:
+            for order in orders:
+                order.save()
+        
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_id=item['product'],
+                quantity=item['quantity'],
+                price=item['price']
+            )
+            for order, order_data in zip(orders, orders_data)
+            for item in order_data['items']
+        ])
+    return orders
+
+class OrderCreateListSerializer(serializers.ListSerializer):
+    """Batch of orders posted at once (B2B importer)"""
+    
+    def to_internal_value(self, data):
+        # Checked here rather than in validate() so errors stay one per order
+        attrs = super().to_internal_value(data)
+        errors = check_order_items(attrs)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+    
+    def create(self, validated_data):
+        return create_orders(validated_data)
+
 class OrderCreateSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True)
+    items = OrderItemCreateSerializer(many=True, allow_empty=False)
     
     class Meta:
         model = Order
         fields = ('total_amount', 'shipping_address', 'payment_method', 'items')
+        list_serializer_class = OrderCreateListSerializer
+    
+    def validate(self, attrs):
+        # In a batch the list serializer checks every order in one query
+        if not isinstance(self.parent, serializers.ListSerializer):
+            errors = check_order_items([attrs])[0]
+            if errors:
+                raise serializers.ValidationError(errors)
+        return attrs
     
     def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
-        
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
-        
-        return order
\ No newline at end of file
+        return create_orders([validated_data])[0]
+
+class ShippingItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+class ShippingQuoteSerializer(serializers.Serializer):
+    """
+    CEP plus either the cart items (priced from the catalog, one in_bulk
+    query) or a ready subtotal
+    """
+    cep = serializers.CharField()
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0, required=False)
+    items = ShippingItemSerializer(many=True, required=False)
+    
+    def validate_cep(self, value):
+        cep = normalize_cep(value)
+        if cep is None:
+            raise serializers.ValidationError('CEP inválido.')
+        return cep
+    
+    def validate(self, attrs):
+        items = attrs.get('items')
+        if items:
+            products = Product.objects.in_bulk({item['product'] for item in items})
+            errors = [
+                {} if item['product'] in products else {'product': ['Produto não encontrado.']}
+                for item in items
+            ]
+            if any(errors):
+                raise serializers.ValidationError({'items': errors})
+            attrs['subtotal'] = sum(
+                (products[item['product']].price * item['quantity'] for item in items), Decimal('0')
+            )
+        elif 'subtotal' not in attrs:
+            attrs['subtotal'] = Decimal('0')
+        return attrs
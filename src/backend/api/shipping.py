@@ -0,0 +1,194 @@
+"""
+CEP lookup and shipping quotes for the checkout.
+
+Addresses come from the CEP Service (cep_service.py) through one pooled
+keep-alive session per process and are kept in Django's default cache, so
+every worker pointed at the same backend shares them. Shipping options follow
+the "Frete e Entrega" page; the free shipping threshold is the
+`free_shipping_minimum` system setting.
+"""
+import threading
+import unicodedata
+from decimal import Decimal, InvalidOperation
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import get_version
+from .models import SystemSetting
+
+CEP_CACHE_KEY = 'api:cep:{}'
+SETTING_CACHE_KEY = 'api:setting:{}:{}'
+
+# Message of the CEP Service for a CEP no provider knows
+CEP_NOT_FOUND = 'CEP não encontrado'
+
+DEFAULT_FREE_SHIPPING_MINIMUM = Decimal('200.00')
+
+EXPRESS_PRICE = Decimal('19.90')
+STANDARD_PRICE = Decimal('9.90')
+
+REGIONS = {
+    'SP': 'Sudeste', 'RJ': 'Sudeste', 'MG': 'Sudeste', 'ES': 'Sudeste',
+    'PR': 'Sul', 'SC': 'Sul', 'RS': 'Sul',
+    'DF': 'Centro-Oeste', 'GO': 'Centro-Oeste', 'MT': 'Centro-Oeste', 'MS': 'Centro-Oeste',
+    'BA': 'Nordeste', 'SE': 'Nordeste', 'AL': 'Nordeste', 'PE': 'Nordeste', 'PB': 'Nordeste',
+    'RN': 'Nordeste', 'CE': 'Nordeste', 'PI': 'Nordeste', 'MA': 'Nordeste',
+    'AM': 'Norte', 'PA': 'Norte', 'AC': 'Norte', 'RO': 'Norte', 'RR': 'Norte', 'AP': 'Norte', 'TO': 'Norte',
+}
+
+# Delivery time of the standard option per region, in business days
+REGION_DAYS = {
+    'Sudeste': (1, 2),
+    'Sul': (2, 3),
+    'Centro-Oeste': (3, 5),
+    'Nordeste': (4, 7),
+    'Norte': (5, 10),
+}
+
+ECONOMY_DAYS = (5, 10)
+
+# Express delivery (24h) is only offered in state capitals
+CAPITALS = {
+    'AC': 'Rio Branco', 'AL': 'Maceió', 'AP': 'Macapá', 'AM': 'Manaus', 'BA': 'Salvador',
+    'CE': 'Fortaleza', 'DF': 'Brasília', 'ES': 'Vitória', 'GO': 'Goiânia', 'MA': 'São Luís',
+    'MT': 'Cuiabá', 'MS': 'Campo Grande', 'MG': 'Belo Horizonte', 'PA': 'Belém',
+    'PB': 'João Pessoa', 'PR': 'Curitiba', 'PE': 'Recife', 'PI': 'Teresina',
+    'RJ': 'Rio de Janeiro', 'RN': 'Natal', 'RS': 'Porto Alegre', 'RO': 'Porto Velho',
+    'RR': 'Boa Vista', 'SC': 'Florianópolis', 'SP': 'São Paulo', 'SE': 'Aracaju', 'TO': 'Palmas',
+}
+
+
+class CepServiceError(Exception):
+    """The CEP Service could not be reached or failed"""
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide keep-alive session to the CEP Service"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.CEP_SERVICE_POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def normalize_cep(cep):
+    """8-digit CEP, or None"""
+    digits = ''.join(filter(str.isdigit, str(cep or '')))
+    return digits if len(digits) == 8 else None
+
+
+def lookup_cep(cep):
+    """
+    Address of a normalized CEP, or None if it does not exist. Answers,
+    including unknown CEPs, are cached; raises CepServiceError when the
+    CEP Service is down or none of its providers answered.
+    """
+    key = CEP_CACHE_KEY.format(cep)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry['data']
+
+    try:
+        response = get_session().get(
+            f'{settings.CEP_SERVICE_URL}/api/cep/{cep}',
+            timeout=settings.CEP_SERVICE_TIMEOUT,
+        )
+        payload = response.json()
+    except (requests.RequestException, ValueError) as e:
+        raise CepServiceError(str(e))
+
+    if response.status_code == 200 and payload.get('success'):
+        cache.set(key, {'data': payload['data']}, settings.CEP_CACHE_TIMEOUT)
+        return payload['data']
+    if payload.get('error') == CEP_NOT_FOUND:
+        cache.set(key, {'data': None}, settings.CEP_NOT_FOUND_CACHE_TIMEOUT)
+        return None
+    # Provider failures are not cached; the next checkout tries again
+    raise CepServiceError(payload.get('error') or f'HTTP {response.status_code}')
+
+
+def get_system_setting(key, default=None):
+    """Value of an active SystemSetting, cached until any setting changes"""
+    cache_key = SETTING_CACHE_KEY.format(get_version('setting'), key)
+    entry = cache.get(cache_key)
+    if entry is None:
+        value = (
+            SystemSetting.objects
+            .filter(setting_key=key, is_active=True)
+            .values_list('setting_value', flat=True)
+            .first()
+        )
+        entry = {'value': value}
+        cache.set(cache_key, entry, None)
+    return default if entry['value'] is None else entry['value']
+
+
+def get_free_shipping_minimum():
+    try:
+        return Decimal(get_system_setting('free_shipping_minimum'))
+    except (TypeError, InvalidOperation):
+        return DEFAULT_FREE_SHIPPING_MINIMUM
+
+
+def _fold(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def _money(value):
+    return str(value.quantize(Decimal('0.01')))
+
+
+def quote_shipping(address, subtotal, free_minimum):
+    """Shipping options available for an address and cart subtotal"""
+    uf = (address.get('state') or '').upper()
+    region = REGIONS.get(uf)
+    options = []
+
+    if uf in CAPITALS and _fold(address.get('city')) == _fold(CAPITALS[uf]):
+        options.append({
+            'code': 'express',
+            'name': 'Entrega Expressa',
+            'price': _money(EXPRESS_PRICE),
+            'min_days': 1,
+            'max_days': 1,
+        })
+
+    min_days, max_days = REGION_DAYS.get(region, ECONOMY_DAYS)
+    options.append({
+        'code': 'standard',
+        'name': 'Entrega Padrão',
+        'price': _money(STANDARD_PRICE),
+        'min_days': min_days,
+        'max_days': max_days,
+    })
+
+    if subtotal >= free_minimum:
+        options.append({
+            'code': 'economy',
+            'name': 'Entrega Econômica',
+            'price': _money(Decimal('0')),
+            'min_days': ECONOMY_DAYS[0],
+            'max_days': ECONOMY_DAYS[1],
+        })
+
+    return {
+        'region': region,
+        'subtotal': _money(subtotal),
+        'free_shipping_minimum': _money(free_minimum),
+        'free_shipping': subtotal >= free_minimum,
+        'missing_for_free_shipping': _money(max(free_minimum - subtotal, Decimal('0'))),
+        'options': options,
+    }
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sqlite_tuning import apply_pragmas
+
+from .cache import bump_version
+from .models import Category, Product, SystemSetting
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    bump_version('category')
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, **kwargs):
+    bump_version('product')
+
+
+@receiver([post_save, post_delete], sender=SystemSetting)
+def invalidate_setting_cache(sender, **kwargs):
+    bump_version('setting')
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        apply_pragmas(connection.connection, getattr(settings, 'SQLITE_PRAGMAS', None))
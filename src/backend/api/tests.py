@@ -0,0 +1,642 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+import requests
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from rest_framework.test import APITestCase
+
+from . import catalog
+from .cache import get_version
+from .management.commands.import_products import import_products
+from .models import Category, Product, Order, OrderItem, SystemSetting
+
+User = get_user_model()
+
+# Categories + products read for a catalog snapshot, in one transaction
+# (a savepoint and its release inside the test's transaction)
+SNAPSHOT_QUERIES = 4
+# Row count + latest updated_at of products and categories
+VERSION_CHECK_QUERIES = 2
+
+
+class QueryCountMixin:
+    """
+    Pins the number of SQL queries an endpoint issues, so an N+1
+    regression in a serializer fails the suite instead of production.
+    """
+
+    def assertEndpointQueries(self, num, url, method='get', **kwargs):
+        with self.assertNumQueries(num):
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400, response.data)
+        return response
+
+
+class CatalogSnapshotTestMixin:
+    """
+    Starts every test from an empty catalog snapshot that is rebuilt in the
+    request thread: the previous test's snapshot was read from rows rolled
+    back since, and a background thread would not see the test's rows.
+    """
+
+    def setUp(self):
+        super().setUp()
+        catalog.reset_snapshot()
+        self.enterContext(override_settings(CATALOG_SNAPSHOT_BACKGROUND_REFRESH=False))
+
+
+class ProductPaginationTests(CatalogSnapshotTestMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Moda', slug='moda')
+        for i in range(45):
+            Product.objects.create(
+                name=f'Produto {i}',
+                description='Descrição',
+                price=Decimal('10.00'),
+                category=category,
+            )
+
+    def test_page_number_mode_returns_count(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 45)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_count_false_skips_count(self):
+        response = self.client.get('/api/products/?page=3&count=false')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_count_false_out_of_range_page(self):
+        response = self.client.get('/api/products/?page=9&count=false')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_mode_walks_every_product_once(self):
+        seen = []
+        url = '/api/products/?pagination=cursor'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        expected = list(Product.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_cursor_previous_link_returns_prior_page(self):
+        first = self.client.get('/api/products/?pagination=cursor')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in back.data['results']],
+            [item['id'] for item in first.data['results']],
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/products/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class EndpointQueryCountTests(CatalogSnapshotTestMixin, QueryCountMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cliente', email='cliente@example.com', password='senha-forte-123'
+        )
+        categories = [
+            Category.objects.create(name=f'Categoria {i}', slug=f'categoria-{i}')
+            for i in range(4)
+        ]
+        products = [
+            Product.objects.create(
+                name=f'Produto {i}',
+                description='Descrição',
+                price=Decimal('10.00'),
+                category=categories[i % len(categories)],
+            )
+            for i in range(20)
+        ]
+        for i in range(20):
+            order = Order.objects.create(
+                user=cls.user,
+                total_amount=Decimal('50.00'),
+                shipping_address='Rua A, 1',
+                payment_method='pix',
+            )
+            for product in products[i % 4::4][:5]:
+                OrderItem.objects.create(
+                    order=order, product=product, quantity=1, price=product.price
+                )
+        cls.order = order
+        cls.product = products[0]
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def test_product_list_queries(self):
+        # Build the catalog snapshot, then no queries
+        response = self.assertEndpointQueries(SNAPSHOT_QUERIES, '/api/products/')
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEndpointQueries(0, '/api/products/?category=categoria-1')
+
+    def test_product_list_cursor_queries(self):
+        self.assertEndpointQueries(SNAPSHOT_QUERIES, '/api/products/?pagination=cursor')
+        self.assertEndpointQueries(0, '/api/products/?pagination=cursor&category=categoria-1')
+
+    def test_product_detail_queries(self):
+        self.assertEndpointQueries(SNAPSHOT_QUERIES, f'/api/products/{self.product.pk}/')
+        self.assertEndpointQueries(0, f'/api/products/{self.product.pk + 1}/')
+
+    def test_order_list_queries(self):
+        # COUNT(*) + orders joined with user + items joined with product
+        response = self.assertEndpointQueries(3, '/api/orders/')
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(len(response.data['results'][0]['items']), 5)
+        # Page-number mode uses the keyset order: newest first
+        ids = [order['id'] for order in response.data['results']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_order_detail_queries(self):
+        self.assertEndpointQueries(2, f'/api/orders/{self.order.pk}/')
+
+
+class OrderCreateTests(QueryCountMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='atacado', email='atacado@example.com', password='senha-forte-123'
+        )
+        category = Category.objects.create(name='Casa', slug='casa')
+        cls.products = [
+            Product.objects.create(
+                name=f'Produto {i}',
+                description='Descrição',
+                price=Decimal('12.50'),
+                category=category,
+            )
+            for i in range(200)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def order_payload(self, products, price='12.50'):
+        return {
+            'total_amount': str(Decimal(price) * len(products)),
+            'shipping_address': 'Rua B, 2',
+            'payment_method': 'boleto',
+            'items': [
+                {'product': product.pk, 'quantity': 1, 'price': price}
+                for product in products
+            ],
+        }
+
+    def test_large_order_uses_constant_queries(self):
+        # in_bulk + savepoint + order insert + item insert + release
+        # + orders/user fetch + items/product prefetch
+        response = self.assertEndpointQueries(
+            7, '/api/orders/', method='post',
+            data=self.order_payload(self.products), format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['items']), 200)
+
+    def test_price_mismatch_is_rejected(self):
+        response = self.client.post(
+            '/api/orders/', self.order_payload(self.products[:2], price='1.00'), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('price', response.data['items'][0])
+        self.assertFalse(Order.objects.exists())
+
+    def test_unknown_product_is_rejected(self):
+        payload = self.order_payload(self.products[:1])
+        payload['items'][0]['product'] = 999999
+        response = self.client.post('/api/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('product', response.data['items'][0])
+
+    def test_batch_of_orders(self):
+        payload = [self.order_payload(self.products[i:i + 3]) for i in range(0, 30, 3)]
+        response = self.client.post('/api/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(OrderItem.objects.count(), 30)
+
+    def test_batch_is_all_or_nothing(self):
+        payload = [self.order_payload(self.products[:2]), self.order_payload(self.products[2:4], price='1.00')]
+        response = self.client.post('/api/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('price', response.data[1]['items'][0])
+        self.assertFalse(Order.objects.exists())
+
+
+class ResponseCacheTests(CatalogSnapshotTestMixin, QueryCountMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Games', slug='games')
+        cls.product = Product.objects.create(
+            name='Console', description='Console', price=Decimal('2250.00'), category=cls.category
+        )
+
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_category_list_served_from_cache(self):
+        self.assertEndpointQueries(SNAPSHOT_QUERIES, '/api/categories/')
+        self.assertEndpointQueries(0, '/api/categories/')
+
+    def test_category_save_invalidates_cache(self):
+        self.client.get('/api/categories/')
+        Category.objects.create(name='Livros', slug='livros')
+        response = self.assertEndpointQueries(VERSION_CHECK_QUERIES + SNAPSHOT_QUERIES, '/api/categories/')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_product_detail_etag_and_304(self):
+        url = f'/api/products/{self.product.pk}/'
+        response = self.client.get(url)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_product_update_changes_etag(self):
+        url = f'/api/products/{self.product.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.product.price = Decimal('1999.00')
+        self.product.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['price'], '1999.00')
+
+    def test_if_modified_since(self):
+        url = f'/api/products/{self.product.pk}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_category_rename_moves_last_modified(self):
+        # Rows written earlier, so the rename lands in a later second
+        earlier = timezone.now() - timedelta(days=1)
+        Product.objects.filter(pk=self.product.pk).update(updated_at=earlier)
+        Category.objects.filter(pk=self.category.pk).update(updated_at=earlier)
+        url = f'/api/products/{self.product.pk}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.category.name = 'Jogos'
+        self.category.save()
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['category_name'], 'Jogos')
+        self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(last_modified))
+
+    def test_category_rename_refreshes_product_detail(self):
+        url = f'/api/products/{self.product.pk}/'
+        self.client.get(url)
+        self.category.name = 'Jogos'
+        self.category.save()
+        self.assertEqual(self.client.get(url).data['category_name'], 'Jogos')
+
+
+class CatalogSnapshotTests(CatalogSnapshotTestMixin, QueryCountMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.games = Category.objects.create(name='Games', slug='games')
+        cls.home = Category.objects.create(name='Casa', slug='casa')
+        cls.console = Product.objects.create(
+            name='Console', description='Console', price=Decimal('2250.00'), category=cls.games
+        )
+        cls.controller = Product.objects.create(
+            name='Controle', description='Controle', price=Decimal('349.90'), category=cls.games
+        )
+        cls.mug = Product.objects.create(
+            name='Caneca', description='Caneca', price=Decimal('45.00'), category=cls.home
+        )
+
+    def test_category_filter(self):
+        response = self.client.get('/api/products/?category=games')
+        self.assertEqual([item['id'] for item in response.data['results']], [self.console.pk, self.controller.pk])
+        self.assertEqual(response.data['results'][0]['category_name'], 'Games')
+        self.assertEqual(self.client.get('/api/products/?category=livros').data['count'], 0)
+
+    def test_category_product_counts(self):
+        categories = self.client.get('/api/categories/').data['results']
+        self.assertEqual({item['slug']: item['product_count'] for item in categories}, {'games': 2, 'casa': 1})
+
+        self.mug.delete()
+        categories = self.client.get('/api/categories/').data['results']
+        self.assertEqual({item['slug']: item['product_count'] for item in categories}, {'games': 2, 'casa': 0})
+
+    def test_unknown_product(self):
+        self.assertEqual(self.client.get('/api/products/999999/').status_code, 404)
+
+    def test_background_rebuild_serves_previous_snapshot(self):
+        self.client.get('/api/products/')
+        self.console.price = Decimal('1999.00')
+        self.console.save()
+
+        with override_settings(CATALOG_SNAPSHOT_BACKGROUND_REFRESH=True), \
+                mock.patch('api.catalog.threading.Thread') as thread:
+            with self.assertNumQueries(VERSION_CHECK_QUERIES):
+                response = self.client.get('/api/products/')
+            self.assertEqual(response.data['results'][0]['price'], '2250.00')
+            # Requests arriving during the rebuild neither check again nor start another one
+            with self.assertNumQueries(0):
+                self.client.get(f'/api/products/{self.mug.pk}/')
+        self.assertEqual(thread.call_count, 1)
+
+        # Run the rebuild here; the test's database connection stays open
+        with mock.patch('api.catalog.connection'):
+            thread.call_args.kwargs['target']()
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/products/{self.console.pk}/')
+        self.assertEqual(response.data['price'], '1999.00')
+
+    def test_writes_of_other_processes_are_picked_up(self):
+        self.client.get('/api/products/')
+        # An update that moves no cache counter of this process, like one
+        # made by another worker or a script
+        Product.objects.filter(pk=self.console.pk).update(price=Decimal('1999.00'), updated_at=timezone.now())
+        Category.objects.filter(pk=self.games.pk).update(name='Jogos', updated_at=timezone.now())
+
+        # Within CATALOG_SNAPSHOT_CHECK_SECONDS of the last check: no query
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/products/{self.console.pk}/')
+        self.assertEqual(response.data['price'], '2250.00')
+
+        with override_settings(CATALOG_SNAPSHOT_CHECK_SECONDS=0):
+            with self.assertNumQueries(VERSION_CHECK_QUERIES + SNAPSHOT_QUERIES):
+                response = self.client.get(f'/api/products/{self.console.pk}/')
+            self.assertEqual((response.data['price'], response.data['category_name']), ('1999.00', 'Jogos'))
+            # Up to date: the check runs and finds nothing to rebuild
+            with self.assertNumQueries(VERSION_CHECK_QUERIES):
+                self.client.get('/api/categories/')
+
+
+class ProductSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Eletrônicos', slug='eletronicos')
+        cls.phone = Product.objects.create(
+            name='Smartphone Eletrônico', description='Câmera de 108MP',
+            price=Decimal('1760.00'), category=category
+        )
+        cls.cable = Product.objects.create(
+            name='Cabo USB', description='Acessório para aparelhos eletrônicos',
+            price=Decimal('19.90'), category=category
+        )
+        Product.objects.create(
+            name='Camiseta', description='Algodão', price=Decimal('39.90'), category=category
+        )
+
+    def search(self, query, **params):
+        return self.client.get('/api/products/search/', {'q': query, **params})
+
+    def test_accent_insensitive_prefix_match(self):
+        response = self.search('eletronico')
+        self.assertEqual(response.status_code, 200)
+        ids = [item['id'] for item in response.data['results']]
+        # A hit in the name outranks a hit in the description
+        self.assertEqual(ids, [self.phone.pk, self.cable.pk])
+        self.assertEqual(response.data['count'], 2)
+
+    def test_prefix_query(self):
+        ids = [item['id'] for item in self.search('smart').data['results']]
+        self.assertEqual(ids, [self.phone.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.cable.name = 'Cabo Smart'
+        self.cable.save()
+        self.assertEqual(self.search('smart').data['count'], 2)
+        self.phone.delete()
+        self.assertEqual(
+            [item['id'] for item in self.search('smart').data['results']], [self.cable.pk]
+        )
+
+    def test_operators_in_input_are_ignored(self):
+        response = self.search('"cabo" OR NEAR(')
+        self.assertEqual(response.status_code, 200)
+
+    def test_empty_query(self):
+        response = self.search('', count='false')
+        self.assertEqual(response.data['results'], [])
+
+
+class ProductImportTests(CatalogSnapshotTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.games = Category.objects.create(name='Games', slug='games')
+        cls.casa = Category.objects.create(name='Casa', slug='casa')
+        cls.console = Product.objects.create(
+            sku='G-1', name='Console', description='Antigo', price=Decimal('2250.00'), category=cls.games
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_csv_upsert_on_sku(self):
+        path = self.write('catalogo.csv', (
+            'sku,name,description,price,category\n'
+            'G-1,Console X,Nova geração,1999.9,games\n'
+            'C-1,Caneca,"Cerâmica, 300ml",45,casa\n'
+        ))
+        result = import_products(path)
+        self.assertEqual((result.rows, result.imported, result.invalid), (2, 2, 0))
+
+        self.console.refresh_from_db()
+        self.assertEqual((self.console.name, self.console.price), ('Console X', Decimal('1999.90')))
+        mug = Product.objects.get(sku='C-1')
+        self.assertEqual((mug.description, mug.category), ('Cerâmica, 300ml', self.casa))
+        self.assertIsNotNone(mug.created_at)
+
+    def test_invalid_rows_are_skipped(self):
+        path = self.write('catalogo.jsonl', '\n'.join([
+            '{"sku": "C-1", "name": "Caneca", "price": "45.00", "category": "casa"}',
+            '{"sku": "C-2", "name": "Prato", "price": "abc", "category": "casa"}',
+            '{"sku": "C-3", "name": "Copo", "price": 10, "category": "livros"}',
+            '{"sku": "C-4", "name": "Pires"',
+            '',
+            '{"sku": "C-5", "name": "Jarra", "price": -1, "category": "casa"}',
+            '{"sku": "C-6", "name": "Bule", "price": "NaN", "category": "casa"}',
+            '{"sku": "C-7", "name": "Tigela", "price": "Infinity", "category": "casa"}',
+        ]))
+        result = import_products(path, batch_size=2)
+        self.assertEqual((result.rows, result.imported, result.invalid), (7, 1, 6))
+        self.assertEqual([line for line, _ in result.errors], [2, 3, 4, 6, 7, 8])
+        self.assertEqual(result.errors[4][1], "price inválido: 'NaN'")
+        self.assertEqual(list(Product.objects.filter(sku__startswith='C-').values_list('sku', flat=True)), ['C-1'])
+
+    def test_repeated_sku_keeps_last_row(self):
+        path = self.write('catalogo.jsonl', (
+            '{"sku": "C-1", "name": "Caneca", "price": 45, "category": "casa"}\n'
+            '{"sku": "C-1", "name": "Caneca Grande", "price": 55, "category": "casa"}\n'
+        ))
+        import_products(path)
+        self.assertEqual(Product.objects.get(sku='C-1').name, 'Caneca Grande')
+
+    def test_search_index_and_cache_version_follow_import(self):
+        version = get_version('product')
+        path = self.write('catalogo.csv', 'sku,name,price,category\nG-1,Controle Sem Fio,199,games\n')
+        import_products(path)
+        self.assertGreater(get_version('product'), version)
+        response = self.client.get('/api/products/search/', {'q': 'controle'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.console.pk])
+
+    def test_running_server_serves_imported_catalog(self):
+        # Snapshot built before the import, as in a server already running
+        self.assertEqual(self.client.get('/api/products/').data['count'], 1)
+        path = self.write('catalogo.csv', 'sku,name,price,category\nG-1,Console X,1999,games\nC-1,Caneca,45,casa\n')
+        # The command runs in its own process: its cache bump never reaches the server
+        with mock.patch('api.management.commands.import_products.bump_version'):
+            import_products(path)
+
+        with override_settings(CATALOG_SNAPSHOT_CHECK_SECONDS=0):
+            response = self.client.get('/api/products/')
+            self.assertEqual(
+                [(item['sku'], item['name']) for item in response.data['results']],
+                [('G-1', 'Console X'), ('C-1', 'Caneca')],
+            )
+            response = self.client.get(f'/api/products/{self.console.pk}/')
+            self.assertEqual(response.data['price'], '1999.00')
+            counts = {item['slug']: item['product_count'] for item in self.client.get('/api/categories/').data['results']}
+            self.assertEqual(counts, {'games': 1, 'casa': 1})
+
+    def test_command_reports_rows_per_second(self):
+        path = self.write('catalogo.csv', 'sku,name,price,category\nC-1,Caneca,45,casa\nC-2,Prato,30,nada\n')
+        out, err = StringIO(), StringIO()
+        call_command('import_products', path, stdout=out, stderr=err)
+        self.assertIn('1 produtos importados, 1 linhas inválidas', out.getvalue())
+        self.assertIn('linhas/s', out.getvalue())
+        self.assertIn("Linha 3: categoria desconhecida: 'nada'", err.getvalue())
+
+
+class SqliteProfileTests(TestCase):
+    def test_connection_gets_profile(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class FakeCepResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class ShippingQuoteTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Casa', slug='casa')
+        cls.cheap = Product.objects.create(
+            name='Caneca', description='Caneca', price=Decimal('45.00'), category=category
+        )
+        cls.expensive = Product.objects.create(
+            name='Cafeteira', description='Cafeteira', price=Decimal('250.00'), category=category
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.session = mock.Mock()
+        self.session.get.return_value = FakeCepResponse(200, {'success': True, 'data': {
+            'street': 'Praça da Sé', 'neighborhood': 'Sé', 'city': 'São Paulo',
+            'state': 'SP', 'cep': '01001-000',
+        }})
+        patch = mock.patch('api.shipping.get_session', return_value=self.session)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def quote(self, **payload):
+        return self.client.post('/api/shipping/quote/', {'cep': '01001-000', **payload}, format='json')
+
+    def codes(self, response):
+        return [option['code'] for option in response.data['options']]
+
+    def test_address_and_options_in_one_response(self):
+        response = self.quote(items=[{'product': self.cheap.pk, 'quantity': 2}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['address']['city'], 'São Paulo')
+        self.assertEqual(response.data['subtotal'], '90.00')
+        self.assertEqual(response.data['missing_for_free_shipping'], '110.00')
+        self.assertEqual(self.codes(response), ['express', 'standard'])
+
+    def test_free_shipping_from_minimum(self):
+        response = self.quote(items=[{'product': self.expensive.pk, 'quantity': 1}])
+        self.assertTrue(response.data['free_shipping'])
+        self.assertEqual(self.codes(response), ['express', 'standard', 'economy'])
+
+    def test_minimum_follows_system_setting(self):
+        self.assertTrue(self.quote(subtotal='200.00').data['free_shipping'])
+        setting = SystemSetting.objects.get(setting_key='free_shipping_minimum')
+        setting.setting_value = '300.00'
+        setting.save()
+        response = self.quote(subtotal='200.00')
+        self.assertFalse(response.data['free_shipping'])
+        self.assertEqual(response.data['free_shipping_minimum'], '300.00')
+
+    def test_cep_and_setting_are_cached(self):
+        self.quote(subtotal='10.00')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/shipping/quote/?cep=01001000&subtotal=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_express_only_in_capitals(self):
+        self.session.get.return_value = FakeCepResponse(200, {'success': True, 'data': {
+            'street': '', 'neighborhood': '', 'city': 'Campinas', 'state': 'SP', 'cep': '13010-000',
+        }})
+        response = self.client.post('/api/shipping/quote/', {'cep': '13010000'}, format='json')
+        self.assertEqual(self.codes(response), ['standard'])
+
+    def test_unknown_cep_is_cached(self):
+        self.session.get.return_value = FakeCepResponse(404, {'success': False, 'error': 'CEP não encontrado'})
+        self.assertEqual(self.quote().status_code, 404)
+        self.assertEqual(self.quote().status_code, 404)
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_service_failure_is_not_cached(self):
+        self.session.get.side_effect = requests.ConnectionError('refused')
+        self.assertEqual(self.quote().status_code, 503)
+        self.session.get.side_effect = None
+        self.assertEqual(self.quote().status_code, 200)
+
+    def test_invalid_input(self):
+        self.assertEqual(self.client.post('/api/shipping/quote/', {'cep': '123'}, format='json').status_code, 400)
+        response = self.quote(items=[{'product': 999999, 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('items', response.data)
@@ -6,8 +6,10 @@ urlpatterns = [
     path('login/', views.login, name='login'),
     path('categories/', views.CategoryListView.as_view(), name='category-list'),
     path('products/', views.ProductListView.as_view(), name='product-list'),
+    path('products/search/', views.ProductSearchView.as_view(), name='product-search'),
     path('products/<int:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
     path('orders/', views.OrderListCreateView.as_view(), name='order-list-create'),
     path('orders/<int:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
+    path('shipping/quote/', views.shipping_quote, name='shipping-quote'),
     path('profile/', views.UserProfileView.as_view(), name='user-profile'),
 ]
\ No newline at end of file
@@ -4,14 +4,24 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from .models import User, Category, Product, Order
+from django.db import connection
+from django.db.models import Prefetch, Q
+from django.utils.dateparse import parse_datetime
+from .models import User, Category, Product, Order, OrderItem
+from .cache import VersionedResponseCacheMixin
+from .catalog import CatalogSnapshotMixin
+from .pagination import OptInKeysetPaginationMixin
+from .search import ProductSearchResults
+from .shipping import CepServiceError, get_free_shipping_minimum, lookup_cep, quote_shipping
 from .serializers import (
     UserSerializer, 
     CategorySerializer, 
     ProductSerializer, 
     OrderSerializer, 
-    OrderCreateSerializer
+    OrderCreateSerializer,
+    ShippingQuoteSerializer
 )
 
 @api_view(['POST'])
@@ -69,47 +79,154 @@ def login(request):
             'error': 'Email e senha são obrigatórios'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-class CategoryListView(generics.ListAPIView):
-    queryset = Category.objects.all()
+def product_queryset():
+    """Products joined with the category read by ProductSerializer.category_name"""
+    return Product.objects.select_related('category')
+
+def order_queryset(user):
+    """
+    A user's orders, newest first as in keyset pagination, with the user,
+    items and item products OrderSerializer reads
+    """
+    items = OrderItem.objects.select_related('product')
+    return (
+        Order.objects.filter(user=user)
+        .select_related('user')
+        .prefetch_related(Prefetch('items', queryset=items))
+        .order_by('-created_at', '-id')
+    )
+
+class CategoryListView(CatalogSnapshotMixin, VersionedResponseCacheMixin, generics.ListAPIView):
+    """Categories with their product counts, served from the catalog snapshot"""
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+    cache_models = ('category', 'product')
+    
+    def list(self, request, *args, **kwargs):
+        categories = self.get_snapshot().categories
+        page = self.paginate_queryset(categories)
+        if page is None:
+            return Response(list(categories))
+        return self.get_paginated_response(list(page))
+
+class ProductListView(CatalogSnapshotMixin, OptInKeysetPaginationMixin, generics.ListAPIView):
+    """Products served from the catalog snapshot, without a database round trip"""
+    serializer_class = ProductSerializer
+    permission_classes = [AllowAny]
+    
+    def get_queryset(self):
+        snapshot = self.get_snapshot()
+        category = self.request.query_params.get('category', None) or None
+        if self.uses_keyset_pagination():
+            return snapshot.keyset_list(category)
+        return snapshot.product_list(category)
+    
+    def list(self, request, *args, **kwargs):
+        records = self.get_queryset()
+        page = self.paginate_queryset(records)
+        if page is None:
+            return Response([record.payload(request) for record in records])
+        return self.get_paginated_response([record.payload(request) for record in page])
 
-class ProductListView(generics.ListAPIView):
+class ProductSearchView(generics.ListAPIView):
+    """Ranked full-text search: /api/products/search/?q=eletronico"""
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
     
     def get_queryset(self):
-        queryset = Product.objects.all()
-        category = self.request.query_params.get('category', None)
-        if category:
-            queryset = queryset.filter(category__slug=category)
-        return queryset
+        query = self.request.query_params.get('q', '').strip()
+        if connection.vendor != 'sqlite':
+            return product_queryset().filter(
+                Q(name__icontains=query) | Q(description__icontains=query)
+            ).order_by('name')
+        return ProductSearchResults(product_queryset(), query)
 
-class ProductDetailView(generics.RetrieveAPIView):
-    queryset = Product.objects.all()
+class ProductDetailView(CatalogSnapshotMixin, VersionedResponseCacheMixin, generics.RetrieveAPIView):
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
+    # category_name is part of the payload, so category changes count too
+    cache_models = ('product', 'category')
+    
+    def retrieve(self, request, *args, **kwargs):
+        record = self.get_snapshot().product(self.kwargs['pk'])
+        if record is None:
+            raise Http404
+        return Response(record.payload(request))
+    
+    def get_etag(self, data, cache_key, versions):
+        updated_at = parse_datetime(data['updated_at'])
+        return f'"product-{data["id"]}-{int(updated_at.timestamp() * 1000000)}-{versions[1]}"'
+    
+    def get_last_modified(self, data):
+        # A category rename changes category_name, so it moves Last-Modified too
+        category = self.get_snapshot().category(data['category'])
+        return int(max(
+            parse_datetime(data['updated_at']), parse_datetime(category['updated_at'])
+        ).timestamp())
 
-class OrderListCreateView(generics.ListCreateAPIView):
+class OrderListCreateView(OptInKeysetPaginationMixin, generics.ListCreateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return order_queryset(self.request.user)
+    
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return OrderCreateSerializer
+        return OrderSerializer
     
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+    def create(self, request, *args, **kwargs):
+        # A JSON list creates a batch of orders in a single transaction
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(data=request.data, many=many)
+        serializer.is_valid(raise_exception=True)
+        orders = serializer.save(user=request.user)
+        if not many:
+            orders = [orders]
+        
+        created = order_queryset(request.user).filter(pk__in=[order.pk for order in orders]).order_by('id')
+        data = OrderSerializer(created, many=True).data
+        return Response(data if many else data[0], status=status.HTTP_201_CREATED)
 
 class OrderDetailView(generics.RetrieveAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return order_queryset(self.request.user)
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
\ No newline at end of file
+        return self.request.user
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def shipping_quote(request):
+    """
+    Address and shipping options of a CEP in one round trip. POST
+    {"cep", "items": [{"product", "quantity"}]} or {"cep", "subtotal"};
+    GET takes cep and subtotal as query parameters.
+    """
+    data = request.data if request.method == 'POST' else request.query_params
+    serializer = ShippingQuoteSerializer(data=data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    cep = serializer.validated_data['cep']
+    try:
+        address = lookup_cep(cep)
+    except CepServiceError:
+        return Response({
+            'error': 'Serviço de CEP indisponível'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if address is None:
+        return Response({
+            'error': 'CEP não encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    quote = quote_shipping(address, serializer.validated_data['subtotal'], get_free_shipping_minimum())
+    return Response({'cep': cep, 'address': address, **quote})
@@ -86,6 +86,45 @@ DATABASES = {
     }
 }
 
+# Every SQLite connection gets the performance profile of sqlite_tuning.py
+# (WAL, synchronous=NORMAL, mmap, 64 MB cache, in-memory temp store, busy
+# timeout). Entries here override it; None leaves SQLite's default.
+SQLITE_PRAGMAS = {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# LocMemCache is per process; point these at a shared backend (Redis,
+# Memcached) when running several workers so invalidation reaches all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'boss-shopp'),
+    }
+}
+
+# Seconds a cached API payload is kept; entries are also invalidated by
+# the per-model version counters bumped from post_save/post_delete.
+API_RESPONSE_CACHE_TIMEOUT = 60 * 15
+
+# Catalog endpoints read an in-process snapshot (api/catalog.py). When the
+# product/category versions change it is rebuilt in a background thread
+# while requests keep the previous one; False rebuilds in the request.
+CATALOG_SNAPSHOT_BACKGROUND_REFRESH = True
+# Seconds between checks of the catalog tables for writes made by other
+# processes (imports, scripts, other workers); this process's own writes
+# are picked up on the next request.
+CATALOG_SNAPSHOT_CHECK_SECONDS = 5
+
+# CEP Service (cep_service.py) used by the shipping quote endpoint
+CEP_SERVICE_URL = os.environ.get('CEP_SERVICE_URL', 'http://localhost:5001')
+CEP_SERVICE_TIMEOUT = float(os.environ.get('CEP_SERVICE_TIMEOUT', '5'))
+CEP_SERVICE_POOL_SIZE = int(os.environ.get('CEP_SERVICE_POOL_SIZE', '10'))
+# Addresses rarely change; unknown CEPs are kept for less time
+CEP_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+CEP_NOT_FOUND_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -148,7 +187,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.StandardPageNumberPagination',
     'PAGE_SIZE': 20
 }
 
@@ -0,0 +1,149 @@
+"""
+CEP lookup cache for the CEP Service.
+
+Two tiers: an in-process LRU in front of a persistent SQLite table, so
+repeat lookups never leave the process and survive restarts. CEPs that the
+providers reported as unknown are cached too (negative caching) with a
+shorter TTL.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class CepCache:
+    """Persistent CEP cache with TTL, negative caching and an LRU front"""
+
+    def __init__(self, path, ttl=30 * 24 * 3600, negative_ttl=24 * 3600, lru_size=10000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.lru_size = lru_size
+
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {
+            'lru_hits': 0,
+            'disk_hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'writes': 0,
+        }
+
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cep_cache (
+                    cep TEXT PRIMARY KEY,
+                    found INTEGER NOT NULL,
+                    payload TEXT,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def _connection(self):
+        """One SQLite connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _remember(self, cep, entry):
+        with self._lock:
+            self._lru[cep] = entry
+            self._lru.move_to_end(cep)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get(self, cep):
+        """
+        Return {'found': bool, 'data': dict | None} for a cached CEP, or
+        None on a miss.
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._lru.get(cep)
+            if entry is not None:
+                if entry['expires_at'] > now:
+                    self._lru.move_to_end(cep)
+                else:
+                    del self._lru[cep]
+                    entry = None
+
+        if entry is not None:
+            self._count('lru_hits' if entry['found'] else 'negative_hits')
+            return entry
+
+        try:
+            row = self._connection().execute(
+                "SELECT found, payload, expires_at FROM cep_cache WHERE cep = ? AND expires_at > ?",
+                (cep, now)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao ler cache de CEP: {str(e)}")
+            row = None
+
+        if row is None:
+            self._count('misses')
+            return None
+
+        entry = {
+            'found': bool(row[0]),
+            'data': json.loads(row[1]) if row[1] else None,
+            'expires_at': row[2],
+        }
+        self._remember(cep, entry)
+        self._count('disk_hits' if entry['found'] else 'negative_hits')
+        return entry
+
+    def _store(self, cep, found, data, ttl):
+        entry = {'found': found, 'data': data, 'expires_at': time.time() + ttl}
+        self._remember(cep, entry)
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cep_cache (cep, found, payload, expires_at) VALUES (?, ?, ?, ?)",
+                    (cep, int(found), json.dumps(data) if data is not None else None, entry['expires_at'])
+                )
+            self._count('writes')
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao gravar cache de CEP: {str(e)}")
+
+    def set(self, cep, data):
+        """Cache a resolved address"""
+        self._store(cep, True, data, self.ttl)
+
+    def set_not_found(self, cep):
+        """Cache a CEP the providers reported as unknown"""
+        self._store(cep, False, None, self.negative_ttl)
+
+    def purge_expired(self):
+        """Delete expired rows from the persistent table"""
+        conn = self._connection()
+        with conn:
+            deleted = conn.execute("DELETE FROM cep_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+        return deleted
+
+    def stats(self):
+        """Hit/miss counters for the /health endpoint"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['lru_size'] = len(self._lru)
+        lookups = stats['lru_hits'] + stats['disk_hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        return stats
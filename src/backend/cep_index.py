@@ -0,0 +1,273 @@
+"""
+Offline CEP index for the CEP Service.
+
+A local CEP dataset (CSV or an SQLite table) is compiled once into a compact
+binary file of sorted, non-overlapping CEP ranges keyed by the 8-digit CEP as
+an integer. City-level CEPs are stored as ranges; street-level CEPs inside a
+city range take precedence over it.
+
+The file is opened with mmap, so loading it costs no parsing, pages are only
+read on demand and are shared by every worker process through the OS page
+cache. A lookup is a binary search over the range starts.
+
+File layout (little-endian):
+
+    header   magic (8 bytes), record count, payload size
+    starts   uint32[count]   first CEP of each range
+    ends     uint32[count]   last CEP of each range
+    offsets  uint32[count]   address payload offset
+    lengths  uint32[count]   address payload length
+    payload  UTF-8 "street\\x1fneighborhood\\x1fcity\\x1fstate", deduplicated
+
+Build an index with:
+
+    python cep_index.py build ceps.csv cep_index.bin
+    python cep_index.py build ceps.db cep_index.bin --table ceps
+"""
+
+import argparse
+import bisect
+import csv
+import logging
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from array import array
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CEPIDX01'
+HEADER = struct.Struct('<8sII')
+FIELD_SEPARATOR = '\x1f'
+
+# Accepted column names of the source dataset, per field
+COLUMNS = {
+    'start': ('cep_inicial', 'cep_start', 'cep'),
+    'end': ('cep_final', 'cep_end'),
+    'street': ('logradouro', 'street'),
+    'neighborhood': ('bairro', 'neighborhood'),
+    'city': ('cidade', 'localidade', 'city'),
+    'state': ('uf', 'estado', 'state'),
+}
+
+
+def _column(row, field):
+    for name in COLUMNS[field]:
+        value = row.get(name)
+        if value not in (None, ''):
+            return str(value).strip()
+    return ''
+
+
+def _cep_number(value):
+    digits = ''.join(filter(str.isdigit, value))
+    return int(digits) if len(digits) == 8 else None
+
+
+def read_records(source, table='ceps'):
+    """
+    Yield (start, end, payload) for every valid row of a CSV file or of an
+    SQLite table (files ending in .db, .sqlite or .sqlite3).
+    """
+    if source.endswith(('.db', '.sqlite', '.sqlite3')):
+        conn = sqlite3.connect(source)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = (dict(row) for row in conn.execute(f'SELECT * FROM "{table}"'))
+            yield from _records(rows)
+        finally:
+            conn.close()
+    else:
+        with open(source, newline='', encoding='utf-8') as f:
+            yield from _records(csv.DictReader(f))
+
+
+def _records(rows):
+    for row in rows:
+        row = {key.strip().lower(): value for key, value in row.items() if key}
+        start = _cep_number(_column(row, 'start'))
+        if start is None:
+            continue
+        end = _cep_number(_column(row, 'end')) or start
+        if end < start:
+            start, end = end, start
+        payload = FIELD_SEPARATOR.join(
+            _column(row, field) for field in ('street', 'neighborhood', 'city', 'state')
+        )
+        yield start, end, payload
+
+
+def flatten(records):
+    """
+    Turn possibly nested ranges into sorted, non-overlapping segments: a
+    range nested in another one (a street CEP inside a city range) wins
+    over it, and adjacent segments with the same address are merged.
+    """
+    segments = []
+
+    def emit(start, end, payload):
+        if start > end:
+            return
+        if segments and segments[-1][2] == payload and segments[-1][1] == start - 1:
+            segments[-1][1] = end
+        else:
+            segments.append([start, end, payload])
+
+    stack = []  # (end, payload) of the ranges enclosing the current position
+    position = 0
+    for start, end, payload in sorted(records, key=lambda record: (record[0], -record[1])):
+        while stack and stack[-1][0] < start:
+            top_end, top_payload = stack.pop()
+            emit(position, top_end, top_payload)
+            position = max(position, top_end + 1)
+        if stack:
+            emit(position, start - 1, stack[-1][1])
+        stack.append((end, payload))
+        position = start
+    while stack:
+        top_end, top_payload = stack.pop()
+        emit(position, top_end, top_payload)
+        position = max(position, top_end + 1)
+
+    return segments
+
+
+def build_index(source, destination, table='ceps'):
+    """Compile a CEP dataset into an index file; returns the range count"""
+    segments = flatten(read_records(source, table))
+
+    starts, ends, offsets, lengths = (array('I') for _ in range(4))
+    payload = bytearray()
+    payload_offsets = {}
+    for start, end, address in segments:
+        encoded = address.encode('utf-8')
+        offset = payload_offsets.get(encoded)
+        if offset is None:
+            offset = payload_offsets[encoded] = len(payload)
+            payload += encoded
+        starts.append(start)
+        ends.append(end)
+        offsets.append(offset)
+        lengths.append(len(encoded))
+
+    if sys.byteorder != 'little':
+        for column in (starts, ends, offsets, lengths):
+            column.byteswap()
+
+    temporary = destination + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(segments), len(payload)))
+        for column in (starts, ends, offsets, lengths):
+            column.tofile(f)
+        f.write(payload)
+    os.replace(temporary, destination)
+
+    return len(segments)
+
+
+class CepIndex:
+    """Read-only, mmap-backed view of an index file built by build_index"""
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, payload_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} não é um índice de CEP')
+
+        view = memoryview(self._mmap)
+        size = 4 * self.count
+        offset = HEADER.size
+        columns = []
+        for _ in range(4):
+            column = view[offset:offset + size]
+            if sys.byteorder == 'little':
+                columns.append(column.cast('I'))
+            else:
+                swapped = array('I', column.tobytes())
+                swapped.byteswap()
+                columns.append(swapped)
+            offset += size
+        self._starts, self._ends, self._offsets, self._lengths = columns
+        self._payload = view[offset:offset + payload_size]
+
+    def lookup(self, cep):
+        """
+        Address for a CEP ('01001000' or 1001000), or None when the CEP is
+        not covered by the dataset.
+        """
+        number = cep if isinstance(cep, int) else int(cep)
+        i = bisect.bisect_right(self._starts, number) - 1
+        if i < 0 or self._ends[i] < number:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        offset = self._offsets[i]
+        street, neighborhood, city, state = bytes(
+            self._payload[offset:offset + self._lengths[i]]
+        ).decode('utf-8').split(FIELD_SEPARATOR)
+        with self._lock:
+            self.hits += 1
+
+        digits = f'{number:08d}'
+        return {
+            'street': street,
+            'neighborhood': neighborhood,
+            'city': city,
+            'state': state,
+            'cep': f'{digits[:5]}-{digits[5:]}'
+        }
+
+    def stats(self):
+        with self._lock:
+            return {'path': self.path, 'ranges': self.count, 'hits': self.hits, 'misses': self.misses}
+
+
+def load_index(path):
+    """Open the index at `path`, or return None if it is missing or invalid"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return CepIndex(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.error(f"Erro ao abrir índice de CEP {path}: {str(e)}")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Índice offline de CEPs')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    build = subcommands.add_parser('build', help='Compila um CSV ou tabela SQLite em um índice')
+    build.add_argument('source', help='Arquivo CSV ou banco SQLite com os CEPs')
+    build.add_argument('destination', help='Arquivo de índice a gerar')
+    build.add_argument('--table', default='ceps', help='Tabela do banco SQLite (padrão: ceps)')
+
+    lookup = subcommands.add_parser('lookup', help='Consulta um CEP no índice')
+    lookup.add_argument('index')
+    lookup.add_argument('cep')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        started = time.perf_counter()
+        count = build_index(args.source, args.destination, args.table)
+        print(f'{count} faixas gravadas em {args.destination} ({time.perf_counter() - started:.2f}s)')
+    else:
+        index = CepIndex(args.index)
+        print(index.lookup(''.join(filter(str.isdigit, args.cep))))
+
+
+if __name__ == '__main__':
+    main()
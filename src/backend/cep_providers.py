@@ -0,0 +1,555 @@
+"""
+CEP providers for the CEP Service.
+
+Each provider wraps one upstream (Correios, ViaCEP, BrasilAPI, Postmon) and
+returns a uniform result dict:
+
+    {'status': 'found' | 'not_found' | 'error', 'data': ..., 'error': ..., 'source': name}
+
+Providers keep their own latency/error statistics and a circuit breaker
+that stops calling an upstream while it is failing. They can be queried one
+after the other (sequential_lookup, in the order given by rank_providers)
+or all at once, returning the first valid answer (hedged_lookup).
+AsyncProvider and the async_* lookups are the coroutine counterparts used by
+the ASGI serving mode (cep_service_asgi.py).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+NOT_FOUND_ERROR = 'CEP não encontrado'
+
+# Timeout for fallback API requests (in seconds)
+FALLBACK_TIMEOUT = 5
+
+# Deadline of a whole hedged lookup (in seconds); providers used in hedged
+# mode should time out within it so losing calls release their threads
+HEDGE_TIMEOUT = FALLBACK_TIMEOUT + 1
+
+# Base URLs of the public fallback APIs
+VIACEP_URL = 'https://viacep.com.br/ws/{cep}/json/'
+BRASILAPI_URL = 'https://brasilapi.com.br/api/cep/v1/{cep}'
+POSTMON_URL = 'https://api.postmon.com.br/v1/cep/{cep}'
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class ProviderStats:
+    """Request counters and a sliding window of latencies for one provider"""
+
+    def __init__(self, window=200):
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.requests = 0
+        self.found = 0
+        self.not_found = 0
+        self.errors = 0
+
+    def record(self, status, latency):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.outcomes.append(status != 'error')
+            if status == 'found':
+                self.found += 1
+            elif status == 'not_found':
+                self.not_found += 1
+            else:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            latencies = list(self.latencies)
+            snapshot = {
+                'requests': self.requests,
+                'found': self.found,
+                'not_found': self.not_found,
+                'errors': self.errors,
+            }
+        snapshot['error_rate'] = round(self.errors / self.requests, 4) if self.requests else 0.0
+        p50 = _percentile(latencies, 0.5)
+        p95 = _percentile(latencies, 0.95)
+        snapshot['p50_ms'] = round(p50 * 1000, 1) if p50 is not None else None
+        snapshot['p95_ms'] = round(p95 * 1000, 1) if p95 is not None else None
+        return snapshot
+
+    def recent(self):
+        """(samples, success rate, p50 latency in seconds) over the window"""
+        with self._lock:
+            outcomes = list(self.outcomes)
+            latencies = list(self.latencies)
+        if not outcomes:
+            return 0, None, None
+        return len(outcomes), sum(outcomes) / len(outcomes), _percentile(latencies, 0.5)
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    closed: calls go through; once the last `window` calls hold at least
+    `min_requests` results and their error rate reaches `error_threshold`
+    the breaker opens.
+    open: calls are rejected without touching the network for `cooldown`
+    seconds, then the breaker turns half-open.
+    half_open: a single probe call is let through; success closes the
+    breaker, failure opens it for another cool-down.
+    """
+
+    def __init__(self, error_threshold=0.5, min_requests=5, window=20, cooldown=30.0):
+        self.error_threshold = error_threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probing = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def allow(self):
+        """Whether a call may go to the provider right now"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """Forget a call that was abandoned without an outcome"""
+        with self._lock:
+            self._probing = False
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._probing = False
+        self.times_opened += 1
+
+    def record(self, success):
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == HALF_OPEN:
+                if success:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                    self._probing = False
+                else:
+                    self._open(now)
+                return
+            if state == OPEN:
+                # Late answer from a call started before the breaker opened
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (len(self._outcomes) >= self.min_requests
+                    and failures / len(self._outcomes) >= self.error_threshold):
+                logger.warning(f"Circuito aberto após {failures} falhas em {len(self._outcomes)} chamadas")
+                self._open(now)
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            outcomes = list(self._outcomes)
+            snapshot = {
+                'state': state,
+                'recent_calls': len(outcomes),
+                'recent_error_rate': round(outcomes.count(False) / len(outcomes), 4) if outcomes else 0.0,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
+            if state == OPEN:
+                snapshot['retry_in_s'] = round(max(self.cooldown - (now - self._opened_at), 0.0), 1)
+        return snapshot
+
+
+class Provider:
+    """A named CEP lookup function with its own statistics and breaker"""
+
+    def __init__(self, name, lookup, breaker=None):
+        self.name = name
+        self._lookup = lookup
+        self.stats = ProviderStats()
+        self.breaker = breaker or CircuitBreaker()
+
+    def __call__(self, cep):
+        if not self.breaker.allow():
+            return self._rejected()
+        started = time.monotonic()
+        try:
+            result = self._lookup(cep)
+        except Exception as e:
+            result = self._failed(e)
+        return self._finish(result, started)
+
+    def _rejected(self):
+        return {
+            'status': 'error',
+            'error': f'{self.name} indisponível (circuito aberto)',
+            'source': self.name,
+        }
+
+    def _failed(self, e):
+        logger.error(f"Erro ao consultar {self.name}: {str(e)}")
+        return {'status': 'error', 'error': f'Erro ao consultar {self.name}: {str(e)}'}
+
+    def _finish(self, result, started):
+        self.stats.record(result['status'], time.monotonic() - started)
+        self.breaker.record(result['status'] != 'error')
+        result['source'] = self.name
+        return result
+
+    def __repr__(self):
+        return f"Provider({self.name!r})"
+
+
+class AsyncProvider(Provider):
+    """Provider whose lookup is a coroutine function (ASGI serving mode)"""
+
+    async def __call__(self, cep):
+        if not self.breaker.allow():
+            return self._rejected()
+        started = time.monotonic()
+        try:
+            result = await self._lookup(cep)
+        except asyncio.CancelledError:
+            # Lost a hedged race: neither a success nor a failure
+            self.breaker.release()
+            raise
+        except Exception as e:
+            result = self._failed(e)
+        return self._finish(result, started)
+
+
+def interpret_json_response(name, status_code, load_json, transform, validate, cep):
+    """
+    Map an HTTP answer from a JSON API to a provider result. `load_json`
+    returns the decoded body; shared by the sync and async clients.
+    """
+    if status_code == 200:
+        data = load_json()
+        if validate(data):
+            return {'status': 'found', 'data': transform(data, cep)}
+        logger.warning(f"Dados inválidos da API {name}")
+        return {'status': 'not_found', 'error': NOT_FOUND_ERROR}
+    if status_code == 404:
+        return {'status': 'not_found', 'error': NOT_FOUND_ERROR}
+    logger.warning(f"API {name} retornou status {status_code}")
+    return {'status': 'error', 'error': f'{name} retornou status {status_code}'}
+
+
+def http_json_provider(name, url, transform, validate, timeout=FALLBACK_TIMEOUT):
+    """
+    Provider for a JSON API. `url` is a template with a {cep} placeholder,
+    `validate(data)` tells a real address from an error payload and
+    `transform(data, cep)` maps it to our address format.
+    """
+    def lookup(cep):
+        response = requests.get(url.format(cep=cep), timeout=timeout)
+        return interpret_json_response(name, response.status_code, response.json, transform, validate, cep)
+
+    return Provider(name, lookup)
+
+
+# Name, default URL and payload mapping of each public JSON API
+JSON_APIS = {
+    'ViaCEP': {
+        'url': VIACEP_URL,
+        'transform': lambda data, cep: {
+            'street': data.get('logradouro', ''),
+            'neighborhood': data.get('bairro', ''),
+            'city': data.get('localidade', ''),
+            'state': data.get('uf', ''),
+            'cep': data.get('cep', cep)
+        },
+        'validate': lambda data: 'erro' not in data and data.get('cep'),
+    },
+    'BrasilAPI': {
+        'url': BRASILAPI_URL,
+        'transform': lambda data, cep: {
+            'street': data.get('street', ''),
+            'neighborhood': data.get('neighborhood', ''),
+            'city': data.get('city', ''),
+            'state': data.get('state', ''),
+            'cep': data.get('cep', cep)
+        },
+        'validate': lambda data: 'errors' not in data and data.get('cep'),
+    },
+    'Postmon': {
+        'url': POSTMON_URL,
+        'transform': lambda data, cep: {
+            'street': data.get('logradouro', ''),
+            'neighborhood': data.get('bairro', ''),
+            'city': data.get('cidade', ''),
+            'state': data.get('estado', ''),
+            'cep': data.get('cep', cep)
+        },
+        'validate': lambda data: data.get('cep'),
+    },
+}
+
+
+def _json_api_provider(name, url, timeout):
+    api = JSON_APIS[name]
+    return http_json_provider(
+        name, url or api['url'], api['transform'], api['validate'], timeout=timeout
+    )
+
+
+def viacep_provider(url=None, timeout=FALLBACK_TIMEOUT):
+    return _json_api_provider('ViaCEP', url, timeout)
+
+
+def brasilapi_provider(url=None, timeout=FALLBACK_TIMEOUT):
+    return _json_api_provider('BrasilAPI', url, timeout)
+
+
+def postmon_provider(url=None, timeout=FALLBACK_TIMEOUT):
+    return _json_api_provider('Postmon', url, timeout)
+
+
+def _miss(results):
+    """
+    Combine the failed results of every provider into one result. A
+    not_found is conclusive only when no provider failed or timed out:
+    otherwise one of them might have known the CEP.
+    """
+    if any(result['status'] == 'not_found' for result in results):
+        conclusive = not any(result['status'] == 'error' for result in results)
+        return {'status': 'not_found', 'error': NOT_FOUND_ERROR, 'conclusive': conclusive}
+    error = results[-1]['error'] if results else 'Nenhum provedor disponível'
+    return {'status': 'error', 'error': error}
+
+
+# Minimum recent calls before a provider's latency/success rate is trusted
+RANKING_MIN_SAMPLES = 5
+
+_STATE_RANK = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def rank_providers(providers):
+    """
+    Order providers for a sequential lookup: closed breakers first, then by
+    expected time to an answer (recent p50 latency divided by recent success
+    rate). Providers without enough samples yet keep their configured
+    position ahead of the measured ones so they get measured too.
+    """
+    def key(item):
+        index, provider = item
+        samples, success_rate, p50 = provider.stats.recent()
+        if samples < RANKING_MIN_SAMPLES:
+            cost = 0.0
+        else:
+            cost = p50 / max(success_rate, 0.01)
+        return (_STATE_RANK[provider.breaker.state], cost, index)
+
+    return [provider for _, provider in sorted(enumerate(providers), key=key)]
+
+
+def sequential_lookup(cep, providers):
+    """Query the providers one at a time, stopping at the first hit"""
+    results = []
+    for provider in providers:
+        logger.info(f"Tentando API: {provider.name}")
+        result = provider(cep)
+        if result['status'] == 'found':
+            return result
+        results.append(result)
+    return _miss(results)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one: the first caller
+    runs the function, callers arriving while it runs wait for and share
+    its result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.shared = 0
+
+    def do(self, key, func):
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._flights[key] = future
+            else:
+                self.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._flights), 'shared': self.shared}
+
+
+# Worker pool for hedged lookups of callers that do not bring their own
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='cep-hedge')
+
+
+def hedge_executor(providers, concurrency):
+    """
+    Worker pool for `concurrency` simultaneous hedged lookups: each one
+    holds a thread per provider until its slowest provider returns.
+    """
+    return ThreadPoolExecutor(max_workers=len(providers) * concurrency, thread_name_prefix='cep-hedge')
+
+
+def hedged_lookup(cep, providers, timeout=HEDGE_TIMEOUT, executor=None):
+    """
+    Query every provider concurrently and return the first valid answer.
+
+    Providers that have not started yet are cancelled as soon as one
+    answers; requests already in flight finish in the background and only
+    feed the statistics, so their own timeouts should not exceed `timeout`.
+    """
+    if not providers:
+        return _miss([])
+
+    executor = executor or _hedge_executor
+    futures = {executor.submit(provider, cep) for provider in providers}
+    results = []
+    deadline = time.monotonic() + timeout
+
+    try:
+        while futures:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, futures = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result['status'] == 'found':
+                    return result
+                results.append(result)
+    finally:
+        for future in futures:
+            future.cancel()
+
+    if futures:
+        results.append({'status': 'error', 'error': 'Tempo esgotado consultando os provedores'})
+    return _miss(results)
+
+
+async def async_sequential_lookup(cep, providers):
+    """sequential_lookup for AsyncProvider instances"""
+    results = []
+    for provider in providers:
+        logger.info(f"Tentando API: {provider.name}")
+        result = await provider(cep)
+        if result['status'] == 'found':
+            return result
+        results.append(result)
+    return _miss(results)
+
+
+async def async_hedged_lookup(cep, providers, timeout=HEDGE_TIMEOUT):
+    """
+    hedged_lookup for AsyncProvider instances. Unlike the threaded version
+    the losing requests are really cancelled, releasing their connections.
+    """
+    if not providers:
+        return _miss([])
+
+    pending = {asyncio.ensure_future(provider(cep)) for provider in providers}
+    results = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    try:
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                result = task.result()
+                if result['status'] == 'found':
+                    return result
+                results.append(result)
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if pending:
+        results.append({'status': 'error', 'error': 'Tempo esgotado consultando os provedores'})
+    return _miss(results)
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop"""
+
+    def __init__(self):
+        self._flights = {}
+        self.shared = 0
+
+    async def do(self, key, func):
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            self.shared += 1
+        # shield: a caller that goes away must not cancel the shared lookup
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {'in_flight': len(self._flights), 'shared': self.shared}
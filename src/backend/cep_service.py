@@ -5,13 +5,34 @@ with fallback to multiple public APIs for better reliability.
 """
 
 import requests
-import xml.etree.ElementTree as ET
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
+import json
 import logging
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import wraps
 
+from cep_cache import CepCache
+from cep_index import load_index
+from correios_client import CORREIOS_URL, CorreiosClient
+from locality_service import LocalityStore, content_hash
+from cep_providers import (
+    HEDGE_TIMEOUT,
+    NOT_FOUND_ERROR,
+    CircuitBreaker,
+    Provider,
+    SingleFlight,
+    brasilapi_provider,
+    hedge_executor,
+    hedged_lookup,
+    postmon_provider,
+    rank_providers,
+    sequential_lookup,
+    viacep_provider,
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,9 +40,6 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend requests
 
-# Correios SOAP service URL
-CORREIOS_URL = "https://apps.correios.com.br/SigepMasterJPA/AtendeClienteService/AtendeCliente"
-
 # Timeout for requests (in seconds)
 REQUEST_TIMEOUT = 10
 
@@ -29,6 +47,64 @@ REQUEST_TIMEOUT = 10
 MAX_RETRIES = 3
 RETRY_DELAY = 1
 
+# Provider lookup mode: 'sequential' tries the providers one at a time,
+# 'hedged' queries all of them at once and returns the first valid answer
+CEP_LOOKUP_MODE = os.environ.get('CEP_LOOKUP_MODE', 'sequential')
+
+# Correios SOAP client (pre-encoded envelope, pooled session, timings). In
+# hedged mode a losing Correios call must not outlive the hedge deadline.
+correios_client = CorreiosClient(
+    CORREIOS_URL,
+    timeout=min(REQUEST_TIMEOUT, HEDGE_TIMEOUT) if CEP_LOOKUP_MODE == 'hedged' else REQUEST_TIMEOUT
+)
+
+# Reorder providers by recent latency and success rate in sequential mode
+CEP_ADAPTIVE_ORDER = os.environ.get('CEP_ADAPTIVE_ORDER', '1') not in ('0', 'false', 'False')
+
+# Circuit breaker configuration: open a provider's circuit when at least
+# CEP_BREAKER_MIN_REQUESTS of its recent calls have an error rate of
+# CEP_BREAKER_ERROR_RATE or more, and probe it again after
+# CEP_BREAKER_COOLDOWN seconds
+CEP_BREAKER_ERROR_RATE = float(os.environ.get('CEP_BREAKER_ERROR_RATE', 0.5))
+CEP_BREAKER_MIN_REQUESTS = int(os.environ.get('CEP_BREAKER_MIN_REQUESTS', 5))
+CEP_BREAKER_COOLDOWN = float(os.environ.get('CEP_BREAKER_COOLDOWN', 30))
+
+# CEP cache configuration (TTLs in seconds)
+CEP_CACHE_PATH = os.environ.get(
+    'CEP_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cep_cache.db')
+)
+CEP_CACHE_TTL = int(os.environ.get('CEP_CACHE_TTL', 30 * 24 * 3600))
+CEP_CACHE_NEGATIVE_TTL = int(os.environ.get('CEP_CACHE_NEGATIVE_TTL', 24 * 3600))
+CEP_CACHE_LRU_SIZE = int(os.environ.get('CEP_CACHE_LRU_SIZE', 10000))
+
+# Batch endpoint limits
+CEP_BATCH_MAX_SIZE = int(os.environ.get('CEP_BATCH_MAX_SIZE', 1000))
+CEP_BATCH_CONCURRENCY = int(os.environ.get('CEP_BATCH_CONCURRENCY', 8))
+
+# Offline CEP index (see cep_index.py); lookups skip it when the file is missing
+CEP_INDEX_PATH = os.environ.get(
+    'CEP_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cep_index.bin')
+)
+
+cep_index = load_index(CEP_INDEX_PATH)
+
+# Locality dataset (see locality_service.py), seeded from data/localities.csv
+LOCALITY_DB_PATH = os.environ.get(
+    'CEP_LOCALITY_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'localities.db')
+)
+LOCALITY_SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'localities.csv')
+LOCALITY_SEARCH_BUDGET_MS = float(os.environ.get('CEP_LOCALITY_BUDGET_MS', 50))
+LOCALITY_MAX_RESULTS = 50
+
+locality_store = LocalityStore(LOCALITY_DB_PATH, seed_path=LOCALITY_SEED_PATH)
+
+cep_cache = CepCache(
+    CEP_CACHE_PATH,
+    ttl=CEP_CACHE_TTL,
+    negative_ttl=CEP_CACHE_NEGATIVE_TTL,
+    lru_size=CEP_CACHE_LRU_SIZE
+)
+
 # Retry decorator for requests
 def retry_request(func):
     @wraps(func)
@@ -52,77 +128,9 @@ def consultar_cep_correios(cep):
     """
     logger.info(f"Consultando CEP {cep} nos Correios")
     
-    # SOAP envelope for Correios CEP service
-    soap_body = f"""<?xml version="1.0" encoding="UTF-8"?>
-    <soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
-        <soap:Body>
-            <ns2:consultaCEP xmlns:ns2="http://cliente.bean.master.sigep.bsb.correios.com.br/">
-                <cep>{cep}</cep>
-            </ns2:consultaCEP>
-        </soap:Body>
-    </soap:Envelope>"""
-    
-    headers = {
-        'Content-Type': 'text/xml; charset=utf-8',
-        'SOAPAction': 'consultaCEP'
-    }
-    
     try:
-        response = requests.post(
-            CORREIOS_URL,
-            data=soap_body,
-            headers=headers,
-            timeout=REQUEST_TIMEOUT
-        )
-        
-        logger.info(f"Resposta dos Correios: {response.status_code}")
-        
-        if response.status_code == 200:
-            # Parse XML response
-            root = ET.fromstring(response.content)
-            
-            # Extract data from XML
-            namespace = {'soap': 'http://schemas.xmlsoap.org/soap/envelope/',
-                        'ns2': 'http://cliente.bean.master.sigep.bsb.correios.com.br/'}
-            
-            # Find the return element
-            return_element = root.find('.//ns2:return', namespace)
-            
-            if return_element is not None:
-                endereco = {}
-                for child in return_element:
-                    tag = child.tag.split('}')[1] if '}' in child.tag else child.tag
-                    endereco[tag] = child.text
-                
-                # Validate required fields
-                if not endereco.get('end') and not endereco.get('bairro') and not endereco.get('cidade'):
-                    logger.warning("CEP encontrado mas dados incompletos nos Correios")
-                    return {'success': False, 'error': 'Dados do CEP incompletos'}
-                
-                result = {
-                    'success': True,
-                    'data': {
-                        'street': endereco.get('end', ''),
-                        'neighborhood': endereco.get('bairro', ''),
-                        'city': endereco.get('cidade', ''),
-                        'state': endereco.get('uf', ''),
-                        'cep': endereco.get('cep', cep)
-                    }
-                }
-                logger.info(f"CEP encontrado: {result}")
-                return result
-            else:
-                logger.warning("CEP não encontrado nos Correios")
-                return {'success': False, 'error': 'CEP não encontrado'}
-        elif response.status_code == 404:
-            logger.warning(f"CEP {cep} não encontrado (404) nos Correios")
-            return {'success': False, 'error': 'CEP não encontrado'}
-        elif response.status_code == 500:
-            logger.error(f"Erro interno do servidor dos Correios para CEP {cep}")
-            return {'success': False, 'error': 'Erro interno do servidor dos Correios'}
-        else:
-            logger.error(f"Erro na requisição aos Correios: {response.status_code}")
-            return {'success': False, 'error': f'Erro na requisição: {response.status_code}'}
+        response = correios_client.post(cep)
+        return correios_client.parse_response(response.status_code, response.content, cep)
             
     except requests.exceptions.Timeout:
         logger.error(f"Timeout ao consultar Correios para CEP {cep}")
@@ -134,6 +142,98 @@ def consultar_cep_correios(cep):
         logger.error(f"Erro ao consultar Correios: {str(e)}")
         return {'success': False, 'error': f'Erro ao consultar Correios: {str(e)}'}
 
+def correios_result(result):
+    """Map a consultar_cep_correios-style answer to a provider result"""
+    if result['success']:
+        return {'status': 'found', 'data': result['data']}
+    if result.get('error') == NOT_FOUND_ERROR:
+        return {'status': 'not_found', 'error': NOT_FOUND_ERROR}
+    return {'status': 'error', 'error': result.get('error')}
+
+def correios_lookup(cep):
+    """
+    Correios as a provider. In hedged mode the other providers race it, so
+    its retry/backoff wrapper is skipped.
+    """
+    if CEP_LOOKUP_MODE == 'hedged':
+        result = consultar_cep_correios.__wrapped__(cep)
+    else:
+        result = consultar_cep_correios(cep)
+    return correios_result(result)
+
+# Providers in priority order: Correios first, then the public fallback APIs
+PROVIDERS = [
+    Provider('Correios', correios_lookup),
+    viacep_provider(),
+    brasilapi_provider(),
+    postmon_provider(),
+]
+
+for provider in PROVIDERS:
+    provider.breaker = CircuitBreaker(
+        error_threshold=CEP_BREAKER_ERROR_RATE,
+        min_requests=CEP_BREAKER_MIN_REQUESTS,
+        cooldown=CEP_BREAKER_COOLDOWN
+    )
+
+# Hedged mode: threads for CEP_BATCH_CONCURRENCY lookups of every provider
+hedge_pool = hedge_executor(PROVIDERS, CEP_BATCH_CONCURRENCY)
+
+def lookup_cep(clean_cep):
+    """Resolve a normalized CEP through the providers (without the cache)"""
+    if CEP_LOOKUP_MODE == 'hedged':
+        return hedged_lookup(clean_cep, PROVIDERS, executor=hedge_pool)
+    providers = rank_providers(PROVIDERS) if CEP_ADAPTIVE_ORDER else PROVIDERS
+    return sequential_lookup(clean_cep, providers)
+
+# Concurrent lookups of the same CEP share one upstream call
+cep_flights = SingleFlight()
+
+def normalize_cep(cep):
+    """Keep only the digits of a CEP; returns None if it is not 8 digits long"""
+    clean_cep = ''.join(filter(str.isdigit, str(cep)))
+    return clean_cep if len(clean_cep) == 8 else None
+
+def _lookup_and_cache(clean_cep):
+    result = lookup_cep(clean_cep)
+    if result['status'] == 'found':
+        logger.info(f"CEP encontrado via {result['source']}: {result['data']}")
+        cep_cache.set(clean_cep, result['data'])
+    elif result['status'] == 'not_found' and result['conclusive']:
+        # Only cache the miss when the providers answered that the CEP does
+        # not exist and none of them failed
+        cep_cache.set_not_found(clean_cep)
+    return result
+
+def resolve_uncached(clean_cep):
+    """Look up a CEP the cache does not have, sharing in-flight lookups"""
+    return cep_flights.do(clean_cep, lambda: _lookup_and_cache(clean_cep))
+
+def offline_result(clean_cep):
+    """The offline index's answer for a CEP, or None if it does not cover it"""
+    if cep_index is None:
+        return None
+    data = cep_index.lookup(clean_cep)
+    if data is None:
+        return None
+    return {'status': 'found', 'data': data, 'source': 'Offline'}
+
+def local_result(clean_cep):
+    """
+    Answer a CEP without the network: the offline index first, then the
+    cache. Returns None when neither knows the CEP.
+    """
+    result = offline_result(clean_cep)
+    if result is not None:
+        return result
+    
+    cached = cep_cache.get(clean_cep)
+    if cached is None:
+        return None
+    if cached['found']:
+        return {'status': 'found', 'data': cached['data']}
+    return {'status': 'not_found', 'error': NOT_FOUND_ERROR}
+
 @app.route('/api/cep/<cep>', methods=['GET'])
 def get_cep(cep):
     """
@@ -141,90 +241,90 @@ def get_cep(cep):
     """
     logger.info(f"Recebida requisição para CEP: {cep}")
     
-    # Remove any non-digit characters
-    clean_cep = ''.join(filter(str.isdigit, cep))
+    clean_cep = normalize_cep(cep)
     
-    if len(clean_cep) != 8:
+    if clean_cep is None:
         logger.warning(f"CEP inválido: {cep}")
         return jsonify({'success': False, 'error': 'CEP inválido'}), 400
     
-    # List of fallback APIs to try
-    fallback_apis = [
-        {
-            'name': 'ViaCEP',
-            'url': f'https://viacep.com.br/ws/{clean_cep}/json/',
-            'transform': lambda data: {
-                'street': data.get('logradouro', ''),
-                'neighborhood': data.get('bairro', ''),
-                'city': data.get('localidade', ''),
-                'state': data.get('uf', ''),
-                'cep': data.get('cep', clean_cep)
-            },
-            'validate': lambda data: 'erro' not in data and data.get('cep')
-        },
-        {
-            'name': 'BrasilAPI',
-            'url': f'https://brasilapi.com.br/api/cep/v1/{clean_cep}',
-            'transform': lambda data: {
-                'street': data.get('street', ''),
-                'neighborhood': data.get('neighborhood', ''),
-                'city': data.get('city', ''),
-                'state': data.get('state', ''),
-                'cep': data.get('cep', clean_cep)
-            },
-            'validate': lambda data: 'errors' not in data and data.get('cep')
-        },
-        {
-            'name': 'Postmon',
-            'url': f'https://api.postmon.com.br/v1/cep/{clean_cep}',
-            'transform': lambda data: {
-                'street': data.get('logradouro', ''),
-                'neighborhood': data.get('bairro', ''),
-                'city': data.get('cidade', ''),
-                'state': data.get('estado', ''),
-                'cep': data.get('cep', clean_cep)
-            },
-            'validate': lambda data: data.get('cep')
-        }
-    ]
+    # Serve from the offline index or the cache before any provider
+    result = local_result(clean_cep) or resolve_uncached(clean_cep)
     
-    # Try Correios service first
-    result = consultar_cep_correios(clean_cep)
+    if result['status'] == 'found':
+        return jsonify({'success': True, 'data': result['data']})
     
-    if result['success']:
-        return jsonify(result)
+    logger.error("Todas as tentativas falharam")
+    return jsonify({'success': False, 'error': result['error']}), 404
+
+def _batch_line(cep, result):
+    line = {'cep': cep, 'success': result['status'] == 'found'}
+    if line['success']:
+        line['data'] = result['data']
     else:
-        logger.info("Tentando fallback APIs")
+        line['error'] = result['error']
+    return json.dumps(line, ensure_ascii=False) + '\n'
+
+@app.route('/api/cep/batch', methods=['POST'])
+def batch_cep():
+    """
+    Resolve many CEPs in one request.
+    
+    Body: {"ceps": ["01001-000", "70040010", ...]}. CEPs are normalized and
+    deduplicated; the answer is streamed as NDJSON, one line per distinct
+    CEP: CEPs known locally (offline index or cache) first, then the others
+    as soon as each is resolved.
+    """
+    payload = request.get_json(silent=True)
+    ceps = payload.get('ceps') if isinstance(payload, dict) else None
+    
+    if not isinstance(ceps, list):
+        return jsonify({'success': False, 'error': 'Envie {"ceps": [...]}'}), 400
+    if len(ceps) > CEP_BATCH_MAX_SIZE:
+        return jsonify({
+            'success': False,
+            'error': f'Máximo de {CEP_BATCH_MAX_SIZE} CEPs por requisição'
+        }), 413
+    
+    logger.info(f"Recebida requisição em lote com {len(ceps)} CEPs")
+    
+    unique = []
+    invalid = []
+    seen = set()
+    for cep in ceps:
+        clean_cep = normalize_cep(cep)
+        if clean_cep is None:
+            invalid.append(cep)
+        elif clean_cep not in seen:
+            seen.add(clean_cep)
+            unique.append(clean_cep)
+    
+    def generate():
+        for cep in invalid:
+            yield _batch_line(cep, {'status': 'error', 'error': 'CEP inválido'})
         
-        # Try each fallback API
-        for api in fallback_apis:
-            try:
-                logger.info(f"Tentando API: {api['name']}")
-                response = requests.get(api['url'], timeout=5)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Validate the response
-                    if api['validate'](data):
-                        result = {
-                            'success': True,
-                            'data': api['transform'](data)
-                        }
-                        logger.info(f"CEP encontrado via {api['name']}: {result}")
-                        return jsonify(result)
-                    else:
-                        logger.warning(f"Dados inválidos da API {api['name']}")
-                else:
-                    logger.warning(f"API {api['name']} retornou status {response.status_code}")
-                    
-            except Exception as e:
-                logger.error(f"Erro ao consultar {api['name']}: {str(e)}")
-                continue
+        misses = []
+        for clean_cep in unique:
+            result = local_result(clean_cep)
+            if result is None:
+                misses.append(clean_cep)
+            else:
+                yield _batch_line(clean_cep, result)
+        
+        if not misses:
+            return
         
-        # If all fails, return the Correios error
-        logger.error("Todas as tentativas falharam")
-        return jsonify(result), 404
+        executor = ThreadPoolExecutor(
+            max_workers=min(CEP_BATCH_CONCURRENCY, len(misses)), thread_name_prefix='cep-batch'
+        )
+        try:
+            futures = {executor.submit(resolve_uncached, clean_cep): clean_cep for clean_cep in misses}
+            for future in as_completed(futures):
+                yield _batch_line(futures[future], future.result())
+        finally:
+            # Stop pending lookups if the client goes away mid-stream
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -232,7 +332,21 @@ def health_check():
     Health check endpoint
     """
     logger.info("Health check requested")
-    return jsonify({'status': 'ok', 'service': 'CEP Service'})
+    return jsonify({
+        'status': 'ok',
+        'service': 'CEP Service',
+        'lookup_mode': CEP_LOOKUP_MODE,
+        'offline_index': cep_index.stats() if cep_index is not None else None,
+        'cache': cep_cache.stats(),
+        'single_flight': cep_flights.stats(),
+        'correios': correios_client.stats.snapshot(),
+        'provider_order': [provider.name for provider in rank_providers(PROVIDERS)]
+        if CEP_ADAPTIVE_ORDER else [provider.name for provider in PROVIDERS],
+        'providers': {
+            provider.name: dict(provider.stats.snapshot(), breaker=provider.breaker.snapshot())
+            for provider in PROVIDERS
+        }
+    })
 
 @app.route('/api/cep/test/<cep>', methods=['GET'])
 def test_cep(cep):
@@ -241,77 +355,77 @@ def test_cep(cep):
     """
     logger.info(f"Test CEP lookup requested for: {cep}")
     
-    # Remove any non-digit characters
-    clean_cep = ''.join(filter(str.isdigit, cep))
+    clean_cep = normalize_cep(cep)
     
-    if len(clean_cep) != 8:
+    if clean_cep is None:
         logger.warning(f"Invalid CEP: {cep}")
         return jsonify({'success': False, 'error': 'CEP inválido', 'cep': cep}), 400
     
-    # Try Correios service first
-    result = consultar_cep_correios(clean_cep)
+    result = offline_result(clean_cep) or lookup_cep(clean_cep)
     
-    # If Correios fails, try fallback APIs
-    if not result['success']:
-        logger.info("Trying fallback APIs")
-        
-        fallback_apis = [
-            {
-                'name': 'ViaCEP',
-                'url': f'https://viacep.com.br/ws/{clean_cep}/json/',
-                'transform': lambda data: {
-                    'street': data.get('logradouro', ''),
-                    'neighborhood': data.get('bairro', ''),
-                    'city': data.get('localidade', ''),
-                    'state': data.get('uf', ''),
-                    'cep': data.get('cep', clean_cep)
-                },
-                'validate': lambda data: 'erro' not in data and data.get('cep')
-            },
-            {
-                'name': 'BrasilAPI',
-                'url': f'https://brasilapi.com.br/api/cep/v1/{clean_cep}',
-                'transform': lambda data: {
-                    'street': data.get('street', ''),
-                    'neighborhood': data.get('neighborhood', ''),
-                    'city': data.get('city', ''),
-                    'state': data.get('state', ''),
-                    'cep': data.get('cep', clean_cep)
-                },
-                'validate': lambda data: 'errors' not in data and data.get('cep')
-            }
-        ]
-        
-        for api in fallback_apis:
-            try:
-                logger.info(f"Trying API: {api['name']}")
-                response = requests.get(api['url'], timeout=5)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    if api['validate'](data):
-                        result = {
-                            'success': True,
-                            'data': api['transform'](data),
-                            'source': api['name']
-                        }
-                        logger.info(f"CEP found via {api['name']}")
-                        break
-                    else:
-                        logger.warning(f"Invalid data from {api['name']}")
-                else:
-                    logger.warning(f"{api['name']} returned status {response.status_code}")
-                    
-            except Exception as e:
-                logger.error(f"Error querying {api['name']}: {str(e)}")
-                continue
+    if result['status'] == 'found':
+        return jsonify({'success': True, 'data': result['data'], 'source': result['source']})
+    return jsonify({'success': False, 'error': result['error']})
+
+def conditional_json(payload, etag):
+    """JSON response with an ETag, answered with 304 when the client has it"""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    # Let browsers store the payload but always revalidate
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/localities', methods=['GET'])
+def get_localities():
+    """
+    Localities of a UF. With ?q= returns ranked autocomplete matches
+    (name prefix first, then word prefix); without it, the full sorted
+    list. ?city= narrows both to one city.
+    """
+    uf = request.args.get('uf', '').strip().upper()
+    query = request.args.get('q', '').strip()
+    city = request.args.get('city') or None
     
-    # Add source information
-    if result['success'] and 'source' not in result:
-        result['source'] = 'Correios'
+    if not uf:
+        return jsonify({'success': False, 'error': 'Informe a UF'}), 400
     
-    return jsonify(result)
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), LOCALITY_MAX_RESULTS)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Limite inválido'}), 400
+    
+    index = locality_store.index(uf)
+    if index is None:
+        return jsonify({'success': False, 'error': 'UF sem localidades cadastradas'}), 404
+    
+    if not query:
+        if city is not None:
+            names, etag = index.cities.get(city, ((), content_hash([uf, city])))
+            localities = [{'name': name, 'city': city, 'uf': uf} for name in names]
+        else:
+            etag = index.etag
+            localities = [item._asdict() for item in index.localities]
+        return conditional_json({
+            'success': True,
+            'uf': uf,
+            'total': len(localities),
+            'localities': localities
+        }, etag)
+    
+    deadline = time.perf_counter() + LOCALITY_SEARCH_BUDGET_MS / 1000
+    matches, partial = index.search(query, city=city, limit=limit, deadline=deadline)
+    payload = {
+        'success': True,
+        'uf': uf,
+        'query': query,
+        'partial': partial,
+        'results': [item._asdict() for item in matches]
+    }
+    if partial:
+        # A scan cut short by the latency budget must not be revalidated as complete
+        return jsonify(payload)
+    return conditional_json(payload, content_hash([index.etag, query.lower(), city or '', str(limit)]))
 
 @app.route('/api/brasilia/streets', methods=['GET'])
 def get_brasilia_streets():
@@ -320,73 +434,16 @@ def get_brasilia_streets():
     """
     logger.info("Request for all streets in Brasília (DF)")
     
-    # Sample data for streets in Brasília
-    # In a real implementation, this would come from a database
-    brasilia_streets = [
-        "SIA - Setor de Indústria e Abastecimento",
-        "SBN - Setor Bancário Norte",
-        "SBS - Setor Bancário Sul",
-        "CLS - Centro Linguístico Sul",
-        "CLN - Centro Linguístico Norte",
-        "SHIN - Setor Hípico Norte",
-        "SHIS - Setor Hípico Sul",
-        "SHCN - Setor Hospitalar Central Norte",
-        "SHCS - Setor Hospitalar Central Sul",
-        "SHLN - Setor Hospitalar Local Norte",
-        "SHLS - Setor Hospitalar Local Sul",
-        "SIG - Setor de Indústria Gráfica",
-        "SLN - Setor de Lodas Norte",
-        "SLS - Setor de Lodas Sul",
-        "SMAS - Setor Médico Administrativo Sul",
-        "SMAN - Setor Médico Administrativo Norte",
-        "SQN - Setor Quadra Norte",
-        "SQS - Setor Quadra Sul",
-        "Vila Planalto",
-        "Vila Telebrasília",
-        "Asa Norte",
-        "Asa Sul",
-        "Lago Norte",
-        "Lago Sul",
-        "Park Way",
-        "Guará",
-        "Taguatinga",
-        "Ceilândia",
-        "Samambaia",
-        "Plano Piloto",
-        "Sudoeste",
-        "Noroeste",
-        "Jardim Botânico",
-        "Itapoã",
-        "São Sebastião",
-        "Gama",
-        "Aguas Claras",
-        "Recanto das Emas",
-        "Sol Nascente",
-        "Planaltina",
-        "Sobradinho",
-        "Estrutural",
-        "Santa Maria",
-        "São Francisco",
-        "Riacho Fundo",
-        "Cruzeiro",
-        "Paranoá",
-        "Luziânia",
-        "Cidade Ocidental",
-        "Valparaíso de Goiás",
-        "Novo Gama",
-        "Núcleo Bandeirante"
-    ]
-    
-    # Sort streets alphabetically
-    brasilia_streets.sort()
+    # Sorted once when the locality dataset is loaded
+    streets, etag = locality_store.city_list('DF', 'Brasília') or ((), content_hash(['DF', 'Brasília']))
     
-    return jsonify({
+    return conditional_json({
         'success': True,
         'city': 'Brasília',
         'state': 'DF',
-        'total_streets': len(brasilia_streets),
-        'streets': brasilia_streets
-    })
+        'total_streets': len(streets),
+        'streets': list(streets)
+    }, etag)
 
 if __name__ == '__main__':
     logger.info("Iniciando CEP Service na porta 5001")
@@ -0,0 +1,268 @@
+"""
+Async (ASGI) serving mode for the CEP Service.
+
+Serves the same routes as cep_service.py (/api/cep/<cep>,
+/api/cep/test/<cep> and /health) from a single event loop. Upstream calls
+go through one shared keep-alive HTTP client, so connections (and their TLS
+sessions) are reused across lookups, and a per-host limit keeps a burst of
+lookups from opening hundreds of connections to one provider. A lookup
+waiting on a slow provider holds no thread, so one process can keep
+thousands of lookups in flight.
+
+The offline index, the CEP cache, the lookup mode, adaptive ordering and
+the circuit breaker settings are shared with cep_service.py.
+
+Run with:
+    uvicorn cep_service_asgi:app --host 0.0.0.0 --port 5001
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import cep_service
+from correios_client import HEADERS as CORREIOS_HEADERS, build_envelope
+from cep_providers import (
+    FALLBACK_TIMEOUT,
+    JSON_APIS,
+    AsyncProvider,
+    AsyncSingleFlight,
+    CircuitBreaker,
+    async_hedged_lookup,
+    async_sequential_lookup,
+    interpret_json_response,
+    rank_providers,
+)
+
+logger = logging.getLogger(__name__)
+
+# Connection pool configuration
+CEP_HTTP_MAX_CONNECTIONS = int(os.environ.get('CEP_HTTP_MAX_CONNECTIONS', 200))
+CEP_HTTP_MAX_PER_HOST = int(os.environ.get('CEP_HTTP_MAX_PER_HOST', 50))
+CEP_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('CEP_HTTP_KEEPALIVE_EXPIRY', 30))
+
+
+class PooledHttpClient:
+    """
+    Shared keep-alive HTTP client with a cap on concurrent requests per
+    host. Requests over the cap wait for a free slot instead of opening
+    more connections.
+    """
+
+    def __init__(self, max_connections=CEP_HTTP_MAX_CONNECTIONS, max_per_host=CEP_HTTP_MAX_PER_HOST,
+                 keepalive_expiry=CEP_HTTP_KEEPALIVE_EXPIRY):
+        self.max_per_host = max_per_host
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            # Each call passes its own timeout; this only bounds the pool wait
+            timeout=httpx.Timeout(cep_service.REQUEST_TIMEOUT)
+        )
+        self._hosts = {}
+        self._active = {}
+
+    async def request(self, method, url, timeout, **kwargs):
+        host = urlsplit(url).netloc
+        semaphore = self._hosts.get(host)
+        if semaphore is None:
+            semaphore = self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+            self._active[host] = 0
+
+        async with semaphore:
+            self._active[host] += 1
+            try:
+                return await self._client.request(method, url, timeout=timeout, **kwargs)
+            finally:
+                self._active[host] -= 1
+
+    def stats(self):
+        return {
+            host: {'active': active, 'limit': self.max_per_host}
+            for host, active in self._active.items()
+        }
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+def async_json_api_provider(name, http, url=None, timeout=FALLBACK_TIMEOUT):
+    """Async counterpart of the JSON API providers of cep_providers.py"""
+    api = JSON_APIS[name]
+    url = url or api['url']
+
+    async def lookup(cep):
+        response = await http.request('GET', url.format(cep=cep), timeout=timeout)
+        return interpret_json_response(
+            name, response.status_code, response.json, api['transform'], api['validate'], cep
+        )
+
+    return AsyncProvider(name, lookup)
+
+
+def async_correios_provider(http, client=None, timeout=cep_service.REQUEST_TIMEOUT):
+    """Correios over the pooled async client; shares the sync client's parser and counters"""
+    client = client or cep_service.correios_client
+
+    async def lookup(cep):
+        try:
+            with client.round_trip():
+                response = await http.request(
+                    'POST', client.url, timeout=timeout,
+                    content=build_envelope(cep), headers=CORREIOS_HEADERS
+                )
+        except httpx.TimeoutException:
+            logger.error(f"Timeout ao consultar Correios para CEP {cep}")
+            return {'status': 'error', 'error': 'Timeout ao consultar Correios'}
+        except httpx.TransportError:
+            logger.error(f"Erro de conexão ao consultar Correios para CEP {cep}")
+            return {'status': 'error', 'error': 'Erro de conexão com os Correios'}
+        result = client.parse_response(response.status_code, response.content, cep)
+        return cep_service.correios_result(result)
+
+    return AsyncProvider('Correios', lookup)
+
+
+def build_providers(http):
+    """Same providers, order and breaker settings as cep_service.PROVIDERS"""
+    providers = [
+        async_correios_provider(http),
+        async_json_api_provider('ViaCEP', http),
+        async_json_api_provider('BrasilAPI', http),
+        async_json_api_provider('Postmon', http),
+    ]
+    for provider in providers:
+        provider.breaker = CircuitBreaker(
+            error_threshold=cep_service.CEP_BREAKER_ERROR_RATE,
+            min_requests=cep_service.CEP_BREAKER_MIN_REQUESTS,
+            cooldown=cep_service.CEP_BREAKER_COOLDOWN
+        )
+    return providers
+
+
+class CepResolver:
+    """Provider lookups, caching and single-flight for the async app"""
+
+    def __init__(self, providers):
+        self.providers = providers
+        self.flights = AsyncSingleFlight()
+
+    def ordered_providers(self):
+        if cep_service.CEP_ADAPTIVE_ORDER:
+            return rank_providers(self.providers)
+        return self.providers
+
+    async def lookup(self, clean_cep):
+        """Resolve a normalized CEP through the providers (without the cache)"""
+        if cep_service.CEP_LOOKUP_MODE == 'hedged':
+            return await async_hedged_lookup(clean_cep, self.providers)
+        return await async_sequential_lookup(clean_cep, self.ordered_providers())
+
+    async def _lookup_and_cache(self, clean_cep):
+        result = await self.lookup(clean_cep)
+        # SQLite writes may wait on a lock; keep them off the event loop
+        if result['status'] == 'found':
+            await asyncio.to_thread(cep_service.cep_cache.set, clean_cep, result['data'])
+        elif result['status'] == 'not_found' and result['conclusive']:
+            await asyncio.to_thread(cep_service.cep_cache.set_not_found, clean_cep)
+        return result
+
+    async def resolve(self, clean_cep):
+        # The offline index and the LRU answer in microseconds; only a
+        # cold cache touches SQLite, with a primary-key read
+        result = cep_service.local_result(clean_cep)
+        if result is not None:
+            return result
+        return await self.flights.do(clean_cep, lambda: self._lookup_and_cache(clean_cep))
+
+
+async def get_cep(request):
+    cep = request.path_params['cep']
+    logger.info(f"Recebida requisição para CEP: {cep}")
+
+    clean_cep = cep_service.normalize_cep(cep)
+    if clean_cep is None:
+        logger.warning(f"CEP inválido: {cep}")
+        return JSONResponse({'success': False, 'error': 'CEP inválido'}, status_code=400)
+
+    result = await request.app.state.resolver.resolve(clean_cep)
+    if result['status'] == 'found':
+        return JSONResponse({'success': True, 'data': result['data']})
+
+    logger.error("Todas as tentativas falharam")
+    return JSONResponse({'success': False, 'error': result['error']}, status_code=404)
+
+
+async def test_cep(request):
+    cep = request.path_params['cep']
+    logger.info(f"Test CEP lookup requested for: {cep}")
+
+    clean_cep = cep_service.normalize_cep(cep)
+    if clean_cep is None:
+        logger.warning(f"Invalid CEP: {cep}")
+        return JSONResponse({'success': False, 'error': 'CEP inválido', 'cep': cep}, status_code=400)
+
+    result = cep_service.offline_result(clean_cep) or await request.app.state.resolver.lookup(clean_cep)
+    if result['status'] == 'found':
+        return JSONResponse({'success': True, 'data': result['data'], 'source': result['source']})
+    return JSONResponse({'success': False, 'error': result['error']})
+
+
+async def health_check(request):
+    resolver = request.app.state.resolver
+    index = cep_service.cep_index
+    return JSONResponse({
+        'status': 'ok',
+        'service': 'CEP Service',
+        'server': 'asgi',
+        'lookup_mode': cep_service.CEP_LOOKUP_MODE,
+        'offline_index': index.stats() if index is not None else None,
+        'cache': cep_service.cep_cache.stats(),
+        'single_flight': resolver.flights.stats(),
+        'correios': cep_service.correios_client.stats.snapshot(),
+        'http_pool': request.app.state.http.stats(),
+        'provider_order': [provider.name for provider in resolver.ordered_providers()],
+        'providers': {
+            provider.name: dict(provider.stats.snapshot(), breaker=provider.breaker.snapshot())
+            for provider in resolver.providers
+        }
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.http = PooledHttpClient()
+    app.state.resolver = CepResolver(build_providers(app.state.http))
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/cep/test/{cep}', test_cep, methods=['GET']),
+        Route('/api/cep/{cep}', get_cep, methods=['GET']),
+        Route('/health', health_check, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'])],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    logger.info("Iniciando CEP Service (ASGI) na porta 5001")
+    uvicorn.run(app, host='0.0.0.0', port=5001)
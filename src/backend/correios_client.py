@@ -0,0 +1,302 @@
+"""
+Correios SOAP client for the CEP Service.
+
+Keeps the consultaCEP envelope pre-encoded (only the CEP digits are spliced
+in per call), reuses keep-alive connections through one requests.Session and
+parses answers incrementally with an XMLPullParser, stopping as soon as the
+<return> (or <faultstring>) element is complete. Element names are resolved
+through a cached '{namespace}tag' -> 'tag' map, so the parser never cares
+whether <return> comes namespace-qualified or not.
+
+Every SOAP round trip and every parse is counted and timed (see stats()).
+
+Benchmark the parser against the recorded responses in fixtures/correios:
+
+    python correios_client.py --benchmark
+"""
+
+import argparse
+import glob
+import logging
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+
+from cep_providers import NOT_FOUND_ERROR, _percentile
+
+logger = logging.getLogger(__name__)
+
+# Correios SOAP service URL
+CORREIOS_URL = "https://apps.correios.com.br/SigepMasterJPA/AtendeClienteService/AtendeCliente"
+
+HEADERS = {
+    'Content-Type': 'text/xml; charset=utf-8',
+    'SOAPAction': 'consultaCEP'
+}
+
+# consultaCEP envelope, encoded once; the CEP goes between the two halves
+ENVELOPE_PREFIX, ENVELOPE_SUFFIX = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+    '<soap:Body>'
+    '<ns2:consultaCEP xmlns:ns2="http://cliente.bean.master.sigep.bsb.correios.com.br/">'
+    '<cep>{cep}</cep>'
+    '</ns2:consultaCEP>'
+    '</soap:Body>'
+    '</soap:Envelope>'
+).encode('utf-8').split(b'{cep}')
+
+# Correios' fault message for an unknown CEP
+FAULT_NOT_FOUND = 'CEP NAO ENCONTRADO'
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'correios')
+
+# Namespace cache: '{uri}tag' -> 'tag'
+_local_names = {}
+
+
+def local_name(tag):
+    name = _local_names.get(tag)
+    if name is None:
+        name = tag.rsplit('}', 1)[-1]
+        # Only a handful of distinct tags exist; never let junk grow this
+        if len(_local_names) < 1024:
+            _local_names[tag] = name
+    return name
+
+
+def build_envelope(cep):
+    """consultaCEP request body for an 8-digit CEP"""
+    return ENVELOPE_PREFIX + cep.encode('ascii') + ENVELOPE_SUFFIX
+
+
+def parse_envelope(content):
+    """
+    Read a consultaCEP answer. Returns ('address', {field: text}) once
+    </return> is seen, ('fault', faultstring) for a SOAP fault, or
+    (None, None) when the body holds neither.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    parser.feed(content)
+
+    fields = {}
+    in_return = False
+    for event, element in parser.read_events():
+        name = local_name(element.tag)
+        if event == 'start':
+            if name == 'return':
+                in_return = True
+        elif name == 'return':
+            return 'address', fields
+        elif in_return:
+            fields[name] = element.text
+        elif name == 'faultstring':
+            return 'fault', element.text or ''
+    return None, None
+
+
+class CorreiosStats:
+    """Round-trip and parse counters/timings"""
+
+    def __init__(self, window=200):
+        self._lock = threading.Lock()
+        self.round_trip_times = deque(maxlen=window)
+        self.round_trips = 0
+        self.failures = 0
+        self.parses = 0
+        self.parse_time = 0.0
+
+    def record_round_trip(self, elapsed, failed):
+        with self._lock:
+            self.round_trips += 1
+            self.round_trip_times.append(elapsed)
+            if failed:
+                self.failures += 1
+
+    def record_parse(self, elapsed):
+        with self._lock:
+            self.parses += 1
+            self.parse_time += elapsed
+
+    def snapshot(self):
+        with self._lock:
+            times = list(self.round_trip_times)
+            snapshot = {
+                'round_trips': self.round_trips,
+                'failures': self.failures,
+                'parses': self.parses,
+                'parse_avg_us': round(self.parse_time / self.parses * 1e6, 1) if self.parses else None,
+            }
+        p50 = _percentile(times, 0.5)
+        p95 = _percentile(times, 0.95)
+        snapshot['round_trip_p50_ms'] = round(p50 * 1000, 1) if p50 is not None else None
+        snapshot['round_trip_p95_ms'] = round(p95 * 1000, 1) if p95 is not None else None
+        return snapshot
+
+
+class CorreiosClient:
+    """consultaCEP over SOAP with a pooled session and timing counters"""
+
+    def __init__(self, url=CORREIOS_URL, timeout=10, session=None):
+        self.url = url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.stats = CorreiosStats()
+
+    @contextmanager
+    def round_trip(self):
+        """Time one SOAP call; also used by the async client"""
+        started = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.stats.record_round_trip(time.perf_counter() - started, failed)
+
+    def post(self, cep):
+        """Send consultaCEP and return the raw HTTP response"""
+        with self.round_trip():
+            return self.session.post(
+                self.url,
+                data=build_envelope(cep),
+                headers=HEADERS,
+                timeout=self.timeout
+            )
+
+    def parse_response(self, status_code, content, cep):
+        """
+        Interpret the HTTP answer of the Correios SOAP service as
+        {'success': True, 'data': ...} or {'success': False, 'error': ...}
+        """
+        started = time.perf_counter()
+        try:
+            return self._interpret(status_code, content, cep)
+        finally:
+            self.stats.record_parse(time.perf_counter() - started)
+
+    def _interpret(self, status_code, content, cep):
+        logger.info(f"Resposta dos Correios: {status_code}")
+
+        if status_code == 200:
+            kind, endereco = parse_envelope(content)
+            if kind != 'address':
+                logger.warning("CEP não encontrado nos Correios")
+                return {'success': False, 'error': NOT_FOUND_ERROR}
+
+            # Validate required fields
+            if not endereco.get('end') and not endereco.get('bairro') and not endereco.get('cidade'):
+                logger.warning("CEP encontrado mas dados incompletos nos Correios")
+                return {'success': False, 'error': 'Dados do CEP incompletos'}
+
+            result = {
+                'success': True,
+                'data': {
+                    'street': endereco.get('end') or '',
+                    'neighborhood': endereco.get('bairro') or '',
+                    'city': endereco.get('cidade') or '',
+                    'state': endereco.get('uf') or '',
+                    'cep': endereco.get('cep') or cep
+                }
+            }
+            logger.info(f"CEP encontrado: {result}")
+            return result
+        elif status_code == 404:
+            logger.warning(f"CEP {cep} não encontrado (404) nos Correios")
+            return {'success': False, 'error': NOT_FOUND_ERROR}
+        elif status_code == 500:
+            # Correios answers an unknown CEP with a SOAP fault
+            try:
+                kind, fault = parse_envelope(content)
+            except ET.ParseError:
+                kind, fault = None, None
+            if kind == 'fault' and FAULT_NOT_FOUND in fault.upper():
+                logger.warning(f"CEP {cep} não encontrado nos Correios")
+                return {'success': False, 'error': NOT_FOUND_ERROR}
+            logger.error(f"Erro interno do servidor dos Correios para CEP {cep}")
+            return {'success': False, 'error': 'Erro interno do servidor dos Correios'}
+        else:
+            logger.error(f"Erro na requisição aos Correios: {status_code}")
+            return {'success': False, 'error': f'Erro na requisição: {status_code}'}
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """Recorded responses as (name, status_code, content); files are named <status>_<case>.xml"""
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.xml'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'rb') as f:
+            fixtures.append((name, int(name.split('_', 1)[0]), f.read()))
+    return fixtures
+
+
+def _legacy_parse(content):
+    """The previous parser: ET.fromstring over the whole body, then find()"""
+    root = ET.fromstring(content)
+    namespace = {'soap': 'http://schemas.xmlsoap.org/soap/envelope/',
+                 'ns2': 'http://cliente.bean.master.sigep.bsb.correios.com.br/'}
+    return_element = root.find('.//ns2:return', namespace)
+    if return_element is None:
+        return None
+    return {
+        child.tag.split('}')[1] if '}' in child.tag else child.tag: child.text
+        for child in return_element
+    }
+
+
+def benchmark(iterations=20000, directory=FIXTURES_DIR):
+    """Parser cost per lookup (microseconds) for every recorded response"""
+    client = CorreiosClient(session=object())
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+
+    rows = []
+    for name, status_code, content in load_fixtures(directory):
+        timings = {}
+        for label, parse in (
+            ('legacy_fromstring', lambda: _legacy_parse(content)),
+            ('pull_parser', lambda: parse_envelope(content)),
+            ('parse_response', lambda: client.parse_response(status_code, content, '00000000')),
+        ):
+            try:
+                parse()
+            except ET.ParseError:
+                continue
+            started = time.perf_counter()
+            for _ in range(iterations):
+                parse()
+            timings[label] = (time.perf_counter() - started) / iterations * 1e6
+        rows.append((name, timings))
+
+    logger.setLevel(level)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cliente SOAP dos Correios')
+    parser.add_argument('--benchmark', action='store_true', help='Mede o custo do parser com as respostas gravadas')
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--cep', help='Consulta um CEP nos Correios')
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        for name, timings in benchmark(args.iterations):
+            print(name)
+            for label, micros in timings.items():
+                print(f'  {label:<20} {micros:8.1f} us/consulta')
+    elif args.cep:
+        client = CorreiosClient()
+        response = client.post(''.join(filter(str.isdigit, args.cep)))
+        print(client.parse_response(response.status_code, response.content, args.cep))
+        print(client.stats.snapshot())
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Locality dataset for the CEP Service.
+
+Localities (neighbourhoods, administrative regions, sectors...) are stored
+in a local SQLite table keyed by UF and city, seeded from data/localities.csv.
+At load time the service precomputes, per UF, an accent-folded sorted list of
+names and a sorted list of the words inside them, so autocomplete is two
+binary searches plus a short scan, and per city a sorted name list with an
+ETag, ready to be served as is.
+
+Import more localities with:
+
+    python locality_service.py import localidades.csv
+
+The CSV needs the columns uf, city and name.
+"""
+
+import argparse
+import bisect
+import csv
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+Locality = namedtuple('Locality', 'uf city name')
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Ranks of a match: the whole name, a prefix of the name, a prefix of a word
+EXACT, NAME_PREFIX, WORD_PREFIX = range(3)
+
+
+def fold(text):
+    """Lowercase, accent-free form used for sorting and matching"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def content_hash(parts):
+    """Stable digest of a list of strings, used as ETag value"""
+    return hashlib.md5('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class UfIndex:
+    """Immutable search structures for the localities of one UF"""
+
+    def __init__(self, uf, localities):
+        self.uf = uf
+        self.localities = sorted(localities, key=lambda item: (fold(item.name), fold(item.city)))
+        self.keys = [fold(item.name) for item in self.localities]
+
+        words = sorted(
+            (word, position)
+            for position, key in enumerate(self.keys)
+            # The first word is already covered by the name prefix search
+            for word in WORD_RE.findall(key)[1:]
+        )
+        self.word_keys = [word for word, _ in words]
+        self.word_positions = [position for _, position in words]
+
+        cities = {}
+        for item in self.localities:
+            cities.setdefault(item.city, []).append(item.name)
+        # City lists are already in folded order; freeze them with their ETag
+        self.cities = {
+            city: (tuple(names), content_hash([uf, city] + names)) for city, names in cities.items()
+        }
+        self.etag = content_hash([uf] + [f'{item.city}\x1e{item.name}' for item in self.localities])
+
+    def search(self, query, city=None, limit=10, deadline=None):
+        """
+        Localities whose name, or a word of it, starts with `query`, ranked
+        exact match > name prefix > word prefix, then alphabetically.
+        Returns (matches, partial); partial is True when the deadline cut
+        the scan short.
+        """
+        key = fold(query)
+        if not key:
+            return [], False
+
+        found = {}
+        partial = False
+
+        def scan(keys, positions, rank):
+            nonlocal partial
+            i = bisect.bisect_left(keys, key)
+            while i < len(keys) and keys[i].startswith(key) and len(found) < limit:
+                if deadline is not None and time.perf_counter() > deadline:
+                    partial = True
+                    return
+                position = positions[i] if positions is not None else i
+                if position not in found and (city is None or self.localities[position].city == city):
+                    found[position] = EXACT if keys[i] == key and rank == NAME_PREFIX else rank
+                i += 1
+
+        # Name prefixes come out in alphabetical order, so the first `limit`
+        # are the best ones; word prefixes only fill the remaining slots
+        scan(self.keys, None, NAME_PREFIX)
+        if not partial:
+            scan(self.word_keys, self.word_positions, WORD_PREFIX)
+
+        ranked = sorted(found.items(), key=lambda entry: (entry[1], self.keys[entry[0]]))
+        return [self.localities[position] for position, _ in ranked[:limit]], partial
+
+
+class LocalityStore:
+    """SQLite-backed locality dataset with precomputed per-UF indexes"""
+
+    def __init__(self, path, seed_path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS localities (
+                    id INTEGER PRIMARY KEY,
+                    uf TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    name_key TEXT NOT NULL,
+                    UNIQUE (uf, city, name)
+                )
+            """)
+            # Prefix searches on a folded name within a UF/city
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS localities_uf_city_key ON localities (uf, city, name_key)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS localities_uf_key ON localities (uf, name_key)")
+            empty = conn.execute("SELECT 1 FROM localities LIMIT 1").fetchone() is None
+
+        if empty and seed_path:
+            self.import_csv(seed_path)
+        else:
+            self.reload()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def import_csv(self, csv_path):
+        """Add the localities of a CSV (uf, city, name) and reload; returns rows read"""
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            rows = [
+                (row['uf'].strip().upper(), row['city'].strip(), row['name'].strip())
+                for row in csv.DictReader(f)
+                if row.get('uf') and row.get('city') and row.get('name')
+            ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO localities (uf, city, name, name_key) VALUES (?, ?, ?, ?)",
+                [(uf, city, name, fold(name)) for uf, city, name in rows]
+            )
+        self.reload()
+        return len(rows)
+
+    def reload(self):
+        """Rebuild the in-memory indexes from the table and swap them in"""
+        by_uf = {}
+        with self._connect() as conn:
+            for uf, city, name in conn.execute(
+                "SELECT uf, city, name FROM localities ORDER BY uf, name_key"
+            ):
+                by_uf.setdefault(uf, []).append(Locality(uf, city, name))
+        indexes = {uf: UfIndex(uf, localities) for uf, localities in by_uf.items()}
+        with self._lock:
+            self._indexes = indexes
+        logger.info(f"Localidades carregadas: {sum(len(i.localities) for i in indexes.values())}")
+
+    def index(self, uf):
+        """Search structures of a UF, or None if the dataset has none"""
+        return self._indexes.get((uf or '').upper())
+
+    def city_list(self, uf, city):
+        """(sorted names, etag) of a city, or None"""
+        index = self.index(uf)
+        if index is None:
+            return None
+        return index.cities.get(city)
+
+    def search(self, uf, query, city=None, limit=10, budget_ms=None):
+        index = self.index(uf)
+        if index is None:
+            return [], False
+        deadline = time.perf_counter() + budget_ms / 1000 if budget_ms else None
+        return index.search(query, city=city, limit=limit, deadline=deadline)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Base de localidades')
+    parser.add_argument('--db', default='localities.db', help='Banco SQLite das localidades')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    importer = subcommands.add_parser('import', help='Importa localidades de um CSV (uf, city, name)')
+    importer.add_argument('csv_path')
+
+    search = subcommands.add_parser('search', help='Busca localidades por prefixo')
+    search.add_argument('uf')
+    search.add_argument('query')
+
+    args = parser.parse_args(argv)
+    store = LocalityStore(args.db)
+
+    if args.command == 'import':
+        print(f'{store.import_csv(args.csv_path)} linhas lidas de {args.csv_path}')
+    else:
+        matches, _ = store.search(args.uf, args.query)
+        for item in matches:
+            print(f'{item.name} ({item.city}/{item.uf})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+Vectorized sales analytics over the columnar export.
+
+Line items of the Parquet export (analytics_export.py) are loaded once into
+flat NumPy arrays: product_id, quantity, unit_price, the status code and the
+day (days since 1970-01-01) of their order, plus a product -> category
+lookup. The arrays are cached in memory and as .npy files under
+<out>/_columns, keyed by the export state, so later loads are a memory map
+until the next export.
+
+Every aggregate is then a few passes over those arrays: np.bincount sums per
+product/category/day, np.argpartition finds the top N without sorting all
+products, and a cumulative sum gives moving averages.
+
+Compare against the SQL GROUP BY on synthetic data with:
+
+    python sales_analytics.py benchmark --sizes 1000000,10000000,50000000
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from analytics_export import SALE_STATUSES, STATE_FILE, load_dataset
+
+logger = logging.getLogger(__name__)
+
+STATUS_CODES = {'pending': 0, 'processing': 1, 'shipped': 2, 'delivered': 3, 'cancelled': 4}
+SALE_CODES = np.array([STATUS_CODES[status] for status in SALE_STATUSES], dtype=np.uint8)
+
+COLUMNS_DIR = '_columns'
+COLUMN_NAMES = ('product_id', 'quantity', 'unit_price', 'status', 'day', 'category_of')
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class SalesColumns:
+    """Line-item columns plus the product -> category lookup"""
+
+    __slots__ = COLUMN_NAMES
+
+    def __init__(self, product_id, quantity, unit_price, status, day, category_of):
+        self.product_id = product_id
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.status = status
+        self.day = day
+        self.category_of = category_of
+
+    def __len__(self):
+        return len(self.product_id)
+
+    def sold(self):
+        """Mask of the items of shipped/delivered orders"""
+        return np.isin(self.status, SALE_CODES)
+
+
+def _fingerprint(out_dir):
+    with open(os.path.join(out_dir, STATE_FILE), 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def build_columns(out_dir):
+    """Read the export and lay the line items out as NumPy arrays"""
+    orders = load_dataset(out_dir, 'orders', ['id', 'status', 'created_at'])
+    items = load_dataset(out_dir, 'order_items', ['order_id', 'product_id', 'quantity', 'price'])
+    products = load_dataset(out_dir, 'products', ['id', 'category_id'])
+
+    order_ids = orders['id'].to_numpy()
+    order_sort = np.argsort(order_ids)
+    order_ids = order_ids[order_sort]
+    # STATUS_CODES are numbered in insertion order, so the index is the code
+    order_status = (
+        pc.index_in(orders['status'], value_set=pa.array(list(STATUS_CODES)))
+        .fill_null(255).to_numpy().astype(np.uint8)[order_sort]
+    )
+    order_day = orders['created_at'].to_numpy().astype('datetime64[D]').astype(np.int32)[order_sort]
+
+    # Map every item to its order with one binary search per item
+    item_order = items['order_id'].to_numpy()
+    if len(order_ids):
+        position = np.minimum(np.searchsorted(order_ids, item_order), len(order_ids) - 1)
+        known = order_ids[position] == item_order
+    else:
+        position = np.zeros(len(item_order), dtype=np.intp)
+        known = np.zeros(len(item_order), dtype=bool)
+    position = position[known]
+
+    product_ids = products['id'].to_numpy()
+    category_of = np.full(int(product_ids.max(initial=0)) + 1, -1, dtype=np.int32)
+    category_of[product_ids] = products['category_id'].to_numpy()
+
+    return SalesColumns(
+        product_id=items['product_id'].to_numpy()[known].astype(np.int32),
+        quantity=items['quantity'].to_numpy()[known].astype(np.int32),
+        unit_price=items['price'].to_numpy()[known].astype(np.float64),
+        status=order_status[position],
+        day=order_day[position],
+        category_of=category_of,
+    )
+
+
+def load_columns(out_dir):
+    """
+    Columns of an export, from the in-memory cache, the .npy cache (memory
+    mapped) or, when the export changed, rebuilt from Parquet
+    """
+    fingerprint = _fingerprint(out_dir)
+    key = os.path.abspath(out_dir)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        directory = os.path.join(out_dir, COLUMNS_DIR)
+        marker = os.path.join(directory, 'fingerprint')
+        columns = None
+        if os.path.exists(marker):
+            with open(marker) as f:
+                if f.read() == fingerprint:
+                    columns = SalesColumns(*(
+                        np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in COLUMN_NAMES
+                    ))
+
+        if columns is None:
+            started = time.perf_counter()
+            columns = build_columns(out_dir)
+            os.makedirs(directory, exist_ok=True)
+            for name in COLUMN_NAMES:
+                np.save(os.path.join(directory, f'{name}.npy'), getattr(columns, name))
+            with open(marker, 'w') as f:
+                f.write(fingerprint)
+            logger.info(f"Colunas recriadas: {len(columns)} itens em {time.perf_counter() - started:.2f}s")
+
+        _cache[key] = (fingerprint, columns)
+        return columns
+
+
+def product_totals(columns, mask=None):
+    """(units, revenue) per product_id, indexed by product_id"""
+    if mask is None:
+        mask = columns.sold()
+    product_id = columns.product_id[mask]
+    quantity = columns.quantity[mask]
+    size = max(len(columns.category_of), int(product_id.max(initial=-1)) + 1)
+    units = np.bincount(product_id, weights=quantity, minlength=size)
+    revenue = np.bincount(product_id, weights=quantity * columns.unit_price[mask], minlength=size)
+    return units, revenue
+
+
+def top_n(values, n):
+    """Indexes of the n largest values, largest first (ties by lower index)"""
+    n = min(n, int(np.count_nonzero(values > 0)))
+    if n <= 0:
+        return np.zeros(0, dtype=np.intp)
+    # The n-th largest value, found by partial sort; every tie of it competes
+    threshold = values[np.argpartition(-values, n - 1)[n - 1]]
+    candidates = np.flatnonzero(values >= threshold)
+    return candidates[np.lexsort((candidates, -values[candidates]))][:n]
+
+
+def top_products(columns, n=10):
+    """[(product_id, units, revenue)] of the n best sellers by units"""
+    units, revenue = product_totals(columns)
+    return [(int(i), int(units[i]), float(revenue[i])) for i in top_n(units, n)]
+
+
+def revenue_by_category(columns):
+    """{category_id: revenue} of shipped/delivered items"""
+    _, revenue = product_totals(columns)
+    known = columns.category_of >= 0
+    totals = np.bincount(columns.category_of[known], weights=revenue[:len(known)][known])
+    return {int(category): float(totals[category]) for category in np.flatnonzero(totals)}
+
+
+def daily_revenue(columns):
+    """(first_day, revenue per day) over the days between the first and last sale"""
+    mask = columns.sold()
+    day = columns.day[mask]
+    if len(day) == 0:
+        return None, np.zeros(0)
+    first = int(day.min())
+    revenue = np.bincount(day - first, weights=columns.quantity[mask] * columns.unit_price[mask])
+    return first, revenue
+
+
+def moving_average(values, window):
+    """Trailing moving average; the first window - 1 entries average what exists"""
+    values = np.asarray(values, dtype=np.float64)
+    cumulative = np.cumsum(values)
+    result = cumulative.copy()
+    result[window:] = cumulative[window:] - cumulative[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return result / counts
+
+
+# =====================================================
+# Benchmark against the SQL GROUP BY
+# =====================================================
+
+SQL_TOP_PRODUCTS = """
+SELECT p.id, SUM(oi.quantity) AS total_sold
+FROM products p
+JOIN order_items oi ON p.id = oi.product_id
+JOIN orders o ON oi.order_id = o.id
+WHERE o.status IN ('shipped', 'delivered')
+GROUP BY p.id
+ORDER BY total_sold DESC, p.id
+LIMIT ?
+"""
+
+
+def synthetic_columns(n_items, n_products=5000, n_categories=20, seed=42):
+    """Random line items (about 3 per order) and the order each belongs to"""
+    rng = np.random.default_rng(seed)
+    n_orders = max(n_items // 3, 1)
+    order_status = rng.choice(len(STATUS_CODES), size=n_orders).astype(np.uint8)
+    order_day = rng.integers(19000, 19365, size=n_orders, dtype=np.int32)
+    order_id = np.sort(rng.integers(0, n_orders, size=n_items))
+    # Skewed popularity so the top products are well separated
+    product_id = ((rng.zipf(1.3, size=n_items) - 1) % n_products).astype(np.int32)
+    columns = SalesColumns(
+        product_id=product_id,
+        quantity=rng.integers(1, 5, size=n_items, dtype=np.int32),
+        unit_price=np.round(rng.uniform(5, 500, size=n_products), 2)[product_id],
+        status=order_status[order_id],
+        day=order_day[order_id],
+        category_of=rng.integers(0, n_categories, size=n_products, dtype=np.int32),
+    )
+    return columns, order_id, order_status
+
+
+def _fill_sqlite(path, columns, order_id, order_status, chunk=500000):
+    names = {code: status for status, code in STATUS_CODES.items()}
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        CREATE TABLE products (id INTEGER PRIMARY KEY, category_id INTEGER);
+        CREATE TABLE orders (id INTEGER PRIMARY KEY, status TEXT, day INTEGER);
+        CREATE TABLE order_items (id INTEGER PRIMARY KEY, order_id INTEGER, product_id INTEGER,
+                                  quantity INTEGER, unit_price REAL);
+    """)
+    conn.executemany("INSERT INTO products VALUES (?, ?)", enumerate(columns.category_of.tolist()))
+    conn.executemany("INSERT INTO orders VALUES (?, ?, 0)", (
+        (i, names[code]) for i, code in enumerate(order_status.tolist())
+    ))
+    for start in range(0, len(columns), chunk):
+        end = start + chunk
+        conn.executemany("INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (?, ?, ?, ?)", zip(
+            order_id[start:end].tolist(), columns.product_id[start:end].tolist(),
+            columns.quantity[start:end].tolist(), columns.unit_price[start:end].tolist(),
+        ))
+    conn.execute("CREATE INDEX order_items_product ON order_items (product_id)")
+    conn.execute("CREATE INDEX order_items_order ON order_items (order_id)")
+    conn.commit()
+    return conn
+
+
+def _best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark(sizes, n=10, repeat=3, directory=None):
+    """[(items, sql_s, numpy_s)] for the top-N products; checks both agree"""
+    rows = []
+    for size in sizes:
+        columns, order_id, order_status = synthetic_columns(size)
+        with tempfile.TemporaryDirectory(dir=directory) as tmp:
+            conn = _fill_sqlite(os.path.join(tmp, 'bench.db'), columns, order_id, order_status)
+            try:
+                sql_time, sql_rows = _best_of(lambda: conn.execute(SQL_TOP_PRODUCTS, (n,)).fetchall(), repeat)
+            finally:
+                conn.close()
+        numpy_time, numpy_rows = _best_of(lambda: top_products(columns, n), repeat)
+
+        if [row[:2] for row in sql_rows] != [row[:2] for row in numpy_rows]:
+            raise AssertionError(f'Resultados divergentes para {size} itens')
+        rows.append((size, sql_time, numpy_time))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Análises de vendas vetorizadas (NumPy)')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    report = subcommands.add_parser('report', help='Resumo de vendas sobre a exportação colunar')
+    report.add_argument('--out', default='analytics', help='Diretório da exportação')
+    report.add_argument('--top', type=int, default=10)
+    report.add_argument('--window', type=int, default=7, help='Janela da média móvel (dias)')
+
+    bench = subcommands.add_parser('benchmark', help='Compara o top-N com o GROUP BY em SQL')
+    bench.add_argument('--sizes', default='1000000,10000000,50000000', help='Quantidades de itens')
+    bench.add_argument('--top', type=int, default=10)
+    bench.add_argument('--repeat', type=int, default=3)
+    bench.add_argument('--tmp', help='Diretório para o banco SQLite temporário')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'benchmark':
+        sizes = [int(size) for size in args.sizes.split(',')]
+        print(f"{'itens':>12} {'SQL (s)':>10} {'NumPy (s)':>10} {'ganho':>8}")
+        for size, sql_time, numpy_time in benchmark(sizes, args.top, args.repeat, args.tmp):
+            print(f'{size:>12} {sql_time:>10.3f} {numpy_time:>10.3f} {sql_time / numpy_time:>7.1f}x')
+    else:
+        columns = load_columns(args.out)
+        print('Produtos mais vendidos:')
+        for product_id, units, revenue in top_products(columns, args.top):
+            print(f'  {product_id}: {units} un., R$ {revenue:.2f}')
+        print('Receita por categoria:')
+        for category, revenue in sorted(revenue_by_category(columns).items(), key=lambda item: -item[1]):
+            print(f'  {category}: R$ {revenue:.2f}')
+        first, revenue = daily_revenue(columns)
+        if first is not None:
+            average = moving_average(revenue, args.window)
+            print(f'Média móvel de {args.window} dias (último dia): R$ {average[-1]:.2f}')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
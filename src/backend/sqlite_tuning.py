@@ -0,0 +1,221 @@
+"""
+Performance profile applied to every SQLite connection of the project.
+
+SQLite's defaults favour the smallest footprint over throughput: a rollback
+journal (readers and the writer block each other), synchronous=FULL (an
+fsync per commit), no memory-mapped I/O and a 2 MB page cache. The profile
+below switches to:
+
+- journal_mode=WAL: readers never block the writer nor the writer the
+  readers; the mode is stored in the database file, so it sticks for every
+  later client (including the Node server of the frontend);
+- synchronous=NORMAL: in WAL mode commits stay atomic and consistent, only
+  the last transactions before a power loss may be rolled back;
+- mmap_size / cache_size: reads served from the OS page cache and a larger
+  private page cache;
+- temp_store=MEMORY: sorts and temporary indexes stay in RAM;
+- busy_timeout: a connection waits for a lock instead of failing at once.
+
+Django applies it through the connection_created signal (api/signals.py,
+with overrides from settings.SQLITE_PRAGMAS); the maintenance scripts open
+their connections with connect().
+
+    python sqlite_tuning.py benchmark --seconds 10 --readers 4 --writers 2
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from multiprocessing import get_context
+
+# Order matters: busy_timeout first so changing the journal mode waits for
+# other connections instead of failing with "database is locked"
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,        # ms
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,    # negative: KiB, i.e. 64 MB per connection
+    'temp_store': 'MEMORY',
+}
+
+# Leaves every setting at SQLite's default (baseline of the benchmark)
+SQLITE_DEFAULTS = {name: None for name in DEFAULT_PRAGMAS}
+
+
+def build_pragmas(overrides=None):
+    """DEFAULT_PRAGMAS updated with `overrides`; a None value drops a PRAGMA"""
+    pragmas = dict(DEFAULT_PRAGMAS, **(overrides or {}))
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def apply_pragmas(conn, overrides=None):
+    """Runs the profile on an open sqlite3 connection (outside a transaction)"""
+    for name, value in build_pragmas(overrides).items():
+        conn.execute(f'PRAGMA {name}={value}').fetchall()
+    return conn
+
+
+def connect(path, overrides=None, **kwargs):
+    """sqlite3.connect() with the performance profile applied"""
+    return apply_pragmas(sqlite3.connect(path, **kwargs), overrides)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: the Django API over the same database with and without the profile
+
+def _setup_django(db_path, pragmas):
+    import django
+    from django.conf import settings
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'boss_shopp.settings')
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.SQLITE_PRAGMAS = pragmas
+    django.setup()
+
+
+def _seed(db_path, products):
+    _setup_django(db_path, SQLITE_DEFAULTS)
+    from decimal import Decimal
+
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from api.models import Category, Product
+
+    call_command('migrate', verbosity=0)
+    category = Category.objects.create(name='Casa', slug='casa')
+    Product.objects.bulk_create(
+        Product(name=f'Produto {i}', description='Produto para a casa', price=Decimal('12.50'), category=category)
+        for i in range(products)
+    )
+    get_user_model().objects.create_user(username='bench', email='bench@example.com', password='bench-123456')
+
+
+def _client(db_path, pragmas):
+    _setup_django(db_path, pragmas)
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.get(email='bench@example.com'))
+    return client
+
+
+def _run(request, barrier, seconds):
+    """
+    Calls `request` for `seconds`, starting when every worker is ready.
+    Returns (ok, errors, latencies, measured duration).
+    """
+    barrier.wait(timeout=120)
+    started = time.perf_counter()
+    deadline = started + seconds
+    ok = errors = 0
+    latencies = []
+    while time.perf_counter() < deadline:
+        request_started = time.perf_counter()
+        try:
+            success = request(ok + errors)
+        except Exception:
+            success = False
+        latencies.append(time.perf_counter() - request_started)
+        ok, errors = (ok + 1, errors) if success else (ok, errors + 1)
+    return ok, errors, latencies, time.perf_counter() - started
+
+
+def _reader(db_path, pragmas, barrier, seconds):
+    client = _client(db_path, pragmas)
+    urls = ('/api/orders/?page_size=20', '/api/products/search/?q=produto')
+
+    def request(n):
+        return client.get(urls[n % len(urls)]).status_code == 200
+
+    return _run(request, barrier, seconds)
+
+
+def _writer(db_path, pragmas, barrier, seconds):
+    from decimal import Decimal
+
+    client = _client(db_path, pragmas)
+    from api.models import Product
+
+    product_ids = list(Product.objects.values_list('id', flat=True)[:50])
+
+    def request(n):
+        payload = {
+            'total_amount': str(Decimal('12.50') * 3),
+            'shipping_address': 'Rua B, 2',
+            'payment_method': 'pix',
+            'items': [
+                {'product': product_ids[(n + i) % len(product_ids)], 'quantity': 1, 'price': '12.50'}
+                for i in range(3)
+            ],
+        }
+        return client.post('/api/orders/', payload, format='json').status_code == 201
+
+    return _run(request, barrier, seconds)
+
+
+def _summary(results):
+    """(req/s, errors, p95 ms); each worker's rate uses its own measured duration"""
+    rate = sum(result[0] / result[3] for result in results if result[3] > 0)
+    errors = sum(result[1] for result in results)
+    latencies = sorted(latency for result in results for latency in result[2])
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+    return rate, errors, p95
+
+
+def benchmark(seconds=10, readers=4, writers=2, products=2000, directory=None):
+    """
+    {profile: {'read': (req/s, errors, p95 ms), 'write': (...)}} with
+    `readers` + `writers` processes hitting the API over one database file
+    """
+    directory = tempfile.mkdtemp(dir=directory)
+    context = get_context('spawn')
+    try:
+        seed_path = os.path.join(directory, 'seed.sqlite3')
+        with context.Pool(1) as pool:
+            pool.apply(_seed, (seed_path, products))
+
+        results = {}
+        for profile, pragmas in (('default', SQLITE_DEFAULTS), ('tuned', {})):
+            db_path = os.path.join(directory, f'{profile}.sqlite3')
+            shutil.copyfile(seed_path, db_path)
+            with context.Manager() as manager, context.Pool(readers + writers) as pool:
+                # Workers set Django up, then all start measuring together
+                barrier = manager.Barrier(readers + writers)
+                args = (db_path, pragmas, barrier, seconds)
+                pending_reads = [pool.apply_async(_reader, args) for _ in range(readers)]
+                pending_writes = [pool.apply_async(_writer, args) for _ in range(writers)]
+                reads = [result.get() for result in pending_reads]
+                writes = [result.get() for result in pending_writes]
+            results[profile] = {'read': _summary(reads), 'write': _summary(writes)}
+        return results
+    finally:
+        shutil.rmtree(directory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perfil de desempenho do SQLite')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    bench = subcommands.add_parser('benchmark', help='Compara a API Django com e sem o perfil')
+    bench.add_argument('--seconds', type=float, default=10)
+    bench.add_argument('--readers', type=int, default=4, help='Processos fazendo leituras')
+    bench.add_argument('--writers', type=int, default=2, help='Processos criando pedidos')
+    bench.add_argument('--products', type=int, default=2000)
+    bench.add_argument('--tmp', help='Diretório dos bancos temporários')
+
+    args = parser.parse_args(argv)
+    results = benchmark(args.seconds, args.readers, args.writers, args.products, args.tmp)
+    print(f"{'perfil':<8} {'operação':<9} {'req/s':>8} {'erros':>6} {'p95 (ms)':>9}")
+    for profile, operations in results.items():
+        for operation, (rate, errors, p95) in operations.items():
+            print(f'{profile:<8} {operation:<9} {rate:>8.1f} {errors:>6} {p95:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
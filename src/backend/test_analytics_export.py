@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar analytics export
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import date
+
+import pyarrow.parquet as pq
+
+from analytics_export import (
+    export_all, load_dataset, load_state, revenue_by_category, revenue_by_day, sold_items, top_products
+)
+
+SCHEMA = """
+CREATE TABLE api_category (id integer PRIMARY KEY, name varchar(100), slug varchar(50), created_at datetime);
+CREATE TABLE api_product (id integer PRIMARY KEY, name varchar(200), price decimal, category_id bigint,
+                          created_at datetime, updated_at datetime);
+CREATE TABLE api_order (id integer PRIMARY KEY, user_id bigint, total_amount decimal, status varchar(20),
+                        shipping_address text, payment_method varchar(50), created_at datetime, updated_at datetime);
+CREATE TABLE api_orderitem (id integer PRIMARY KEY, order_id bigint, product_id bigint, quantity integer,
+                            price decimal);
+"""
+
+
+class ExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.db_path = os.path.join(self.directory, 'db.sqlite3')
+        self.out = os.path.join(self.directory, 'analytics')
+
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(SCHEMA)
+        conn.executemany("INSERT INTO api_category VALUES (?, ?, ?, '2024-01-01 00:00:00')", [
+            (1, 'Games', 'games'), (2, 'Casa', 'casa'),
+        ])
+        conn.executemany(
+            "INSERT INTO api_product VALUES (?, ?, ?, ?, '2024-01-01 00:00:00', '2024-01-01 00:00:00')", [
+                (1, 'Console', 2250.00, 1), (2, 'Caneca', 45.00, 2), (3, 'Teclado', 319.90, 1),
+            ]
+        )
+        conn.executemany("INSERT INTO api_order VALUES (?, 1, ?, ?, 'Rua A', 'pix', ?, ?)", [
+            (1, 2340.00, 'delivered', '2024-03-01 10:00:00', '2024-03-02 08:00:00.250000'),
+            (2, 90.00, 'shipped', '2024-03-01 15:30:00', '2024-03-01 16:00:00'),
+            (3, 319.90, 'pending', '2024-03-02 09:00:00', '2024-03-02 09:00:00'),
+        ])
+        conn.executemany("INSERT INTO api_orderitem VALUES (?, ?, ?, ?, ?)", [
+            (1, 1, 1, 1, 2250.00), (2, 1, 2, 2, 45.00), (3, 2, 2, 2, 45.00), (4, 3, 3, 1, 319.90),
+        ])
+        conn.commit()
+        conn.close()
+
+    def execute(self, sql, params=()):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(sql, params)
+        conn.commit()
+        conn.close()
+
+
+class TestExport(ExportTestCase):
+    def test_full_export(self):
+        written = export_all(self.db_path, self.out, chunk_size=2)
+        self.assertEqual(written, {'categories': 2, 'products': 3, 'orders': 3, 'order_items': 4})
+
+        orders = load_dataset(self.out, 'orders')
+        self.assertNotIn('shipping_address', orders.column_names)
+        self.assertEqual(orders['updated_at'][0].as_py().microsecond, 250000)
+
+        # One row group per chunk keeps memory bounded
+        part = os.path.join(self.out, 'order_items', 'part-000001.parquet')
+        self.assertEqual(pq.ParquetFile(part).num_row_groups, 2)
+
+    def test_incremental_export(self):
+        export_all(self.db_path, self.out)
+        self.assertEqual(load_state(self.out)['orders']['high_water'], '2024-03-02 09:00:00')
+
+        # The changed order plus the one inside the overlap window
+        self.execute("UPDATE api_order SET status = 'cancelled', updated_at = '2024-03-05 12:00:00' WHERE id = 2")
+        written = export_all(self.db_path, self.out)
+        self.assertEqual(written['orders'], 2)
+        self.assertEqual(written['order_items'], 2)
+        self.assertEqual(load_dataset(self.out, 'products').num_rows, 3)
+        self.assertEqual(load_state(self.out)['orders']['parts'], 2)
+
+        orders = load_dataset(self.out, 'orders', ['id', 'status'])
+        self.assertEqual(orders.num_rows, 3)
+        self.assertEqual(dict(zip(*orders.to_pydict().values()))[2], 'cancelled')
+
+    def test_overlap_window_is_deduplicated(self):
+        export_all(self.db_path, self.out)
+        written = export_all(self.db_path, self.out)
+        # Rows within the overlap window come again but are read once
+        self.assertEqual(written['orders'], 1)
+        self.assertEqual(load_dataset(self.out, 'orders').num_rows, 3)
+        self.assertEqual(load_dataset(self.out, 'order_items').num_rows, 4)
+
+    def test_categories_snapshot_is_replaced(self):
+        export_all(self.db_path, self.out)
+        self.execute("UPDATE api_category SET name = 'Jogos' WHERE id = 1")
+        export_all(self.db_path, self.out)
+        categories = load_dataset(self.out, 'categories', ['name'])
+        self.assertEqual(sorted(categories['name'].to_pylist()), ['Casa', 'Jogos'])
+
+
+class TestHelpers(ExportTestCase):
+    def setUp(self):
+        super().setUp()
+        export_all(self.db_path, self.out)
+        self.items = sold_items(self.out)
+
+    def test_sold_items_skip_pending_orders(self):
+        self.assertEqual(sorted(self.items['order_id'].to_pylist()), [1, 1, 2])
+
+    def test_top_products(self):
+        top = top_products(self.items, 2).to_pylist()
+        self.assertEqual(top[0], {'product_id': 2, 'units': 4, 'revenue': 180.0})
+        self.assertEqual(top[1]['product_id'], 1)
+
+    def test_revenue_by_day(self):
+        days = revenue_by_day(self.items).to_pylist()
+        self.assertEqual(days, [{'day': date(2024, 3, 1), 'orders': 2, 'revenue': 2430.0}])
+
+    def test_revenue_by_category(self):
+        products = load_dataset(self.out, 'products')
+        categories = load_dataset(self.out, 'categories')
+        totals = revenue_by_category(self.items, products, categories).to_pylist()
+        self.assertEqual([row['category'] for row in totals], ['Games', 'Casa'])
+        self.assertEqual(totals[1]['units'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent CEP cache and how the CEP Service fills it
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault('CEP_CACHE_PATH', os.path.join(tempfile.mkdtemp(), 'cep_cache.db'))
+os.environ.setdefault('CEP_LOCALITY_DB', os.path.join(tempfile.mkdtemp(), 'localities.db'))
+
+import cep_service
+from cep_cache import CepCache
+from cep_providers import Provider
+
+SE = {'cep': '01001000', 'street': 'Praça da Sé', 'city': 'São Paulo', 'state': 'SP'}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'cep_cache.db')
+        self.clock = FakeClock()
+        patch = mock.patch('cep_cache.time', self.clock)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def cache(self, **kwargs):
+        kwargs.setdefault('ttl', 100)
+        kwargs.setdefault('negative_ttl', 10)
+        return CepCache(self.path, **kwargs)
+
+    def rows(self, cache):
+        return [row[0] for row in cache._connection().execute("SELECT cep FROM cep_cache ORDER BY cep")]
+
+
+class TestExpiry(CacheTestCase):
+    def test_found_entry_lives_for_ttl(self):
+        cache = self.cache()
+        cache.set('01001000', SE)
+        self.clock.now += 99
+        self.assertEqual(cache.get('01001000'), {'found': True, 'data': SE, 'expires_at': 1_000_100.0})
+
+        self.clock.now += 1
+        self.assertIsNone(cache.get('01001000'))
+        self.assertNotIn('01001000', cache._lru)
+        # The persistent tier honours the TTL too
+        self.assertIsNone(self.cache().get('01001000'))
+
+    def test_negative_entry_uses_shorter_ttl(self):
+        cache = self.cache()
+        cache.set_not_found('99999999')
+        self.clock.now += 9
+        self.assertEqual(cache.get('99999999')['found'], False)
+        self.clock.now += 1
+        self.assertIsNone(cache.get('99999999'))
+
+    def test_entries_survive_a_restart(self):
+        self.cache().set('01001000', SE)
+        cache = self.cache()
+        self.assertEqual(cache.get('01001000')['data'], SE)
+        self.assertEqual(cache.get('01001000')['data'], SE)
+        stats = cache.stats()
+        self.assertEqual((stats['disk_hits'], stats['lru_hits']), (1, 1))
+
+    def test_purge_expired(self):
+        cache = self.cache()
+        cache.set('01001000', SE)
+        cache.set_not_found('99999999')
+        self.clock.now += 10
+        self.assertEqual(cache.purge_expired(), 1)
+        self.assertEqual(self.rows(cache), ['01001000'])
+        self.assertEqual(cache.purge_expired(), 0)
+
+
+class TestLru(CacheTestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = self.cache(lru_size=2)
+        cache.set('00000001', SE)
+        cache.set('00000002', SE)
+        cache.get('00000001')
+        cache.set('00000003', SE)
+        self.assertEqual(list(cache._lru), ['00000001', '00000003'])
+        self.assertEqual(cache.stats()['lru_size'], 2)
+
+        # Evicted from memory only: the next read comes from the table
+        self.assertIsNotNone(cache.get('00000002'))
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+        self.assertEqual(list(cache._lru), ['00000003', '00000002'])
+
+    def test_counters(self):
+        cache = self.cache()
+        self.assertIsNone(cache.get('01001000'))
+        cache.set('01001000', SE)
+        cache.set_not_found('99999999')
+        cache.get('01001000')
+        cache.get('99999999')
+        stats = cache.stats()
+        self.assertEqual(
+            {name: stats[name] for name in ('lru_hits', 'disk_hits', 'negative_hits', 'misses', 'writes')},
+            {'lru_hits': 1, 'disk_hits': 0, 'negative_hits': 1, 'misses': 1, 'writes': 2},
+        )
+        self.assertEqual(stats['hit_ratio'], round(2 / 3, 4))
+
+
+def answer(status, calls):
+    def lookup(cep):
+        calls.append(cep)
+        if status == 'found':
+            return {'status': 'found', 'data': SE}
+        return {'status': status, 'error': status}
+    return lookup
+
+
+class TestServiceCaching(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        patched = {
+            'cep_cache': self.cache(),
+            'cep_index': None,
+            'CEP_LOOKUP_MODE': 'sequential',
+            'CEP_ADAPTIVE_ORDER': False,
+        }
+        for name, value in patched.items():
+            patch = mock.patch.object(cep_service, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.client = cep_service.app.test_client()
+        self.calls = []
+
+    def use_providers(self, *statuses):
+        patch = mock.patch.object(cep_service, 'PROVIDERS', [
+            Provider(f'P{i}', answer(status, self.calls)) for i, status in enumerate(statuses)
+        ])
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_health_reports_cache_counters(self):
+        self.use_providers('found')
+        self.client.get('/api/cep/01001-000')
+        self.client.get('/api/cep/01001000')
+        cache = self.client.get('/health').get_json()['cache']
+        self.assertEqual((cache['misses'], cache['lru_hits'], cache['writes']), (1, 1, 1))
+        self.assertEqual(self.calls, ['01001000'])
+
+    def test_unknown_cep_is_cached_for_the_negative_ttl(self):
+        self.use_providers('not_found', 'not_found')
+        self.assertEqual(self.client.get('/api/cep/99999999').status_code, 404)
+        self.assertEqual(self.client.get('/api/cep/99999999').status_code, 404)
+        self.assertEqual(self.calls, ['99999999'] * 2)
+
+        self.clock.now += 10
+        self.client.get('/api/cep/99999999')
+        self.assertEqual(len(self.calls), 4)
+
+    def test_not_found_with_a_failing_provider_is_not_cached(self):
+        # ViaCEP denies the CEP while Correios is down: Correios may know it
+        self.use_providers('error', 'not_found')
+        self.assertEqual(self.client.get('/api/cep/01001000').status_code, 404)
+        self.client.get('/api/cep/01001000')
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual(self.rows(cep_service.cep_cache), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline CEP index
+"""
+
+import csv
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+os.environ.setdefault('CEP_CACHE_PATH', os.path.join(tempfile.mkdtemp(), 'cep_cache.db'))
+os.environ.setdefault('CEP_LOCALITY_DB', os.path.join(tempfile.mkdtemp(), 'localities.db'))
+
+import cep_service
+from cep_index import CepIndex, build_index, flatten, load_index
+from cep_providers import Provider
+
+ROWS = [
+    # City-level range with two street-level CEPs inside it
+    {'cep_inicial': '70000-001', 'cep_final': '73699-999', 'logradouro': '', 'bairro': '',
+     'cidade': 'Brasília', 'uf': 'DF'},
+    {'cep_inicial': '70040-010', 'cep_final': '', 'logradouro': 'SBN Quadra 1', 'bairro': 'Asa Norte',
+     'cidade': 'Brasília', 'uf': 'DF'},
+    {'cep_inicial': '70390-000', 'cep_final': '70390-999', 'logradouro': 'SHIS QI 5', 'bairro': 'Lago Sul',
+     'cidade': 'Brasília', 'uf': 'DF'},
+    {'cep_inicial': '01001-000', 'cep_final': '', 'logradouro': 'Praça da Sé', 'bairro': 'Sé',
+     'cidade': 'São Paulo', 'uf': 'SP'},
+    {'cep_inicial': 'invalido', 'cep_final': '', 'logradouro': '', 'bairro': '', 'cidade': '', 'uf': ''},
+]
+
+
+class IndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.csv_path = os.path.join(self.directory, 'ceps.csv')
+        with open(self.csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(ROWS[0]))
+            writer.writeheader()
+            writer.writerows(ROWS)
+        self.index_path = os.path.join(self.directory, 'cep_index.bin')
+        self.count = build_index(self.csv_path, self.index_path)
+        self.index = CepIndex(self.index_path)
+
+
+class TestCepIndex(IndexTestCase):
+    def test_street_cep(self):
+        address = self.index.lookup('70040010')
+        self.assertEqual(address['street'], 'SBN Quadra 1')
+        self.assertEqual(address['neighborhood'], 'Asa Norte')
+        self.assertEqual(address['cep'], '70040-010')
+
+    def test_city_range(self):
+        address = self.index.lookup('72000000')
+        self.assertEqual(address['city'], 'Brasília')
+        self.assertEqual(address['street'], '')
+
+    def test_range_resumes_after_nested_range(self):
+        self.assertEqual(self.index.lookup('70391000')['street'], '')
+        self.assertEqual(self.index.lookup('70390500')['street'], 'SHIS QI 5')
+
+    def test_uncovered_cep(self):
+        self.assertIsNone(self.index.lookup('99999999'))
+        self.assertIsNone(self.index.lookup('00000001'))
+        self.assertEqual(self.index.stats()['misses'], 2)
+
+    def test_sqlite_source(self):
+        db_path = os.path.join(self.directory, 'ceps.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE ceps (cep TEXT, logradouro TEXT, bairro TEXT, cidade TEXT, uf TEXT)")
+        conn.execute("INSERT INTO ceps VALUES ('01001000', 'Praça da Sé', 'Sé', 'São Paulo', 'SP')")
+        conn.commit()
+        conn.close()
+
+        index_path = os.path.join(self.directory, 'from_db.bin')
+        self.assertEqual(build_index(db_path, index_path), 1)
+        self.assertEqual(CepIndex(index_path).lookup(1001000)['city'], 'São Paulo')
+
+    def test_invalid_file(self):
+        path = os.path.join(self.directory, 'broken.bin')
+        with open(path, 'wb') as f:
+            f.write(b'not an index at all')
+        self.assertIsNone(load_index(path))
+        self.assertIsNone(load_index(os.path.join(self.directory, 'missing.bin')))
+
+
+class TestFlatten(unittest.TestCase):
+    def test_nested_ranges_win_and_neighbours_merge(self):
+        segments = flatten([(10, 50, 'city'), (20, 20, 'street'), (21, 30, 'city')])
+        self.assertEqual(segments, [[10, 19, 'city'], [20, 20, 'street'], [21, 50, 'city']])
+
+
+class TestOfflineTier(IndexTestCase):
+    def setUp(self):
+        super().setUp()
+        patch = mock.patch.object(cep_service, 'cep_index', self.index)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.calls = []
+        providers = mock.patch.object(cep_service, 'PROVIDERS', [
+            Provider('ViaCEP', lambda cep: self.calls.append(cep) or {'status': 'not_found', 'error': 'x'})
+        ])
+        providers.start()
+        self.addCleanup(providers.stop)
+        self.client = cep_service.app.test_client()
+
+    def test_offline_hit_skips_providers(self):
+        response = self.client.get('/api/cep/70040-010')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['data']['street'], 'SBN Quadra 1')
+        self.assertEqual(self.calls, [])
+
+        response = self.client.get('/api/cep/test/70040010')
+        self.assertEqual(response.get_json()['source'], 'Offline')
+
+    def test_uncovered_cep_goes_to_providers(self):
+        self.client.get('/api/cep/99999998')
+        self.assertEqual(self.calls, ['99999998'])
+
+
+if __name__ == '__main__':
+    unittest.main()
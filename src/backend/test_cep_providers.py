@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Tests for the CEP providers, run against local stub HTTP servers
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+os.environ.setdefault('CEP_CACHE_PATH', os.path.join(tempfile.mkdtemp(), 'cep_cache.db'))
+os.environ.setdefault('CEP_LOCALITY_DB', os.path.join(tempfile.mkdtemp(), 'localities.db'))
+
+import cep_service
+from cep_providers import (
+    CircuitBreaker,
+    Provider,
+    SingleFlight,
+    brasilapi_provider,
+    hedge_executor,
+    hedged_lookup,
+    rank_providers,
+    sequential_lookup,
+    viacep_provider,
+)
+
+VIACEP_SE = {
+    'cep': '01001-000', 'logradouro': 'Praça da Sé', 'bairro': 'Sé',
+    'localidade': 'São Paulo', 'uf': 'SP'
+}
+BRASILAPI_SE = {
+    'cep': '01001000', 'street': 'Praça da Sé', 'neighborhood': 'Sé',
+    'city': 'São Paulo', 'state': 'SP'
+}
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    block_on_close = False
+    # Room for bursts of concurrent connections
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up (timeouts, hedging) break the pipe; not an error here
+        pass
+
+
+class StubServer:
+    """
+    Local HTTP server answering every GET with a fixed status and JSON body
+    after an optional delay.
+    """
+
+    def __init__(self, status=200, body=None, delay=0.0):
+        self.status = status
+        self.body = body if body is not None else {}
+        self.delay = delay
+        self.hits = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.hits += 1
+                time.sleep(stub.delay)
+                payload = json.dumps(stub.body).encode('utf-8')
+                self.send_response(stub.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = StubHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True
+        )
+        self.thread.start()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}/{{cep}}'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubServerTestCase(unittest.TestCase):
+    def stub(self, **kwargs):
+        server = StubServer(**kwargs)
+        self.addCleanup(server.close)
+        return server
+
+
+class TestProviders(StubServerTestCase):
+    def test_found(self):
+        provider = viacep_provider(self.stub(body=VIACEP_SE).url)
+        result = provider('01001000')
+        self.assertEqual(result['status'], 'found')
+        self.assertEqual(result['data']['street'], 'Praça da Sé')
+        self.assertEqual(result['source'], 'ViaCEP')
+
+    def test_error_payload_is_not_found(self):
+        provider = viacep_provider(self.stub(body={'erro': True}).url)
+        self.assertEqual(provider('99999999')['status'], 'not_found')
+
+    def test_server_error(self):
+        provider = brasilapi_provider(self.stub(status=500).url)
+        self.assertEqual(provider('01001000')['status'], 'error')
+        self.assertEqual(provider.stats.snapshot()['errors'], 1)
+
+    def test_unreachable_provider(self):
+        server = self.stub()
+        url = server.url
+        server.close()
+        provider = viacep_provider(url, timeout=1)
+        self.assertEqual(provider('01001000')['status'], 'error')
+
+
+class TestSequentialLookup(StubServerTestCase):
+    def test_stops_at_first_hit(self):
+        first = self.stub(status=500)
+        second = self.stub(body=BRASILAPI_SE)
+        third = self.stub(body=VIACEP_SE)
+        providers = [
+            viacep_provider(first.url),
+            brasilapi_provider(second.url),
+            viacep_provider(third.url),
+        ]
+        result = sequential_lookup('01001000', providers)
+        self.assertEqual(result['source'], 'BrasilAPI')
+        self.assertEqual(third.hits, 0)
+
+
+class TestHedgedLookup(StubServerTestCase):
+    def test_returns_fastest_valid_answer(self):
+        slow = self.stub(body=VIACEP_SE, delay=1.5)
+        fast = self.stub(body=BRASILAPI_SE, delay=0.05)
+        providers = [viacep_provider(slow.url), brasilapi_provider(fast.url)]
+
+        started = time.monotonic()
+        result = hedged_lookup('01001000', providers)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(result['source'], 'BrasilAPI')
+        self.assertLess(elapsed, 1.0)
+
+    def test_invalid_answers_do_not_win(self):
+        broken = self.stub(status=500)
+        unknown = self.stub(body={'erro': True})
+        good = self.stub(body=VIACEP_SE, delay=0.2)
+        providers = [
+            brasilapi_provider(broken.url),
+            viacep_provider(unknown.url),
+            viacep_provider(good.url),
+        ]
+        self.assertEqual(hedged_lookup('01001000', providers)['status'], 'found')
+
+    def test_not_found_everywhere(self):
+        providers = [
+            viacep_provider(self.stub(body={'erro': True}).url),
+            brasilapi_provider(self.stub(status=404).url),
+        ]
+        self.assertEqual(hedged_lookup('99999999', providers)['status'], 'not_found')
+
+    def test_timeout(self):
+        providers = [viacep_provider(self.stub(body=VIACEP_SE, delay=1.0).url)]
+        result = hedged_lookup('01001000', providers, timeout=0.2)
+        self.assertEqual(result['status'], 'error')
+
+    def test_runs_on_the_given_pool(self):
+        providers = [viacep_provider(self.stub(body=VIACEP_SE).url), brasilapi_provider(self.stub(status=500).url)]
+        executor = hedge_executor(providers, concurrency=2)
+        self.addCleanup(executor.shutdown)
+        self.assertEqual(executor._max_workers, 4)
+        with mock.patch.object(executor, 'submit', wraps=executor.submit) as submit:
+            self.assertEqual(hedged_lookup('01001000', providers, executor=executor)['status'], 'found')
+        self.assertEqual(submit.call_count, 2)
+
+    def test_records_latency_per_provider(self):
+        provider = viacep_provider(self.stub(body=VIACEP_SE).url)
+        hedged_lookup('01001000', [provider])
+        stats = provider.stats.snapshot()
+        self.assertEqual(stats['found'], 1)
+        self.assertIsNotNone(stats['p50_ms'])
+
+
+def failing(cep):
+    return {'status': 'error', 'error': 'offline'}
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_on_error_rate(self):
+        breaker = CircuitBreaker(error_threshold=0.5, min_requests=4, cooldown=60)
+        for success in (True, False, True, False):
+            self.assertTrue(breaker.allow())
+            breaker.record(success)
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.snapshot()['rejected'], 1)
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker(min_requests=1, cooldown=0.05)
+        breaker.record(False)
+        self.assertEqual(breaker.state, 'open')
+        time.sleep(0.06)
+
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertTrue(breaker.allow())
+        # Only one probe at a time
+        self.assertFalse(breaker.allow())
+        breaker.record(False)
+        self.assertEqual(breaker.state, 'open')
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record(True)
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_open_provider_is_skipped(self):
+        calls = []
+        provider = Provider('Correios', lambda cep: calls.append(cep) or failing(cep),
+                            breaker=CircuitBreaker(min_requests=2, cooldown=60))
+        for _ in range(5):
+            result = provider('01001000')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['source'], 'Correios')
+
+
+class TestRankProviders(StubServerTestCase):
+    def test_open_breakers_go_last(self):
+        broken = Provider('Correios', failing, breaker=CircuitBreaker(min_requests=1))
+        broken('01001000')
+        healthy = Provider('ViaCEP', lambda cep: {'status': 'found', 'data': {}})
+        self.assertEqual(rank_providers([broken, healthy]), [healthy, broken])
+
+    def test_faster_provider_first(self):
+        slow = viacep_provider(self.stub(body=VIACEP_SE, delay=0.1).url)
+        fast = brasilapi_provider(self.stub(body=BRASILAPI_SE).url)
+        for _ in range(5):
+            slow('01001000')
+            fast('01001000')
+        self.assertEqual(rank_providers([slow, fast]), [fast, slow])
+
+    def test_outage_costs_no_latency(self):
+        down = self.stub(body=VIACEP_SE, delay=1.0)
+        up = self.stub(body=BRASILAPI_SE)
+        providers = [
+            viacep_provider(down.url, timeout=0.2),
+            brasilapi_provider(up.url),
+        ]
+        for provider in providers:
+            provider.breaker = CircuitBreaker(min_requests=2, cooldown=60)
+        for _ in range(2):
+            sequential_lookup('01001000', providers)
+
+        started = time.monotonic()
+        result = sequential_lookup('01001000', rank_providers(providers))
+        self.assertEqual(result['source'], 'BrasilAPI')
+        self.assertLess(time.monotonic() - started, 0.15)
+        self.assertEqual(down.hits, 2)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'ok'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flights.do('01001000', slow)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['ok'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flights.stats(), {'in_flight': 0, 'shared': 4})
+
+    def test_errors_reach_every_caller(self):
+        flights = SingleFlight()
+        with self.assertRaises(ValueError):
+            flights.do('x', lambda: (_ for _ in ()).throw(ValueError('boom')))
+        self.assertEqual(flights.do('x', lambda: 1), 1)
+
+
+class TestCepEndpoint(StubServerTestCase):
+    def setUp(self):
+        self.client = cep_service.app.test_client()
+        cep_service.cep_cache._lru.clear()
+        with cep_service.cep_cache._connection() as conn:
+            conn.execute("DELETE FROM cep_cache")
+
+    def use_providers(self, providers, mode='hedged'):
+        patches = [
+            mock.patch.object(cep_service, 'PROVIDERS', providers),
+            mock.patch.object(cep_service, 'CEP_LOOKUP_MODE', mode),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_hedged_lookup_and_cache(self):
+        server = self.stub(body=VIACEP_SE)
+        self.use_providers([Provider('Correios', lambda cep: {'status': 'error', 'error': 'offline'}),
+                            viacep_provider(server.url)])
+
+        response = self.client.get('/api/cep/01001-000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['data']['city'], 'São Paulo')
+
+        self.client.get('/api/cep/01001000')
+        self.assertEqual(server.hits, 1)
+
+    def test_unknown_cep(self):
+        self.use_providers([viacep_provider(self.stub(body={'erro': True}).url)])
+        response = self.client.get('/api/cep/99999999')
+        self.assertEqual(response.status_code, 404)
+
+    def test_health_reports_providers(self):
+        self.use_providers([viacep_provider(self.stub(body=VIACEP_SE).url)])
+        self.client.get('/api/cep/01001000')
+        health = self.client.get('/health').get_json()
+        self.assertIn('ViaCEP', health['providers'])
+        self.assertEqual(health['providers']['ViaCEP']['breaker']['state'], 'closed')
+        self.assertEqual(health['provider_order'], ['ViaCEP'])
+        self.assertIn('cache', health)
+
+    def test_batch_dedupes_and_streams_ndjson(self):
+        server = self.stub(body=VIACEP_SE, delay=0.05)
+        self.use_providers([viacep_provider(server.url)])
+        self.client.get('/api/cep/70040010')
+        server.hits = 0
+
+        response = self.client.post('/api/cep/batch', json={
+            'ceps': ['01001-000', '01001000', '70040-010', '123', '22250040']
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        by_cep = {line['cep']: line for line in lines}
+        self.assertEqual(len(lines), 4)
+        self.assertFalse(by_cep['123']['success'])
+        self.assertTrue(by_cep['01001000']['success'])
+        self.assertTrue(by_cep['70040010']['success'])
+        # The cached CEP is not looked up again, the duplicate only once
+        self.assertEqual(server.hits, 2)
+
+    def test_batch_rejects_bad_payload(self):
+        self.assertEqual(self.client.post('/api/cep/batch', json=['01001000']).status_code, 400)
+        with mock.patch.object(cep_service, 'CEP_BATCH_MAX_SIZE', 2):
+            response = self.client.post('/api/cep/batch', json={'ceps': ['1', '2', '3']})
+        self.assertEqual(response.status_code, 413)
+
+
+if __name__ == '__main__':
+    unittest.main()
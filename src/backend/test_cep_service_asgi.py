@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the async (ASGI) serving mode of the CEP Service
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+os.environ.setdefault('CEP_CACHE_PATH', os.path.join(tempfile.mkdtemp(), 'cep_cache.db'))
+os.environ.setdefault('CEP_LOCALITY_DB', os.path.join(tempfile.mkdtemp(), 'localities.db'))
+
+from starlette.testclient import TestClient
+
+import cep_service
+import cep_service_asgi
+from cep_service_asgi import CepResolver, PooledHttpClient, async_json_api_provider
+from test_cep_providers import BRASILAPI_SE, VIACEP_SE, StubServer, StubServerTestCase
+
+
+def clear_cache():
+    cep_service.cep_cache._lru.clear()
+    with cep_service.cep_cache._connection() as conn:
+        conn.execute("DELETE FROM cep_cache")
+
+
+class ConcurrencyStub(StubServer):
+    """StubServer that also records the highest number of requests served at once"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        handler = self.server.RequestHandlerClass
+        do_get = handler.do_GET
+        stub = self
+
+        def counting_do_get(handler_self):
+            with stub._lock:
+                stub.active += 1
+                stub.max_active = max(stub.max_active, stub.active)
+            try:
+                do_get(handler_self)
+            finally:
+                with stub._lock:
+                    stub.active -= 1
+
+        handler.do_GET = counting_do_get
+
+
+class TestAsyncResolver(StubServerTestCase):
+    def setUp(self):
+        clear_cache()
+
+    def run_lookups(self, ceps, server, max_per_host=50, name='ViaCEP'):
+        async def main():
+            http = PooledHttpClient(max_per_host=max_per_host)
+            try:
+                resolver = CepResolver([async_json_api_provider(name, http, url=server.url)])
+                return await asyncio.gather(*(resolver.resolve(cep) for cep in ceps))
+            finally:
+                await http.aclose()
+
+        return asyncio.run(main())
+
+    def test_single_flight(self):
+        server = self.stub(body=VIACEP_SE, delay=0.1)
+        results = self.run_lookups(['01001000'] * 50, server)
+        self.assertTrue(all(result['status'] == 'found' for result in results))
+        self.assertEqual(server.hits, 1)
+
+    def test_per_host_limit(self):
+        server = ConcurrencyStub(body=BRASILAPI_SE, delay=0.05)
+        self.addCleanup(server.close)
+        ceps = [f'0100{i:04d}' for i in range(40)]
+
+        results = self.run_lookups(ceps, server, max_per_host=5, name='BrasilAPI')
+        self.assertEqual(len(results), 40)
+        self.assertEqual(server.hits, 40)
+        self.assertLessEqual(server.max_active, 5)
+
+    def test_many_concurrent_lookups_share_one_thread(self):
+        server = self.stub(body=VIACEP_SE, delay=0.2)
+        ceps = [f'7{i:07d}' for i in range(100)]
+
+        started = time.monotonic()
+        results = self.run_lookups(ceps, server, max_per_host=100)
+        elapsed = time.monotonic() - started
+
+        self.assertTrue(all(result['status'] == 'found' for result in results))
+        # 100 lookups of 200 ms each overlap instead of queuing
+        self.assertLess(elapsed, 2.0)
+
+
+class TestAsgiRoutes(StubServerTestCase):
+    def setUp(self):
+        clear_cache()
+        self.server = self.stub(body=VIACEP_SE)
+        self.client = TestClient(cep_service_asgi.app)
+        self.client.__enter__()
+        self.addCleanup(self.client.__exit__, None, None, None)
+        state = self.client.app.state
+        state.resolver = CepResolver([async_json_api_provider('ViaCEP', state.http, url=self.server.url)])
+
+    def test_get_cep(self):
+        response = self.client.get('/api/cep/01001-000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['city'], 'São Paulo')
+
+        self.client.get('/api/cep/01001000')
+        self.assertEqual(self.server.hits, 1)
+
+    def test_invalid_cep(self):
+        self.assertEqual(self.client.get('/api/cep/123').status_code, 400)
+
+    def test_test_route_reports_source(self):
+        response = self.client.get('/api/cep/test/01001000')
+        self.assertEqual(response.json()['source'], 'ViaCEP')
+
+    def test_health(self):
+        self.client.get('/api/cep/01001000')
+        health = self.client.get('/health').json()
+        self.assertEqual(health['server'], 'asgi')
+        self.assertEqual(health['providers']['ViaCEP']['found'], 1)
+        self.assertIn('http_pool', health)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the Correios SOAP client, run against the recorded responses in
+fixtures/correios
+"""
+
+import unittest
+import xml.etree.ElementTree as ET
+from unittest import mock
+
+import requests
+
+from correios_client import (
+    CorreiosClient,
+    benchmark,
+    build_envelope,
+    load_fixtures,
+    parse_envelope,
+)
+
+FIXTURES = {name: (status_code, content) for name, status_code, content in load_fixtures()}
+
+
+class FakeResponse:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+
+class TestEnvelope(unittest.TestCase):
+    def test_envelope_holds_the_cep(self):
+        root = ET.fromstring(build_envelope('01001000'))
+        cep = root.find('.//cep')
+        self.assertEqual(cep.text, '01001000')
+
+
+class TestParseResponse(unittest.TestCase):
+    def setUp(self):
+        self.client = CorreiosClient(session=mock.Mock())
+
+    def parse(self, name):
+        status_code, content = FIXTURES[name]
+        return self.client.parse_response(status_code, content, '00000000')
+
+    def test_found(self):
+        result = self.parse('200_found')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['data'], {
+            'street': 'Praça da Sé', 'neighborhood': 'Sé', 'city': 'São Paulo',
+            'state': 'SP', 'cep': '01001000'
+        })
+
+    def test_found_with_header_and_whitespace(self):
+        result = self.parse('200_found_df')
+        self.assertEqual(result['data']['street'], 'SBN Quadra 1')
+        self.assertEqual(result['data']['city'], 'Brasília')
+
+    def test_incomplete(self):
+        self.assertEqual(self.parse('200_incomplete')['error'], 'Dados do CEP incompletos')
+
+    def test_no_return(self):
+        self.assertEqual(self.parse('200_no_return')['error'], 'CEP não encontrado')
+
+    def test_not_found_fault(self):
+        self.assertEqual(self.parse('500_cep_nao_encontrado')['error'], 'CEP não encontrado')
+
+    def test_server_fault(self):
+        self.assertEqual(self.parse('500_server_error')['error'], 'Erro interno do servidor dos Correios')
+
+    def test_parse_is_counted(self):
+        self.parse('200_found')
+        self.assertEqual(self.client.stats.snapshot()['parses'], 1)
+
+    def test_stops_at_return(self):
+        kind, fields = parse_envelope(FIXTURES['200_found'][1] + b'<trailing garbage')
+        self.assertEqual(kind, 'address')
+        self.assertEqual(fields['uf'], 'SP')
+
+
+class TestRoundTrips(unittest.TestCase):
+    def test_round_trips_are_counted_and_timed(self):
+        session = mock.Mock()
+        session.post.return_value = FakeResponse(*FIXTURES['200_found'])
+        client = CorreiosClient(session=session)
+
+        client.post('01001000')
+        session.post.side_effect = requests.exceptions.Timeout()
+        with self.assertRaises(requests.exceptions.Timeout):
+            client.post('01001000')
+
+        stats = client.stats.snapshot()
+        self.assertEqual(stats['round_trips'], 2)
+        self.assertEqual(stats['failures'], 1)
+        self.assertIsNotNone(stats['round_trip_p50_ms'])
+        self.assertEqual(session.post.call_args.kwargs['data'], build_envelope('01001000'))
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_benchmark_covers_every_fixture(self):
+        rows = benchmark(iterations=10)
+        self.assertEqual([name for name, _ in rows], sorted(FIXTURES))
+        self.assertTrue(all('pull_parser' in timings for _, timings in rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the locality dataset and its endpoints
+"""
+
+import csv
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+os.environ.setdefault('CEP_CACHE_PATH', os.path.join(tempfile.mkdtemp(), 'cep_cache.db'))
+os.environ.setdefault('CEP_LOCALITY_DB', os.path.join(tempfile.mkdtemp(), 'localities.db'))
+
+import cep_service
+from locality_service import LocalityStore
+
+
+class TestLocalityStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.store = LocalityStore(os.path.join(self.directory, 'localities.db'), cep_service.LOCALITY_SEED_PATH)
+
+    def names(self, query, **kwargs):
+        matches, partial = self.store.search('DF', query, **kwargs)
+        self.assertFalse(partial)
+        return [item.name for item in matches]
+
+    def test_name_prefix(self):
+        self.assertEqual(self.names('asa'), ['Asa Norte', 'Asa Sul'])
+
+    def test_accents_and_case_are_ignored(self):
+        self.assertEqual(self.names('GUARA'), ['Guará'])
+        self.assertEqual(self.names('sao s'), ['São Sebastião'])
+
+    def test_exact_then_prefix_then_word(self):
+        csv_path = os.path.join(self.directory, 'extra.csv')
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['uf', 'city', 'name'])
+            writer.writerow(['DF', 'Brasília', 'Lago'])
+        self.store.import_csv(csv_path)
+
+        self.assertEqual(self.names('lago'), ['Lago', 'Lago Norte', 'Lago Sul'])
+        names = self.names('norte', limit=20)
+        self.assertEqual(names[0], 'Asa Norte')
+        self.assertIn('SQN - Setor Quadra Norte', names)
+
+    def test_limit(self):
+        self.assertEqual(len(self.names('s', limit=3)), 3)
+
+    def test_budget_marks_partial(self):
+        index = self.store.index('DF')
+        _, partial = index.search('s', limit=50, deadline=time.perf_counter() - 1)
+        self.assertTrue(partial)
+
+    def test_unknown_uf(self):
+        self.assertEqual(self.store.search('AC', 'rio'), ([], False))
+
+    def test_existing_table_is_not_reseeded(self):
+        store = LocalityStore(self.store.path, cep_service.LOCALITY_SEED_PATH)
+        self.assertEqual(len(store.index('DF').localities), len(self.store.index('DF').localities))
+
+
+class TestLocalityEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.client = cep_service.app.test_client()
+
+    def test_autocomplete(self):
+        response = self.client.get('/api/localities?uf=df&q=asa')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual([item['name'] for item in data['results']], ['Asa Norte', 'Asa Sul'])
+        self.assertIsNotNone(response.headers.get('ETag'))
+
+    def test_etag_revalidation(self):
+        response = self.client.get('/api/localities?uf=DF&q=lago')
+        etag = response.headers['ETag']
+        again = self.client.get('/api/localities?uf=DF&q=lago', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+
+        other = self.client.get('/api/localities?uf=DF&q=asa', headers={'If-None-Match': etag})
+        self.assertEqual(other.status_code, 200)
+
+    def test_full_list(self):
+        data = self.client.get('/api/localities?uf=DF&city=Brasília').get_json()
+        self.assertEqual(data['total'], 52)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/localities?q=asa').status_code, 400)
+        self.assertEqual(self.client.get('/api/localities?uf=DF&limit=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/localities?uf=AC').status_code, 404)
+
+    def test_brasilia_streets(self):
+        response = self.client.get('/api/brasilia/streets')
+        data = response.get_json()
+        self.assertEqual(data['total_streets'], 52)
+        self.assertEqual(data['streets'][:3], ['Aguas Claras', 'Asa Norte', 'Asa Sul'])
+
+        cached = self.client.get('/api/brasilia/streets', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
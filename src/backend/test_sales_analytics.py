@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized sales analytics
+"""
+
+import unittest
+
+import numpy as np
+
+import analytics_export
+import sales_analytics
+from analytics_export import export_all
+from sales_analytics import (
+    benchmark, daily_revenue, load_columns, moving_average, revenue_by_category, top_n, top_products
+)
+from test_analytics_export import ExportTestCase
+
+
+class TestSalesAnalytics(ExportTestCase):
+    def setUp(self):
+        super().setUp()
+        export_all(self.db_path, self.out)
+        self.columns = load_columns(self.out)
+
+    def test_matches_arrow_helpers(self):
+        expected = analytics_export.top_products(analytics_export.sold_items(self.out)).to_pylist()
+        self.assertEqual(
+            top_products(self.columns),
+            [(row['product_id'], row['units'], row['revenue']) for row in expected]
+        )
+
+    def test_revenue_by_category(self):
+        self.assertEqual(revenue_by_category(self.columns), {1: 2250.0, 2: 180.0})
+
+    def test_daily_revenue(self):
+        first, revenue = daily_revenue(self.columns)
+        self.assertEqual(np.datetime64(first, 'D'), np.datetime64('2024-03-01'))
+        self.assertEqual(revenue.tolist(), [2430.0])
+
+    def test_columns_are_cached_until_next_export(self):
+        self.assertIs(load_columns(self.out), self.columns)
+
+        # A new process maps the .npy files instead of reading Parquet
+        sales_analytics._cache.clear()
+        mapped = load_columns(self.out)
+        self.assertIsInstance(mapped.product_id, np.memmap)
+
+        self.execute("UPDATE api_order SET status = 'shipped', updated_at = '2024-03-09 10:00:00' WHERE id = 3")
+        export_all(self.db_path, self.out)
+        self.assertEqual(len(load_columns(self.out).product_id), 4)
+        self.assertEqual(top_products(load_columns(self.out), 3)[-1][0], 3)
+
+
+class TestVectorHelpers(unittest.TestCase):
+    def test_top_n_breaks_ties_by_lower_index(self):
+        values = np.array([0, 5, 9, 5, 5, 1])
+        self.assertEqual(top_n(values, 3).tolist(), [2, 1, 3])
+        self.assertEqual(top_n(values, 10).tolist(), [2, 1, 3, 4, 5])
+
+    def test_moving_average(self):
+        self.assertEqual(moving_average([2, 4, 6, 8], 2).tolist(), [2.0, 3.0, 5.0, 7.0])
+
+    def test_benchmark_agrees_with_sql(self):
+        # benchmark() asserts both answers match before timing
+        ((size, _, _),) = benchmark([3000], repeat=1)
+        self.assertEqual(size, 3000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite performance profile
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlite_tuning import SQLITE_DEFAULTS, build_pragmas, connect
+
+
+class SqliteTuningTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+
+    def pragma(self, conn, name):
+        return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_profile_is_applied(self):
+        conn = connect(self.path)
+        self.addCleanup(conn.close)
+        self.assertEqual(self.pragma(conn, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(conn, 'synchronous'), 1)   # NORMAL
+        self.assertEqual(self.pragma(conn, 'temp_store'), 2)    # MEMORY
+        self.assertEqual(self.pragma(conn, 'cache_size'), -65536)
+        self.assertEqual(self.pragma(conn, 'busy_timeout'), 5000)
+
+    def test_overrides(self):
+        conn = connect(self.path, {'synchronous': 'FULL', 'journal_mode': None})
+        self.addCleanup(conn.close)
+        self.assertEqual(self.pragma(conn, 'synchronous'), 2)
+        self.assertEqual(self.pragma(conn, 'journal_mode'), 'delete')
+
+    def test_sqlite_defaults(self):
+        self.assertEqual(build_pragmas(SQLITE_DEFAULTS), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
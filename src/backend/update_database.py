@@ -8,6 +8,8 @@ import os
 import bcrypt
 from datetime import datetime
 
+from sqlite_tuning import connect
+
 def update_frontend_database(db_path):
     """Update the frontend database with additional features"""
     if not os.path.exists(db_path):
@@ -15,7 +17,7 @@ def update_frontend_database(db_path):
         return False
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect(db_path)
         cursor = conn.cursor()
         
         print(f"Updating frontend database: {db_path}")
@@ -239,7 +241,7 @@ def update_backend_database(db_path):
         return False
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect(db_path)
         cursor = conn.cursor()
         
         print(f"Updating backend database: {db_path}")
@@ -335,7 +337,7 @@ def create_admin_user(db_path):
         return False
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect(db_path)
         cursor = conn.cursor()
         
         # Check if admin user already exists
@@ -123,7 +123,8 @@ function collectShippingData() {
         complement: document.getElementById('complement').value,
         neighborhood: document.getElementById('neighborhood').value,
         city: document.getElementById('city').value,
-        state: document.getElementById('state').value
+        state: document.getElementById('state').value,
+        options: shippingQuote ? shippingQuote.options : []
     };
 }
 
@@ -165,6 +166,8 @@ function showNotification(message, type = 'success') {
 
 // Carrinho de compras (cópia do carrinho principal)
 let cart = [];
+// Endereço e opções de frete do último CEP consultado na API
+let shippingQuote = null;
 
 // Função para atualizar a exibição do carrinho
 function updateCartDisplay() {
@@ -447,34 +450,43 @@ function buscarCEP() {
     searchBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i>';
     searchBtn.disabled = true;
     
-    // Usar nosso próprio serviço de CEP (com fallback automático)
-    fetch(`http://localhost:5001/api/cep/${cep}`)
+    // Endereço e opções de frete em uma única chamada à API (com cache no servidor).
+    // Cada fallback é tentado uma única vez: API -> serviço de CEP -> ViaCEP.
+    // Um 404 é definitivo: o CEP não existe e nenhum outro provedor é consultado.
+    fetch('http://localhost:8000/api/shipping/quote/', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ cep: cep, subtotal: cartSubtotal().toFixed(2) })
+    })
         .then(response => {
+            if (response.status === 404) {
+                throw new CEPNaoEncontradoError();
+            }
             if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
+                throw new Error(`API indisponível (status ${response.status})`);
             }
-            return response.json();
+            return response.json().then(data => {
+                shippingQuote = data;
+                preencherEndereco(data.address);
+                showNotification(data.free_shipping
+                    ? `CEP ${cep} encontrado com sucesso! Frete grátis disponível.`
+                    : `CEP ${cep} encontrado com sucesso!`);
+            });
         })
-        .then(data => {
-            if (data.success) {
-                // Preencher os campos com os dados retornados
-                document.getElementById('street').value = data.data.street || '';
-                document.getElementById('neighborhood').value = data.data.neighborhood || '';
-                document.getElementById('city').value = data.data.city || '';
-                document.getElementById('state').value = data.data.state || '';
-                
-                // Se o campo de número estiver vazio, colocar o foco nele
-                const numberInput = document.getElementById('number');
-                if (!numberInput.value) {
-                    numberInput.focus();
-                }
-                
-                showNotification(`CEP ${cep} encontrado com sucesso!`);
-            } else {
-                throw new Error(data.error || 'CEP não encontrado');
+        .catch(error => {
+            if (error instanceof CEPNaoEncontradoError) {
+                throw error;
             }
+            // API indisponível: consultar o serviço de CEP diretamente
+            console.warn('Erro ao consultar a API de frete:', error);
+            return buscarCEPServico(cep);
         })
         .catch(error => {
+            if (error instanceof CEPNaoEncontradoError) {
+                alert('CEP não encontrado. Por favor, verifique o número e tente novamente.');
+                showNotification(`CEP ${cep} não encontrado`, 'error');
+                return;
+            }
             console.error('Erro ao buscar CEP:', error);
             // Tentar uma API alternativa se o serviço local não estiver disponível
             buscarCEPAlternativo(cep);
@@ -486,6 +498,54 @@ function buscarCEP() {
         });
 }
 
+// CEP inexistente: encerra a busca sem consultar outros provedores
+class CEPNaoEncontradoError extends Error {
+    constructor() {
+        super('CEP não encontrado');
+        this.name = 'CEPNaoEncontradoError';
+    }
+}
+
+// Soma dos itens do carrinho
+function cartSubtotal() {
+    return cart.reduce((total, item) => total + item.price * item.quantity, 0);
+}
+
+// Preenche os campos de endereço com os dados de um CEP
+function preencherEndereco(address) {
+    document.getElementById('street').value = address.street || '';
+    document.getElementById('neighborhood').value = address.neighborhood || '';
+    document.getElementById('city').value = address.city || '';
+    document.getElementById('state').value = address.state || '';
+    
+    // Se o campo de número estiver vazio, colocar o foco nele
+    const numberInput = document.getElementById('number');
+    if (!numberInput.value) {
+        numberInput.focus();
+    }
+}
+
+// Função para buscar CEP no nosso próprio serviço de CEP (com fallback automático).
+// O serviço responde 404 tanto para CEP inexistente quanto quando nenhum
+// provedor respondeu; só o primeiro caso encerra a busca.
+function buscarCEPServico(cep) {
+    shippingQuote = null;
+    return fetch(`http://localhost:5001/api/cep/${cep}`)
+        .then(response => response.json().catch(() => {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }))
+        .then(data => {
+            if (data.success) {
+                preencherEndereco(data.data);
+                showNotification(`CEP ${cep} encontrado com sucesso!`);
+            } else if (data.error === 'CEP não encontrado') {
+                throw new CEPNaoEncontradoError();
+            } else {
+                throw new Error(data.error || 'Serviço de CEP indisponível');
+            }
+        });
+}
+
 // Função para buscar CEP usando API alternativa
 function buscarCEPAlternativo(cep) {
     // Mostrar indicador de carregamento
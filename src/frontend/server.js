@@ -29,13 +29,30 @@ function getLocalIP() {
   return 'localhost';
 }
 
+// Same performance profile as src/backend/sqlite_tuning.py: WAL so readers
+// and the writer don't block each other, no fsync per commit, mmap, 64 MB
+// page cache, in-memory temp tables and a 5 s wait on locks
+const SQLITE_PRAGMAS = `
+  PRAGMA busy_timeout = 5000;
+  PRAGMA journal_mode = WAL;
+  PRAGMA synchronous = NORMAL;
+  PRAGMA mmap_size = 268435456;
+  PRAGMA cache_size = -65536;
+  PRAGMA temp_store = MEMORY;
+`;
+
 // Create SQLite database connection
 const db = new sqlite3.Database('./database.db', (err) => {
   if (err) {
     console.error('Error opening database:', err.message);
   } else {
     console.log('Connected to SQLite database');
-    initializeDatabase();
+    db.exec(SQLITE_PRAGMAS, (pragmaErr) => {
+      if (pragmaErr) {
+        console.error('Error applying SQLite settings:', pragmaErr.message);
+      }
+      initializeDatabase();
+    });
   }
 });
 